@@ -1,6 +1,5 @@
 #!/usr/bin/python3.8
 
-import time
 import datetime
 import os
 import sys
@@ -17,6 +16,7 @@ import jk_sysinfo
 
 from jk_mediawiki.MWManagementCtx import MWManagementCtx
 from jk_mediawiki.impl.AbstractProcessFilter import AbstractProcessFilter
+from jk_mediawiki.impl.ProcFSProcessProvider import ProcFSProcessProvider
 
 
 
@@ -38,6 +38,7 @@ ap.optionDataDefaults.set("bVerbose", False)
 ap.optionDataDefaults.set("bShowVersion", False)
 ap.optionDataDefaults.set("wwwWikiRootDir", None)
 ap.optionDataDefaults.set("httpBinDir", None)
+ap.optionDataDefaults.set("bUseParseCache", False)
 
 # arguments
 
@@ -51,6 +52,8 @@ ap.createOption('w', 'wwwwikirootdir', "The root directory for the local wiki in
 	lambda argOption, argOptionArguments, parsedArgs: parsedArgs.optionData.set("wwwWikiRootDir", True)
 ap.createOption('d', 'httpbindir', "The root directory for the web server start script(s).").onOption = \
 	lambda argOption, argOptionArguments, parsedArgs: parsedArgs.optionData.set("httpBinDir", True)
+ap.createOption(None, 'cache', "Cache parsed LocalSettings.php files in ~/.cache/jk_mediawiki to speed up subsequent invocations.").onOption = \
+	lambda argOption, argOptionArguments, parsedArgs: parsedArgs.optionData.set("bUseParseCache", True)
 
 # return codes
 
@@ -73,6 +76,7 @@ ap.createCommand("statusfull", "List full status of HTTP service(s) and local Wi
 ap.createCommand("start", "Start relevant service(s) to run a specific wiki.").expectString("wikiName", minLength=1)
 ap.createCommand("stop", "Stop relevant service(s) to terminate a specific wiki.").expectString("wikiName", minLength=1)
 ap.createCommand("extensionmatrix", "Display a matrix about all wiki extensions.")
+ap.createCommand("settingsmatrix", "Display a matrix about variable values of all wikis. (Comma separated names; \"wgCache*\" selects by prefix.)").expectString("varNames", minLength=1)
 ap.createCommand("list", "Display a list of installed wikis.")
 
 
@@ -110,31 +114,18 @@ def instantiateLocalUserServiceMgr(ctx:MWManagementCtx, cfg:dict, bVerbose:bool)
 def waitForServiceStarted(fnGetPIDInfos:jk_mediawiki.impl.AbstractProcessFilter, name:str, log:jk_logging.AbstractLogger):
 	assert callable(fnGetPIDInfos)
 
-	countDown = 20
-	while True:
-		time.sleep(0.5)
-		pidInfos = fnGetPIDInfos()
-		if pidInfos:
-			log.success("Local " + name + ": " + str([ x["pid"] for x in pidInfos ]))
-			break
-		countDown-= 1
-		if countDown == 0:
-			raise Exception("Failed to start " + name + "!")
+	pidInfos = jk_mediawiki.impl.ProcessWaiter.waitForProcesses(fnGetPIDInfos, 10)
+	if not pidInfos:
+		raise Exception("Failed to start " + name + "!")
+	log.success("Local " + name + ": " + str([ x["pid"] for x in pidInfos ]))
 #
 
 @jk_typing.checkFunctionSignature()
 def waitForServiceStopped(fnGetPIDInfos:jk_mediawiki.impl.AbstractProcessFilter, name:str, log:jk_logging.AbstractLogger):
 	assert callable(fnGetPIDInfos)
 
-	countDown = 40
-	while True:
-		time.sleep(0.5)
-		pidInfos = fnGetPIDInfos()
-		if not pidInfos:
-			break
-		countDown-= 1
-		if countDown == 0:
-			raise Exception("Failed to stop " + name + "!")
+	if not jk_mediawiki.impl.ProcessWaiter.waitForNoProcesses(fnGetPIDInfos, 20):
+		raise Exception("Failed to stop " + name + "!")
 #
 
 
@@ -188,12 +179,20 @@ def _formatMBytes(n:int) -> str:
 #
 
 def print_mem_used_by_pids(pids:list):
-	pids = set(pids)
 	totalMemKB = 0
-	for jStruct in jk_sysinfo.get_ps():
-		if jStruct["pid"] in pids:
-			if "vmsizeKB" in jStruct:
+	if ProcFSProcessProvider.isAvailable():
+		# read the processes specified only
+		processProvider = ProcFSProcessProvider(bAddVMemSize = True)
+		for pid in set(pids):
+			jStruct = processProvider.readProcess(pid)
+			if jStruct is not None:
 				totalMemKB += jStruct["vmsizeKB"]
+	else:
+		pids = set(pids)
+		for jStruct in jk_sysinfo.get_ps(bAddVMemSize = True):
+			if jStruct["pid"] in pids:
+				if "vmsizeKB" in jStruct:
+					totalMemKB += jStruct["vmsizeKB"]
 
 	print()
 	print("Total memory used: " + (_formatMBytes(totalMemKB/1024) if totalMemKB else "???"))
@@ -264,7 +263,7 @@ with jk_logging.wrapMain() as log:
 
 	# load configuration: merge it with specified arguments
 
-	ctx = jk_mediawiki.MWManagementCtx()
+	ctx = jk_mediawiki.MWManagementCtx(bUseParseCache=parsedArgs.optionData["bUseParseCache"])
 	if bVerbose:
 		log.notice("Loading: " + ctx.cfgFilePath)
 	if os.path.isfile(ctx.cfgFilePath):
@@ -510,14 +509,9 @@ with jk_logging.wrapMain() as log:
 
 		# ----
 
-		allRunningWikis = []
-		for wikiToCheck in wikiNames:
-			if wikiToCheck != wikiName:
-				_wikiInstDirPath = localMediaWikisMgr.getWikiInstDirPath(wikiName)
-				h = jk_mediawiki.MediaWikiLocalUserInstallationMgr(ctx, _wikiInstDirPath, log)
-				pidInfos = h.getCronProcesses()
-				if pidInfos:
-					allRunningWikis.append(wikiToCheck)
+		# classify all processes once instead of checking every other wiki separately
+		processClassification = localMediaWikisMgr.classifyProcesses()
+		allRunningWikis = [ x for x in processClassification.runningWikiNames if x != wikiName ]
 
 		if not allRunningWikis:
 			# no more wikis are running
@@ -594,6 +588,18 @@ with jk_logging.wrapMain() as log:
 
 	# ----------------------------------------------------------------
 
+	elif cmdName == "settingsmatrix":
+		varNames = [ x.strip() for x in cmdArgs[0].split(",") if x.strip() ]
+		table = localMediaWikisMgr.getSettingsMatrix(log, varNames)
+
+		print()
+		table.print()
+		print()
+
+		#sys.exit(0)
+
+	# ----------------------------------------------------------------
+
 	else:
 		raise Exception("Implementation Error!")
 
@@ -1,9 +1,13 @@
 
 
 import os
+import json
 import typing
 import getpass
+import hashlib
 import datetime
+import collections
+import concurrent.futures
 
 import jk_typing
 import jk_console
@@ -12,7 +16,10 @@ import jk_logging
 
 from .impl.LocalWikiInstInfo import LocalWikiInstInfo
 from .impl.LocalWikiScanner import LocalWikiScanner
+from .impl.WikiProcessClassifier import WikiProcessClassifier
+from .impl.WikiProcessClassification import WikiProcessClassification
 from .MWManagementCtx import MWManagementCtx
+from .lsfile.MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
 
 
 
@@ -36,6 +43,39 @@ class _StatusOverviewResult(object):
 
 #
 
+#
+# The values of some variables of a single wiki: For every variable a 2-tuple of the hash of the value and a short text to display is stored.
+#
+class _SettingsHashes(object):
+
+	def __init__(self, wikiName:str, hashes:typing.Union[typing.Dict[str,tuple],None], exception:typing.Union[Exception,None],
+			varExceptions:typing.Union[typing.Dict[str,Exception],None] = None):
+		self.wikiName = wikiName
+		self.hashes = hashes				# maps variable names to 2-tuples of the hash and the text to display
+		self.exception = exception			# the exception raised if the file could not be loaded
+		self.varExceptions = varExceptions if varExceptions is not None else {}		# maps variable names to the exceptions raised if their values could not be determined
+	#
+
+#
+
+#
+# The result of editing the "LocalSettings.php" file of a single wiki.
+#
+class _LocalSettingsEditResult(object):
+
+	def __init__(self, wikiName:str, bChanged:bool, exception:typing.Union[Exception,None]):
+		self.wikiName = wikiName
+		self.bChanged = bChanged			# was the file modified (and written)?
+		self.exception = exception			# the exception raised if editing failed
+	#
+
+	@property
+	def isSuccess(self) -> bool:
+		return self.exception is None
+	#
+
+#
+
 
 
 
@@ -106,6 +146,9 @@ class LocalMediaWikisMgr(object):
 		t.addRow(*rowData).hlineAfterRow = True
 		r = jk_console.Console.RESET
 
+		# classify all processes once instead of filtering them for every wiki
+		processClassification = self.classifyProcesses()
+
 		for wikiInst in wikiInsts:
 			if wikiName:
 				if wikiInst.name != wikiName:
@@ -115,15 +158,14 @@ class LocalMediaWikisMgr(object):
 			try:
 				with blog.descend("Checking wiki: " + wikiInst.name) as log2:
 					h = jk_mediawiki.MediaWikiLocalUserInstallationMgr(self.__ctx, wikiInst, log2)
-					bIsRunning = h.isCronScriptRunning()
+					processInfos = processClassification.getCronProcesses(wikiInst.name)
+					bIsRunning = processInfos is not None
 					c = jk_console.Console.ForeGround.STD_GREEN if bIsRunning else jk_console.Console.ForeGround.STD_DARKGRAY
 					smVersion = h.getSMWVersion()
 					lastCfgTime = h.getLastConfigurationTimeStamp()
 					lastUseTime = h.getLastUseTimeStamp()
-					processInfos = h.getCronProcesses()
-					if processInfos:
-						processPIDs = [ x["pid"] for x in processInfos ]
-						pids.extend(processPIDs)
+					processPIDs = [ x["pid"] for x in processInfos ] if processInfos else []
+					pids.extend(processPIDs)
 					rowData = [
 						wikiInst.name,
 						str(h.getVersion()),
@@ -133,8 +175,6 @@ class LocalMediaWikisMgr(object):
 						lastUseTime.strftime("%Y-%m-%d %H:%M") if lastUseTime else "-",
 						str(processPIDs) if bIsRunning else "-",
 					]
-					if pids:
-						pids.extend(pids)
 					if bWithDiskSpace:
 						diskUsage = h.getDiskUsage()
 						rowData.append(_formatMBytes(diskUsage.ro / 1048576))
@@ -149,6 +189,46 @@ class LocalMediaWikisMgr(object):
 		return _StatusOverviewResult(t, pids)
 	#
 
+	#
+	# Convert a variable value to data that can be serialized to JSON in a canonical way: Arrays with assigned elements are dictionaries
+	# that might contain both integer and string keys. They are converted to lists of key-value-pairs sorted by key.
+	#
+	@staticmethod
+	def __canonicalizeValue(value):
+		if isinstance(value, dict):
+			return [
+				[ k, LocalMediaWikisMgr.__canonicalizeValue(v) ]
+				for k, v in sorted(value.items(), key = lambda x: ( isinstance(x[0], str), x[0] ))
+			]
+		if isinstance(value, list):
+			return [ LocalMediaWikisMgr.__canonicalizeValue(v) for v in value ]
+		return value
+	#
+
+	#
+	# Build a hash of a variable value that is stable across processes.
+	#
+	@staticmethod
+	def __hashValue(value) -> str:
+		data = json.dumps(LocalMediaWikisMgr.__canonicalizeValue(value), ensure_ascii = False, default = repr)
+		return hashlib.blake2b(data.encode("utf-8"), digest_size = 12).hexdigest()
+	#
+
+	#
+	# Build a short text to display for a variable value.
+	#
+	@staticmethod
+	def __formatValue(value, maxLength:int = 24) -> str:
+		if isinstance(value, str):
+			s = value
+		else:
+			s = json.dumps(value, ensure_ascii = False, default = repr)
+		s = s.replace("\n", " ").replace("\t", " ")
+		if len(s) > maxLength:
+			s = s[:maxLength - 3] + "..."
+		return s
+	#
+
 	################################################################################################################################
 	## Public Methods
 	################################################################################################################################
@@ -157,6 +237,19 @@ class LocalMediaWikisMgr(object):
 		return self.__wikiScanner.getWikiInstDirPath(wikiName)
 	#
 
+	#
+	# Classify the processes of the current user: NGINX and PHP-FPM processes as well as the cron processes of all wikis. The processes
+	# are retrieved only once and classified in a single pass.
+	#
+	# @return		WikiProcessClassification		The processes found.
+	#
+	def classifyProcesses(self) -> WikiProcessClassification:
+		classifier = WikiProcessClassifier(
+			self.__ctx.currentUserName,
+			{ wikiInst.name: wikiInst.instRootDirPath for wikiInst in self.__wikiScanner.wikis })
+		return classifier.classify(self.__ctx.osProcessProvider())
+	#
+
 	#
 	# Scan the disk to list all existing Wikis (= running and not running).
 	#
@@ -182,19 +275,106 @@ class LocalMediaWikisMgr(object):
 		return self._getStatusOverview(wikiName, bWithDiskSpace, bVerbose, log)
 	#
 
+	#
+	# Apply the same modification to the "LocalSettings.php" files of multiple wikis. The wikis are processed in parallel.
+	#
+	# For every wiki the settings file is loaded and passed to the specified edit function. If the data has been modified the file is
+	# written (atomically: see <c>MediaWikiLocalSettingsFile.save()</c>). Errors do not stop processing of other wikis: the result for
+	# each wiki indicates success or failure.
+	#
+	# @param		str[] wikiNames				The names of the wikis to edit. Specify <c>None</c> to edit all wikis.
+	# @param		callable editFunction		A function that receives a <c>MediaWikiLocalSettingsFile</c> object and modifies it.
+	# @param		int maxWorkers				(optional) The maximum number of threads to use.
+	# @param		bool bBackup				(optional) Create a backup file "LocalSettings.php.sav" before writing.
+	# @return		_LocalSettingsEditResult[]	A result for each wiki in the same order as the wiki names.
+	#
+	def editLocalSettingsFiles(self,
+			wikiNames:typing.Union[typing.List[str],None],
+			editFunction:typing.Callable[[MediaWikiLocalSettingsFile],None],
+			maxWorkers:int = 16,
+			bBackup:bool = True,
+		) -> typing.List[_LocalSettingsEditResult]:
+
+		assert callable(editFunction)
+		assert isinstance(maxWorkers, int)
+		assert maxWorkers > 0
+
+		wikiInstsByName = { wikiInst.name: wikiInst for wikiInst in self.__wikiScanner.wikis }
+		if wikiNames is None:
+			wikiNames = sorted(wikiInstsByName.keys())
+		else:
+			for wikiName in wikiNames:
+				assert isinstance(wikiName, str)
+
+		parseCache = self.__ctx.localSettingsParseCache
+
+		def editOne(wikiName:str) -> _LocalSettingsEditResult:
+			try:
+				wikiInst = wikiInstsByName.get(wikiName)
+				if wikiInst is None:
+					raise Exception("No such wiki: " + repr(wikiName))
+				mwLocalSettings = MediaWikiLocalSettingsFile()
+				mwLocalSettings.load(dirPath = wikiInst.instRootDirPath, parseCache = parseCache)
+				editFunction(mwLocalSettings)
+				bChanged = mwLocalSettings.isChanged
+				mwLocalSettings.save(bBackup = bBackup)
+				return _LocalSettingsEditResult(wikiName, bChanged, None)
+			except Exception as ee:
+				return _LocalSettingsEditResult(wikiName, False, ee)
+		#
+
+		if not wikiNames:
+			return []
+		with concurrent.futures.ThreadPoolExecutor(max_workers = min(maxWorkers, len(wikiNames))) as executor:
+			return list(executor.map(editOne, wikiNames))
+	#
+
+	#
+	# Put the specified wikis into read only mode.
+	#
+	# @param		str text					The reason to display to the users
+	# @param		str[] wikiNames				The names of the wikis to edit. Specify <c>None</c> to edit all wikis.
+	# @return		_LocalSettingsEditResult[]	A result for each wiki in the same order as the wiki names.
+	#
+	def deactivateWikis(self, text:str, wikiNames:typing.Union[typing.List[str],None] = None) -> typing.List[_LocalSettingsEditResult]:
+		assert isinstance(text, str)
+
+		return self.editLocalSettingsFiles(wikiNames, lambda mwLocalSettings: mwLocalSettings.deactivateWiki(text))
+	#
+
+	#
+	# End read only mode of the specified wikis.
+	#
+	# @param		str[] wikiNames				The names of the wikis to edit. Specify <c>None</c> to edit all wikis.
+	# @return		_LocalSettingsEditResult[]	A result for each wiki in the same order as the wiki names.
+	#
+	def activateWikis(self, wikiNames:typing.Union[typing.List[str],None] = None) -> typing.List[_LocalSettingsEditResult]:
+		return self.editLocalSettingsFiles(wikiNames, lambda mwLocalSettings: mwLocalSettings.activateWiki())
+	#
+
 	#
 	# Get a matrix that lists all wikis with all extensions.
 	#
+	# Extensions that are installed but not enabled in "LocalSettings.php" of a wiki are listed in parentheses.
+	#
 	@jk_typing.checkFunctionSignature()
 	def getExtensionMatrix(self, log:jk_logging.AbstractLogger) -> jk_console.SimpleTable:
 		# str[] wikiNames
 		# MediaWikiLocalUserInstallationMgr[] wikis
 		# MediaWikiExtensionInfo[] wikiExtensionInfos
+		# frozenset[] wikiEnabledExtensionNames
 
 		wikiInsts = self.__wikiScanner.wikis
 		wikiNames = [ wikiInst.name for wikiInst in wikiInsts ]
-		wikis = [ jk_mediawiki.MediaWikiLocalUserInstallationMgr(wikiInst, self.__userName, log) for wikiInst in wikiInsts ]
+		parseCache = self.__ctx.localSettingsParseCache
+		wikis = []
+		for wikiInst in wikiInsts:
+			# the settings are parsed only once: they are required for analyzing the installation and for the extensions enabled
+			mwLocalSettings = MediaWikiLocalSettingsFile()
+			mwLocalSettings.load(dirPath = wikiInst.instRootDirPath, parseCache = parseCache)
+			wikis.append(jk_mediawiki.MediaWikiLocalUserInstallationMgr(self.__ctx, wikiInst, log, mwLocalSettings))
 		wikiExtensionInfos = []
+		wikiEnabledExtensionNames = []
 
 		allExtensionNames = set()
 		for i, wikiName in enumerate(wikiNames):
@@ -214,7 +394,15 @@ class LocalMediaWikisMgr(object):
 					log2.error("Stopping scanning for {} because of errors.".format(wikiName))
 					extInfos = None
 
+				enabledExtensionNames = None
+				if extInfos:
+					try:
+						enabledExtensionNames = wikis[i].getEnabledExtensionNames()
+					except Exception as ee:
+						log2.warn("Failed to determine the extensions enabled: " + str(ee))
+
 			wikiExtensionInfos.append(extInfos)
+			wikiEnabledExtensionNames.append(enabledExtensionNames)
 			if extInfos:
 				for extInfo in extInfos:
 					allExtensionNames.add(extInfo.name)
@@ -258,10 +446,13 @@ class LocalMediaWikisMgr(object):
 							s = extInfo.latestTimeStamp.strftime("%Y-%m-%d")
 						rawTimeData[rowNo - 2][_x] = (extInfo.latestTimeStamp - dtEpoch).total_seconds()
 
-					if s:
-						table.row(rowNo)[colNo].value = s
-					else:
-						table.row(rowNo)[colNo].value = "?"
+					if not s:
+						s = "?"
+					enabledExtensionNames = wikiEnabledExtensionNames[_x]
+					if (enabledExtensionNames is not None) and (os.path.basename(extInfo.extensionDirPath) not in enabledExtensionNames):
+						# installed but not enabled
+						s = "(" + s + ")"
+					table.row(rowNo)[colNo].value = s
 			else:
 				for rowNo in allExtensionsRowIndex.values():
 					table.row(rowNo)[colNo].value = "err"
@@ -295,6 +486,119 @@ class LocalMediaWikisMgr(object):
 		return table
 	#
 
+	#
+	# Get a matrix that lists the values of variables for all wikis.
+	#
+	# The "LocalSettings.php" files of all wikis are loaded in parallel. For every variable only a hash of its effective value - the value
+	# after all active statements have been executed, see <c>MediaWikiLocalSettingsFile.getEffectiveVarValue()</c> - (and a short text to
+	# display) is kept. Values that differ from the value most wikis have are highlighted; a variable that is not set counts as a value of its
+	# own.
+	#
+	# @param		jk_logging.AbstractLogger log		A logger.
+	# @param		str[] varNames				(optional) The names of the variables (without "$"). A name ending with "*" selects all variables starting
+	#											with this prefix. If <c>None</c> is specified all variables of all wikis are listed.
+	# @param		int maxWorkers				(optional) The maximum number of threads to use.
+	# @return		jk_console.SimpleTable		The matrix: a column for every wiki and a row for every variable.
+	#
+	@jk_typing.checkFunctionSignature()
+	def getSettingsMatrix(self, log:jk_logging.AbstractLogger, varNames:typing.Union[typing.List[str],None] = None, maxWorkers:int = 16) -> jk_console.SimpleTable:
+		assert maxWorkers > 0
+
+		wikiInsts = self.__wikiScanner.wikis
+		parseCache = self.__ctx.localSettingsParseCache
+
+		def loadOne(wikiInst:LocalWikiInstInfo) -> _SettingsHashes:
+			try:
+				mwLocalSettings = MediaWikiLocalSettingsFile()
+				mwLocalSettings.load(dirPath = wikiInst.instRootDirPath, parseCache = parseCache)
+
+				if varNames is None:
+					selectedVarNames = mwLocalSettings.findVars()
+				else:
+					selectedVarNames = []
+					for varName in varNames:
+						if varName.endswith("*"):
+							selectedVarNames.extend(mwLocalSettings.findVars(varName[:-1]))
+						else:
+							selectedVarNames.append(varName)
+
+				hashes = {}
+				varExceptions = {}
+				for varName in selectedVarNames:
+					try:
+						value = mwLocalSettings.getEffectiveVarValue(varName)
+					except Exception as ee:
+						hashes[varName] = ( "err", "err" )
+						varExceptions[varName] = ee
+						continue
+					if value is not None:
+						hashes[varName] = ( LocalMediaWikisMgr.__hashValue(value), LocalMediaWikisMgr.__formatValue(value) )
+				return _SettingsHashes(wikiInst.name, hashes, None, varExceptions)
+			except Exception as ee:
+				return _SettingsHashes(wikiInst.name, None, ee)
+		#
+
+		if wikiInsts:
+			with concurrent.futures.ThreadPoolExecutor(max_workers = min(maxWorkers, len(wikiInsts))) as executor:
+				results = list(executor.map(loadOne, wikiInsts))
+		else:
+			results = []
+
+		# determine the rows
+
+		allVarNames = set()
+		for result in results:
+			if result.exception is not None:
+				log.error("Failed to load the settings of {}: {}".format(result.wikiName, result.exception))
+			else:
+				for varName, ee in result.varExceptions.items():
+					log.error("Failed to determine the value of ${} of {}: {}".format(varName, result.wikiName, ee))
+				allVarNames.update(result.hashes.keys())
+		if varNames is None:
+			allVarNames = sorted(allVarNames)
+		else:
+			# keep the order specified; variables selected by prefix are sorted
+			orderedVarNames = []
+			for varName in varNames:
+				if varName.endswith("*"):
+					orderedVarNames.extend(sorted([ x for x in allVarNames if x.startswith(varName[:-1]) and (x not in orderedVarNames) ]))
+				elif varName not in orderedVarNames:
+					orderedVarNames.append(varName)
+			allVarNames = orderedVarNames
+
+		# build the table
+
+		table = jk_console.SimpleTable()
+		table.addRow(*([ "" ] + [ result.wikiName for result in results ])).hlineAfterRow = True
+		table.row(0).color = jk_console.Console.ForeGround.STD_LIGHTCYAN
+
+		for varName in allVarNames:
+			cells = []
+			for result in results:
+				if result.exception is not None:
+					cells.append(( "err", "err" ))
+				else:
+					cells.append(result.hashes.get(varName, ( None, "-" )))
+
+			# the value most wikis have (errors are not counted)
+			counter = collections.Counter([ h for h, text in cells if h != "err" ])
+			majorityHash = counter.most_common(1)[0][0] if counter else None
+			bAllEqual = len(counter) <= 1
+
+			row = table.addRow(*([ "$" + varName ] + [ text for h, text in cells ]))
+			row[0].color = jk_console.Console.ForeGround.STD_LIGHTCYAN
+			for _x, (h, text) in enumerate(cells):
+				cell = row[_x + 1]
+				if h == "err":
+					cell.color = jk_console.Console.ForeGround.STD_RED
+				elif bAllEqual or (h == majorityHash):
+					cell.color = jk_console.Console.ForeGround.STD_DARKGRAY
+				else:
+					cell.color = jk_console.Console.ForeGround.STD_YELLOW
+
+		return table
+	#
+
 #
 
 
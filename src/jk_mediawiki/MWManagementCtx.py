@@ -14,6 +14,8 @@ import jk_prettyprintobj
 
 from .impl.ProcessProviderCache import ProcessProviderCache
 from .impl.OSProcessProvider import OSProcessProvider
+from .impl.ProcFSProcessProvider import ProcFSProcessProvider
+from .lsfile.MediaWikiLocalSettingsFileCache import MediaWikiLocalSettingsFileCache
 
 
 
@@ -30,12 +32,19 @@ class MWManagementCtx(object):
 	#
 	# Constructor method.
 	#
+	# @param	bool bUseParseCache			(optional) If <c>True</c> parsed "LocalSettings.php" files are cached in "~/.cache/jk_mediawiki".
+	#
 	@jk_typing.checkFunctionSignature()
-	def __init__(self):
+	def __init__(self, bUseParseCache:bool = False):
 		self.__userPID = os.getuid()
 		self.__userName = getpass.getuser()
-		self.__osProcessProvider = ProcessProviderCache(OSProcessProvider())
+		if ProcFSProcessProvider.isAvailable():
+			# all process filters are restricted to the current user: skip processes of other users right away
+			self.__osProcessProvider = ProcessProviderCache(ProcFSProcessProvider(uid = self.__userPID))
+		else:
+			self.__osProcessProvider = ProcessProviderCache(OSProcessProvider())
 		self.__homeDir = os.environ["HOME"]
+		self.__localSettingsParseCache = MediaWikiLocalSettingsFileCache(os.path.join(self.__homeDir, ".cache", "jk_mediawiki")) if bUseParseCache else None
 	#
 
 	################################################################################################################################
@@ -56,6 +65,14 @@ class MWManagementCtx(object):
 		return self.__homeDir
 	#
 
+	#
+	# A cache for parsed "LocalSettings.php" files or <c>None</c> if caching is not enabled.
+	#
+	@property
+	def localSettingsParseCache(self) -> typing.Union[MediaWikiLocalSettingsFileCache,None]:
+		return self.__localSettingsParseCache
+	#
+
 	#
 	# A (cachable) provider for processes.
 	#
@@ -158,12 +158,16 @@ class MediaWikiLocalUserInstallationMgr(object):
 	# @param	str mediaWikiInstDirPath					(required) The absolute directory path where the MediaWiki installation can be found.
 	#														The final directory name in the path must be the same as the site name of the Wiki.
 	#														Additionally there must be a cron script named "<sitename>cron.sh".
+	# @param	MediaWikiLocalSettingsFile mwLocalSettings	(optional) The "LocalSettings.php" file of this installation, already loaded completely.
+	#														If specified the settings are read from this file instead of parsing the file again.
+	#														<c>getEnabledExtensionNames()</c> uses this file as well.
 	#
 	@jk_typing.checkFunctionSignature(logDescend="Analyzing MediaWiki installation: {mwInstInfo.name}")
 	def __init__(self,
 			ctx:MWManagementCtx,
 			mwInstInfo:LocalWikiInstInfo,
 			log:jk_logging.AbstractLogger,
+			mwLocalSettings:typing.Union[MediaWikiLocalSettingsFile,None] = None,
 		):
 
 		self.__ctx = ctx
@@ -179,16 +183,22 @@ class MediaWikiLocalUserInstallationMgr(object):
 		assert os.path.isdir(self.wikiSkinsDirPath)
 		assert os.path.isfile(self.wikiLocalSettingsFilePath)
 
-		mwLocalSettings = MediaWikiLocalSettingsFile()
-		mwLocalSettings.load(dirPath = mwInstInfo.instRootDirPath)		# TODO: add logging
-
-		#mwLocalSettings.dump()			# DEBUG
+		self.__mwLocalSettings = mwLocalSettings
+		varNames = [ "wgSitename", "siteName", "wikiSiteName", "wgDBtype", "wgSQLiteDataDir" ]
+		if mwLocalSettings is not None:
+			mwSettings = { varName: mwLocalSettings.getVarValue(varName) for varName in varNames }
+		else:
+			# only a few variables are required here: there is no need to load the settings completely
+			mwSettings = MediaWikiLocalSettingsFile.peekVars(
+				self.wikiLocalSettingsFilePath,
+				varNames,
+				parseCache = ctx.localSettingsParseCache)		# TODO: add logging
 
-		wikiSiteName = mwLocalSettings.getVarValue("wgSitename")
+		wikiSiteName = mwSettings["wgSitename"]
 		if wikiSiteName is None:
-			wikiSiteName = mwLocalSettings.getVarValue("siteName")
+			wikiSiteName = mwSettings["siteName"]
 		if wikiSiteName is None:
-			wikiSiteName = mwLocalSettings.getVarValue("wikiSiteName")
+			wikiSiteName = mwSettings["wikiSiteName"]
 		if wikiSiteName is None:
 			raise Exception("None of these variables exist: $wikiSiteName, $siteName, $wgSitename")
 
@@ -198,9 +208,13 @@ class MediaWikiLocalUserInstallationMgr(object):
 		self.__wikiSiteName = wikiSiteName
 
 		self.__wikiDBDirPath = mwInstInfo.dbDirPath
-		dbType = mwLocalSettings.getVarValueE("wgDBtype")
+		dbType = mwSettings["wgDBtype"]
+		if dbType is None:
+			raise Exception("No such variable: 'wgDBtype'")
 		if dbType == "sqlite":
-			_sqliteDataDir = mwLocalSettings.getVarValueE("wgSQLiteDataDir")
+			_sqliteDataDir = mwSettings["wgSQLiteDataDir"]
+			if _sqliteDataDir is None:
+				raise Exception("No such variable: 'wgSQLiteDataDir'")
 			if self.__wikiDBDirPath != _sqliteDataDir:
 				raise Exception("Actual database directory does not match the configured database directory! ("
 					+ repr(self.__wikiDBDirPath) + " vs. " + repr(_sqliteDataDir) + ")")
@@ -376,10 +390,25 @@ class MediaWikiLocalUserInstallationMgr(object):
 	#
 	def loadMediaWikiLocalSettingsFile(self) -> MediaWikiLocalSettingsFile:
 		mwLocalSettings = MediaWikiLocalSettingsFile()
-		mwLocalSettings.load(dirPath = self.__wikiInstDirPath)
+		mwLocalSettings.load(dirPath = self.__wikiInstDirPath, parseCache = self.__ctx.localSettingsParseCache)
 		return mwLocalSettings
 	#
 
+	#
+	# Get the names of all extensions that are loaded by an active <c>wfLoadExtension()</c> or <c>wfLoadExtensions()</c> statement in
+	# "LocalSettings.php". (Extensions loaded by files included are not considered.)
+	#
+	# If a loaded "LocalSettings.php" file has been passed to the constructor this file is used. Otherwise the file is loaded.
+	#
+	# @return		frozenset				The names of the extensions enabled.
+	#
+	def getEnabledExtensionNames(self) -> frozenset:
+		mwLocalSettings = self.__mwLocalSettings
+		if mwLocalSettings is None:
+			mwLocalSettings = self.loadMediaWikiLocalSettingsFile()
+		return mwLocalSettings.enabledExtensions
+	#
+
 	def stopCronScript(self, log = None):
 		processProvider = self.getCronProcessesProvider()
 		processes = processProvider()
@@ -9,6 +9,9 @@ __version__ = "0.2022.1.12.1"
 
 from .impl.lang_support_php import PHPTokenizer, PHP
 from .lsfile.MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from .lsfile.MediaWikiLocalSettingsFileCache import MediaWikiLocalSettingsFileCache
+from .lsfile.MediaWikiLocalSettingsIncludeGraph import MediaWikiLocalSettingsIncludeGraph
+from .lsfile.MediaWikiLocalSettingsFileSet import MediaWikiLocalSettingsFileSet
 
 from .MWManagementCtx import MWManagementCtx
 
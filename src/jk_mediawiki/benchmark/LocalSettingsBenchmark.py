@@ -0,0 +1,398 @@
+import os
+import gc
+import time
+import platform
+import tempfile
+import tracemalloc
+import statistics
+
+
+from jk_utils import TypedValue
+
+from .. import __version__
+from ..impl.lang_support_php import PHPTokenizer, PHP
+from ..lsfile.MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from ..lsfile.MediaWikiLocalSettingsVariableAssignment import MediaWikiLocalSettingsVariableAssignment
+from .LocalSettingsGenerator import LocalSettingsGenerator
+from .LegacyPHPStringCodec import LegacyPHPStringCodec
+
+
+
+
+
+
+#
+# This class runs timed scenarios against the "LocalSettings.php" parser and reports the results as JSON compatible data.
+#
+# For every file size a file is generated by <c>LocalSettingsGenerator</c>. The following scenarios are run for each file:
+#
+# * <c>tokenize</c>: Tokenize the text.
+# * <c>load</c>: Parse the text (without parse cache).
+# * <c>lookupCold</c>: Resolve the values of all variables of a freshly loaded file.
+# * <c>lookupWarm</c>: Resolve the values of all variables again. (Values are served from the cache now.)
+# * <c>mutate</c>: Modify every tenth assignment and comment out every tenth statement.
+# * <c>toStr</c>: Render the text of a modified file.
+# * <c>save</c>: Write a modified file to disk.
+# * <c>decodeString</c>: Decode all PHP string literals of the file with <c>PHP.decodeString()</c>.
+# * <c>decodeStringLegacy</c>: Decode the same string literals with the previous implementation (<c>LegacyPHPStringCodec</c>).
+# * <c>encodeString</c>: Encode the values of all PHP string literals of the file with <c>PHP.encodeString()</c>.
+# * <c>encodeStringLegacy</c>: Encode the same values with the previous implementation (<c>LegacyPHPStringCodec</c>).
+#
+# Each scenario is run several times: The minimum, median and mean duration are reported. Setting up a scenario (e.g. loading the file that
+# is to be modified) is not included in its duration. Peak memory is measured with <c>tracemalloc</c> in a separate run as tracing slows
+# down execution considerably.
+#
+class LocalSettingsBenchmark(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	DEFAULT_LINE_COUNTS = [ 100, 1000, 10000, 100000 ]
+
+	SCENARIO_NAMES = [ "tokenize", "load", "lookupCold", "lookupWarm", "mutate", "toStr", "save", "decodeString", "decodeStringLegacy",
+		"encodeString", "encodeStringLegacy" ]
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int seed					The seed for generating the files.
+	# @param	int nRepeat					The number of times each scenario is run.
+	# @param	bool bMeasureMemory			Measure the peak memory of each scenario.
+	#
+	def __init__(self, seed:int = 1, nRepeat:int = 5, bMeasureMemory:bool = True):
+		assert isinstance(seed, int)
+		assert isinstance(nRepeat, int)
+		assert nRepeat > 0
+		assert isinstance(bMeasureMemory, bool)
+
+		self.__generator = LocalSettingsGenerator(seed)
+		self.__nRepeat = nRepeat
+		self.__bMeasureMemory = bMeasureMemory
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __loadFile(text:str) -> MediaWikiLocalSettingsFile:
+		lsFile = MediaWikiLocalSettingsFile()
+		lsFile.load(rawText = text)
+		return lsFile
+	#
+
+	@staticmethod
+	def __getVarNames(lsFile:MediaWikiLocalSettingsFile) -> list:
+		return lsFile.findVars()
+	#
+
+	@staticmethod
+	def __lookup(lsFile:MediaWikiLocalSettingsFile, varNames:list) -> int:
+		for varName in varNames:
+			try:
+				lsFile.getVarValue(varName)
+			except Exception as ee:
+				# a variable referring to a variable that does not exist: resolving it is a lookup nonetheless
+				pass
+		return len(varNames)
+	#
+
+	@staticmethod
+	def __mutate(lsFile:MediaWikiLocalSettingsFile) -> int:
+		n = 0
+		for i, (stype, item) in enumerate(lsFile.iterStatements()):
+			if i % 10 == 0:
+				if isinstance(item, MediaWikiLocalSettingsVariableAssignment) and item.isActive and not isinstance(item.value, list):
+					item.setValue(TypedValue("str1", "changed " + str(i)))
+				elif item.isActive:
+					item.deactivate()
+				else:
+					item.activate()
+				n += 1
+		return n
+	#
+
+	@staticmethod
+	def __save(lsFile:MediaWikiLocalSettingsFile) -> int:
+		lsFile.save(bBackup = False)
+		return 1
+	#
+
+	@staticmethod
+	def __decodeStrings(rawStrings:list) -> int:
+		for s in rawStrings:
+			PHP.decodeString(s)
+		return len(rawStrings)
+	#
+
+	@staticmethod
+	def __decodeStringsLegacy(rawStrings:list) -> int:
+		for s in rawStrings:
+			LegacyPHPStringCodec.decodeString(s)
+		return len(rawStrings)
+	#
+
+	@staticmethod
+	def __encodeStrings(values:list) -> int:
+		for s in values:
+			PHP.encodeString(s)
+		return len(values)
+	#
+
+	@staticmethod
+	def __encodeStringsLegacy(values:list) -> int:
+		for s in values:
+			LegacyPHPStringCodec.encodeString(s)
+		return len(values)
+	#
+
+	#
+	# Build the scenarios for a file.
+	#
+	# @return	dict						Maps scenario names to 2-tuples: a setup function and a function that runs the scenario. The setup function
+	#										returns the arguments to pass to the run function. The run function returns the number of operations.
+	#
+	def __buildScenarios(self, text:str, tempDirPath:str) -> dict:
+		tokenizer = PHPTokenizer.instance()
+		loadFile = LocalSettingsBenchmark.__loadFile
+
+		def runLoad(text:str) -> int:
+			loadFile(text)
+			return 1
+
+		def setupLookupWarm():
+			lsFile = loadFile(text)
+			varNames = LocalSettingsBenchmark.__getVarNames(lsFile)
+			LocalSettingsBenchmark.__lookup(lsFile, varNames)
+			return ( lsFile, varNames )
+
+		def runToStr(lsFile:MediaWikiLocalSettingsFile) -> int:
+			lsFile.toStr()
+			return 1
+
+		def setupToStr():
+			lsFile = loadFile(text)
+			LocalSettingsBenchmark.__mutate(lsFile)
+			return ( lsFile, )
+
+		def setupSave():
+			filePath = os.path.join(tempDirPath, "LocalSettings.php")
+			with open(filePath, "w", encoding = "utf-8") as f:
+				f.write(text)
+			lsFile = MediaWikiLocalSettingsFile()
+			lsFile.load(filePath = filePath)
+			LocalSettingsBenchmark.__mutate(lsFile)
+			return ( lsFile, )
+
+		def setupDecodeString():
+			rawStrings = [ text[start+1:end-1] for start, end, token in tokenizer.tokenize(text, bEmitOffsets = True)
+				if token.type in [ "str1", "str2" ] ]
+			return ( rawStrings, )
+
+		def setupEncodeString():
+			values = [ token.value for token in tokenizer.tokenize(text) if token.type in [ "str1", "str2" ] ]
+			return ( values, )
+
+		return {
+			"tokenize": (
+				lambda: ( text, ),
+				lambda text: sum(1 for t in tokenizer.tokenize(text, bEmitWhiteSpaces = True, bEmitNewLines = True, bEmitComments = True)),
+			),
+			"load": (
+				lambda: ( text, ),
+				runLoad,
+			),
+			"lookupCold": (
+				lambda: ( loadFile(text), ),
+				lambda lsFile: LocalSettingsBenchmark.__lookup(lsFile, LocalSettingsBenchmark.__getVarNames(lsFile)),
+			),
+			"lookupWarm": (
+				setupLookupWarm,
+				LocalSettingsBenchmark.__lookup,
+			),
+			"mutate": (
+				lambda: ( loadFile(text), ),
+				LocalSettingsBenchmark.__mutate,
+			),
+			"toStr": (
+				setupToStr,
+				runToStr,
+			),
+			"save": (
+				setupSave,
+				LocalSettingsBenchmark.__save,
+			),
+			"decodeString": (
+				setupDecodeString,
+				LocalSettingsBenchmark.__decodeStrings,
+			),
+			"decodeStringLegacy": (
+				setupDecodeString,
+				LocalSettingsBenchmark.__decodeStringsLegacy,
+			),
+			"encodeString": (
+				setupEncodeString,
+				LocalSettingsBenchmark.__encodeStrings,
+			),
+			"encodeStringLegacy": (
+				setupEncodeString,
+				LocalSettingsBenchmark.__encodeStringsLegacy,
+			),
+		}
+	#
+
+	#
+	# Run a single scenario.
+	#
+	# @return	dict						The durations, the number of operations and (optionally) the peak memory.
+	#
+	def __runScenario(self, setupFunc, runFunc) -> dict:
+		durations = []
+		nOperations = 0
+		for i in range(self.__nRepeat):
+			args = setupFunc()
+			gc.collect()
+			t0 = time.perf_counter()
+			nOperations = runFunc(*args)
+			durations.append(time.perf_counter() - t0)
+			del args
+
+		ret = {
+			"seconds": {
+				"min": min(durations),
+				"median": statistics.median(durations),
+				"mean": statistics.mean(durations),
+			},
+			"operations": nOperations,
+			"operationsPerSecond": (nOperations / min(durations)) if min(durations) > 0 else None,
+		}
+
+		if self.__bMeasureMemory:
+			args = setupFunc()
+			gc.collect()
+			tracemalloc.start()
+			try:
+				runFunc(*args)
+				ret["peakMemoryBytes"] = tracemalloc.get_traced_memory()[1]
+			finally:
+				tracemalloc.stop()
+			del args
+
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Run all scenarios for a file of the specified size.
+	#
+	# @param	int nLines					The number of lines of the file to generate.
+	# @param	str[] scenarioNames			(optional) The scenarios to run. If not specified all scenarios are run.
+	# @return	dict						The results.
+	#
+	def runFile(self, nLines:int, scenarioNames:list = None) -> dict:
+		assert isinstance(nLines, int)
+		if scenarioNames is None:
+			scenarioNames = LocalSettingsBenchmark.SCENARIO_NAMES
+		else:
+			for scenarioName in scenarioNames:
+				if scenarioName not in LocalSettingsBenchmark.SCENARIO_NAMES:
+					raise Exception("No such scenario: " + repr(scenarioName))
+
+		text = self.__generator.generate(nLines)
+		nTokens = sum(1 for t in PHPTokenizer.instance().tokenize(text, bEmitWhiteSpaces = True, bEmitNewLines = True, bEmitComments = True))
+		lsFile = LocalSettingsBenchmark.__loadFile(text)
+		nStatements = sum(1 for x in lsFile.iterStatements())
+		nVariables = len(LocalSettingsBenchmark.__getVarNames(lsFile))
+		del lsFile
+
+		scenarioResults = {}
+		with tempfile.TemporaryDirectory(prefix = "jk_mediawiki_benchmark_") as tempDirPath:
+			scenarios = self.__buildScenarios(text, tempDirPath)
+			for scenarioName in scenarioNames:
+				setupFunc, runFunc = scenarios[scenarioName]
+				result = self.__runScenario(setupFunc, runFunc)
+				if scenarioName in [ "tokenize", "load" ]:
+					result["tokensPerSecond"] = (nTokens / result["seconds"]["min"]) if result["seconds"]["min"] > 0 else None
+				scenarioResults[scenarioName] = result
+
+		return {
+			"lines": text.count("\n"),
+			"bytes": len(text.encode("utf-8")),
+			"tokens": nTokens,
+			"statements": nStatements,
+			"variables": nVariables,
+			"scenarios": scenarioResults,
+		}
+	#
+
+	#
+	# Run all scenarios for files of the specified sizes.
+	#
+	# @param	int[] lineCounts			(optional) The sizes of the files to generate. If not specified <c>DEFAULT_LINE_COUNTS</c> is used.
+	# @param	str[] scenarioNames			(optional) The scenarios to run. If not specified all scenarios are run.
+	# @return	dict						The results. This data can be serialized to JSON directly.
+	#
+	def run(self, lineCounts:list = None, scenarioNames:list = None) -> dict:
+		if lineCounts is None:
+			lineCounts = LocalSettingsBenchmark.DEFAULT_LINE_COUNTS
+
+		return {
+			"version": __version__,
+			"python": platform.python_implementation() + " " + platform.python_version(),
+			"platform": platform.platform(),
+			"timeStamp": time.time(),
+			"seed": self.__generator.seed,
+			"repeat": self.__nRepeat,
+			"files": [ self.runFile(nLines, scenarioNames) for nLines in lineCounts ],
+		}
+	#
+
+	#
+	# Compare two results returned by <c>run()</c>.
+	#
+	# @param	dict baseline				The results to compare against.
+	# @param	dict current				The results to compare.
+	# @return	tuple[]						Returns 4-tuples: the file size in lines, the scenario name, the minimum duration of the baseline and
+	#										the ratio of the current minimum duration to the baseline minimum duration. (Values above 1.0 indicate
+	#										a slowdown.) Only scenarios present in both results are returned.
+	#
+	@staticmethod
+	def compare(baseline:dict, current:dict) -> list:
+		assert isinstance(baseline, dict)
+		assert isinstance(current, dict)
+
+		baselineFiles = { jFile["lines"]: jFile for jFile in baseline["files"] }
+
+		ret = []
+		for jFile in current["files"]:
+			jBaselineFile = baselineFiles.get(jFile["lines"])
+			if jBaselineFile is None:
+				continue
+			for scenarioName, jResult in jFile["scenarios"].items():
+				jBaselineResult = jBaselineFile["scenarios"].get(scenarioName)
+				if jBaselineResult is None:
+					continue
+				t0 = jBaselineResult["seconds"]["min"]
+				t1 = jResult["seconds"]["min"]
+				ret.append( ( jFile["lines"], scenarioName, t0, (t1 / t0) if t0 > 0 else None ) )
+		return ret
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,211 @@
+import random
+
+
+
+
+
+
+#
+# This class generates synthetic "LocalSettings.php" files for benchmarking.
+#
+# The files generated resemble files written by the MediaWiki installer and extended by administrators over time: scalar assignments,
+# arrays, indexed assignments (such as <c>$wgGroupPermissions['user']['edit'] = true;</c>), values appended to arrays, concatenations
+# referring to other variables, extensions loaded, line and block comments, empty lines and statements commented out with <c>#=#</c>.
+# Some constructs that are not recognized as statements by the parser (such as multi line arrays) are mixed in as well.
+#
+# The output depends on the seed only: The same seed and line count always produce the same text.
+#
+class LocalSettingsGenerator(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	__HEADER = """<?php
+# This file was automatically installed by the MediaWiki 1.35.0 installer.
+# If you make manual changes, please keep track in case you need to recreate them later.
+#
+# See includes/DefaultSettings.php for all configurable settings and their default values, but don't forget to make changes in _this_
+# file, not there.
+
+// Protect against web entry
+if ( !defined( 'MEDIAWIKI' ) ) {
+	exit;
+}
+
+$rootDirPath = "/srv/wikis/benchwiki";
+$dirName = 'benchwiki';
+$wgSitename = "BenchWiki";
+$wgMetaNamespace = "BenchWiki";
+$wgScriptPath = "";
+$wgServer = "http://localhost";
+$wgResourceBasePath = $wgScriptPath;
+$wgDBtype = "sqlite";
+$wgDBserver = "";
+$wgSQLiteDataDir = $rootDirPath . '/' . $dirName . "db";
+$wgCacheDirectory = __DIR__ . "/cache";
+$wgFileExtensions = array( 'png', 'gif', 'jpg', 'jpeg', 'doc' );
+$wgGroupPermissions['*']['edit'] = false;
+wfLoadSkin( 'Vector' );
+$wgDefaultSkin = "vector";
+
+"""
+
+	__WORDS = [
+		"wiki", "cache", "upload", "images", "main", "page", "user", "group", "edit", "read", "skin", "server", "path", "mail", "log",
+		"debug", "files", "extensions", "maintenance", "session", "job", "queue", "parser", "search", "index", "site", "file",
+	]
+
+	__GROUPS = [ "*", "user", "autoconfirmed", "bot", "sysop", "bureaucrat", "interface-admin", "suppress" ]
+
+	__RIGHTS = [ "read", "edit", "createpage", "createtalk", "upload", "move", "delete", "protect", "block", "import", "writeapi" ]
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int seed				The seed for the random number generator.
+	#
+	def __init__(self, seed:int = 1):
+		assert isinstance(seed, int)
+
+		self.__seed = seed
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def seed(self) -> int:
+		return self.__seed
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __randomText(self, rng:random.Random, nMin:int, nMax:int) -> str:
+		return " ".join([ rng.choice(LocalSettingsGenerator.__WORDS) for i in range(rng.randint(nMin, nMax)) ])
+	#
+
+	def __randomScalar(self, rng:random.Random) -> str:
+		k = rng.randrange(10)
+		if k < 3:
+			return "'" + self.__randomText(rng, 1, 4) + "'"
+		elif k < 5:
+			# double quoted strings with escape sequences: these need to be decoded
+			return "\"" + self.__randomText(rng, 1, 3).replace(" ", rng.choice([ "\\t", "\\n", "\\\\", " " ])) + "\""
+		elif k < 7:
+			return str(rng.randint(1, 10000000))
+		elif k < 9:
+			return rng.choice([ "true", "false" ])
+		else:
+			return "null"
+	#
+
+	def __randomArray(self, rng:random.Random) -> str:
+		values = ", ".join([ self.__randomScalar(rng) for i in range(rng.randint(0, 6)) ])
+		return "array( " + values + " )" if values else "array()"
+	#
+
+	#
+	# Generate the lines of a single block. A block is a statement, a comment or an empty line.
+	#
+	def __generateBlock(self, rng:random.Random, n:int, stringVarNames:list) -> list:
+		varName = "wgBench" + str(n)
+		k = rng.randrange(100)
+
+		if k < 22:
+			value = self.__randomScalar(rng)
+			if value[0] in "'\"":
+				stringVarNames.append(varName)
+			return [ "$" + varName + " = " + value + ";" ]
+		elif k < 30:
+			return [ "$" + varName + " = " + self.__randomArray(rng) + ";" ]
+		elif k < 42:
+			return [ "$wgGroupPermissions['" + rng.choice(LocalSettingsGenerator.__GROUPS) + "']['" + rng.choice(LocalSettingsGenerator.__RIGHTS)
+				+ "'] = " + rng.choice([ "true", "false" ]) + ";" ]
+		elif k < 47:
+			return [ "$wgNamespacesWithSubpages[" + str(rng.randint(1, 3000)) + "] = " + rng.choice([ "true", "false" ]) + ";" ]
+		elif k < 52:
+			return [ "$wgFileExtensions[] = '" + rng.choice(LocalSettingsGenerator.__WORDS)[:4] + "';" ]
+		elif k < 60:
+			# a concatenation referring to variables assigned before
+			parts = []
+			for i in range(rng.randint(2, 5)):
+				if stringVarNames and (rng.randrange(2) == 0):
+					parts.append("$" + rng.choice(stringVarNames))
+				else:
+					parts.append("'/" + rng.choice(LocalSettingsGenerator.__WORDS) + "'")
+			stringVarNames.append(varName)
+			return [ "$" + varName + " = " + " . ".join(parts) + ";" ]
+		elif k < 66:
+			return [ "wfLoadExtension( 'BenchExtension" + str(n) + "' );" ]
+		elif k < 72:
+			return [ rng.choice([ "# ", "// " ]) + self.__randomText(rng, 2, 12) ]
+		elif k < 74:
+			# a block comment: either plain text or statements commented out
+			lines = [ "/*" ]
+			for i in range(rng.randint(1, 6)):
+				if rng.randrange(2) == 0:
+					lines.append(" * " + self.__randomText(rng, 2, 12))
+				else:
+					lines.append("$" + varName + "_" + str(i) + " = " + self.__randomScalar(rng) + ";")
+			lines.append(" */")
+			return lines
+		elif k < 80:
+			return [ "#=# $" + varName + " = " + self.__randomScalar(rng) + ";" ]
+		elif k < 83:
+			# not recognized as a statement by the parser
+			lines = [ "$" + varName + " = array(" ]
+			for i in range(rng.randint(1, 5)):
+				lines.append("\t'" + rng.choice(LocalSettingsGenerator.__WORDS) + "',")
+			lines.append(");")
+			return lines
+		elif k < 85:
+			return [ "if ( $wgCommandLineMode ) {", "\t$" + varName + " = " + self.__randomScalar(rng) + ";", "}" ]
+		else:
+			return [ "" ]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Generate a file.
+	#
+	# @param	int nLines				The (approximate) number of lines to generate. The text generated is never shorter than this.
+	# @return	str						The PHP source code.
+	#
+	def generate(self, nLines:int) -> str:
+		assert isinstance(nLines, int)
+		assert nLines > 0
+
+		# seed with the line count as well: the files generated for different sizes should not be prefixes of each other
+		rng = random.Random(self.__seed * 1000003 + nLines)
+
+		lines = LocalSettingsGenerator.__HEADER.split("\n")
+		stringVarNames = [ "rootDirPath", "dirName", "wgSitename", "wgScriptPath", "wgServer" ]
+		n = 0
+		while len(lines) < nLines:
+			lines.extend(self.__generateBlock(rng, n, stringVarNames))
+			n += 1
+
+		return "\n".join(lines) + "\n"
+	#
+
+#
+
+
+
+
+
+
+
+
+
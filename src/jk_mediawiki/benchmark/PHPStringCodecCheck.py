@@ -0,0 +1,189 @@
+import random
+
+
+from ..impl.lang_support_php import PHPTokenizer, PHP, tokenValueToPHP
+from ..lsfile.MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+
+
+
+
+
+
+#
+# This class verifies the PHP string codec: <c>PHP.encodeString()</c>, <c>PHP.decodeString()</c> and their counterparts for single quoted
+# strings.
+#
+# Two kinds of checks are performed:
+#
+# * Conformance: PHP string literals are tokenized and the values are compared with the values PHP produces. This covers escape sequences
+#	in double quoted strings (NUL, hexadecimal and octal values, "\u{...}", unknown escape sequences) as well as the rules for single quoted
+#	strings (only "\\" and "\'" are escape sequences).
+# * Round trip: Random strings - containing NUL characters followed by digits, control characters, quotes, backslashes, "$" and non-ASCII
+#	characters - are encoded as single and double quoted string literals. Then each literal is tokenized (as text and as binary data) and
+#	parsed as part of an assignment in a "LocalSettings.php" file. The values must be the same as the strings encoded.
+#
+class PHPStringCodecCheck(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	DEFAULT_STRING_COUNT = 10000
+
+	# 2-tuples: a PHP string literal and the value PHP produces for it
+	__LITERALS = [
+		# double quoted
+		( r'"abc"', "abc" ),
+		( r'"a\nb\tc\rd\ve\ef\f"', "a\nb\tc\rd\ve\x1bf\f" ),
+		( r'"\\ \$ \""', "\\ $ \"" ),
+		( r'"\0"', "\x00" ),
+		( r'"\0001"', "\x001" ),
+		( r'"\x001"', "\x001" ),
+		( r'"\101\60\7"', "A0\x07" ),
+		( r'"\400"', "\x00" ),
+		( r'"\x41\x4a\x4"', "AJ\x04" ),
+		( r'"\xg"', "\\xg" ),
+		( r'"\u{41}\u{e4}\u{1F600}"', "A\u00e4\U0001F600" ),
+		( r'"\q\'\8"', "\\q\\'\\8" ),
+		( r'"C:\path\to"', "C:\\path\to" ),
+		( '"a\nb"', "a\nb" ),
+		# single quoted
+		( r"'abc'", "abc" ),
+		( r"'it\'s'", "it's" ),
+		( r"'\\'", "\\" ),
+		( r"'a\\b\c'", "a\\b\\c" ),
+		( r"'\n\t\x41\101\0\$'", "\\n\\t\\x41\\101\\0\\$" ),
+		( r"'\"'", "\\\"" ),
+		( r"'$x'", "$x" ),
+		( "'a\nb'", "a\nb" ),
+	]
+
+	# Characters the random strings are built from. Sequences that are difficult to encode are more frequent.
+	__ALPHABET = [
+		"a", "b", "x", "u", "0", "1", "7", "8", " ", "{", "}", "$", "'", "\"", "\\", "\\\\", "\\'", "\\n", "\\x4", "\\0",
+		"\x00", "\x001", "\x01", "\t", "\n", "\r", "\x0b", "\x1b", "\x7f", "\u00e4", "\u20ac", "\U0001F600",
+	]
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int seed					The seed for generating the random strings.
+	# @param	int nStrings				The number of random strings to check.
+	#
+	def __init__(self, seed:int = 1, nStrings:int = None):
+		if nStrings is None:
+			nStrings = PHPStringCodecCheck.DEFAULT_STRING_COUNT
+		assert isinstance(seed, int)
+		assert isinstance(nStrings, int)
+		assert nStrings >= 0
+
+		self.__seed = seed
+		self.__nStrings = nStrings
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Tokenize a single string literal as text and as binary data.
+	#
+	# @return	tuple[]						Returns the token type and value for both ways of tokenizing.
+	#
+	@staticmethod
+	def __tokenize(literal:str) -> list:
+		ret = []
+		for tokens in [
+				PHPTokenizer.instance().tokenize(literal),
+				PHPTokenizer.instance().tokenizeBuffer(literal.encode("utf-8")),
+			]:
+			try:
+				tokens = list(tokens)
+			except Exception as ee:
+				ret.append(( "error", str(ee) ))
+				continue
+			if len(tokens) == 1:
+				ret.append(( tokens[0].type, tokens[0].value ))
+			else:
+				ret.append(( "tokens", [ ( t.type, t.value ) for t in tokens ] ))
+		return ret
+	#
+
+	#
+	# Parse a string literal as part of an assignment.
+	#
+	@staticmethod
+	def __parse(literal:str):
+		lsFile = MediaWikiLocalSettingsFile()
+		lsFile.load(rawText = "<?php\n$wgValue = " + literal + ";\n")
+		return lsFile.getVarValue("wgValue")
+	#
+
+	def __checkLiteral(self, literal:str, dataType:str, value:str) -> list:
+		ret = []
+		for result in PHPStringCodecCheck.__tokenize(literal):
+			if result != ( dataType, value ):
+				ret.append(repr(literal) + ": expected " + repr(( dataType, value )) + " but got " + repr(result))
+				break
+		try:
+			v = PHPStringCodecCheck.__parse(literal)
+		except Exception as ee:
+			v = ee
+		if v != value:
+			ret.append(repr(literal) + ": parsing the assignment resulted in " + repr(v) + " instead of " + repr(value))
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Run the check.
+	#
+	# @return	dict						The results. This data can be serialized to JSON directly.
+	#
+	def run(self) -> dict:
+		failures = []
+
+		for literal, value in PHPStringCodecCheck.__LITERALS:
+			failures.extend(self.__checkLiteral(literal, "str1" if literal.startswith("'") else "str2", value))
+
+		rng = random.Random(self.__seed)
+		for i in range(self.__nStrings):
+			value = "".join([ rng.choice(PHPStringCodecCheck.__ALPHABET) for j in range(rng.randrange(12)) ])
+			for dataType in [ "str1", "str2" ]:
+				literal = tokenValueToPHP(dataType, value)
+				if (dataType == "str2") and ("\n" in literal):
+					# (single quoted strings can't contain escaped line breaks)
+					failures.append(repr(literal) + ": the literal contains a line break")
+				failures.extend(self.__checkLiteral(literal, dataType, value))
+			if PHP.decodeString(PHP.encodeString(value)) != value:
+				failures.append(repr(value) + ": PHP.decodeString(PHP.encodeString(...)) differs")
+			if PHP.decodeSingleQuotedString(PHP.encodeSingleQuotedString(value)) != value:
+				failures.append(repr(value) + ": PHP.decodeSingleQuotedString(PHP.encodeSingleQuotedString(...)) differs")
+
+		return {
+			"seed": self.__seed,
+			"literals": len(PHPStringCodecCheck.__LITERALS),
+			"strings": self.__nStrings,
+			"failures": failures[:100],
+			"failureCount": len(failures),
+			"success": not failures,
+		}
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,251 @@
+import os
+import pwd
+import grp
+import shutil
+import tempfile
+
+
+from ..impl.ProcFSProcessProvider import ProcFSProcessProvider
+
+
+
+
+
+
+#
+# This class verifies <c>ProcFSProcessProvider</c> against a fake "/proc" file system.
+#
+# A temporary directory is filled with "[pid]/stat", "[pid]/status" and "[pid]/cmdline" files of processes that are difficult to parse:
+#
+# * a command name containing spaces and parentheses and an argument containing spaces,
+# * NGINX and PHP-FPM processes that have overwritten their arguments with a process title,
+# * a kernel thread and a zombie process (no arguments at all),
+# * a process of a different user (this requires the permission to change the owner of a directory),
+# * processes that terminate while they are read: a "[pid]" entry that vanishes before its owner is checked and a "[pid]" directory
+#	that vanishes after "stat" has been read.
+#
+# Then the records returned by the process provider are compared with the records expected.
+#
+class ProcFSProcessProviderCheck(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	def __init__(self):
+		self.__uid = os.getuid()
+		self.__gid = os.getgid()
+		self.__otherUID = 65534 if self.__uid == 0 else 0
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __statLine(pid:int, comm:str, state:str, ppid:int, session:int, ttyNr:int = 0, tpgid:int = -1, nice:int = 0, nThreads:int = 1) -> str:
+		# fields 1 to 22 as documented in proc(5); all other fields are of no interest here
+		return " ".join([
+			str(pid), "(" + comm + ")", state, str(ppid), str(pid), str(session), str(ttyNr), str(tpgid),
+			"4194560", "100", "0", "0", "0", "5", "3", "0", "0", "20", str(nice), str(nThreads), "0", "12345",
+		]) + "\n"
+	#
+
+	@staticmethod
+	def __statusText(comm:str, uid:int, gid:int) -> str:
+		return "".join([
+			"Name:\t" + comm + "\n",
+			"Uid:\t{0}\t{0}\t{0}\t{0}\n".format(uid),
+			"Gid:\t{0}\t{0}\t{0}\t{0}\n".format(gid),
+			"VmLck:\t       0 kB\n",
+		])
+	#
+
+	@staticmethod
+	def __writeFile(filePath:str, data):
+		with open(filePath, "wb") as f:
+			f.write(data.encode("utf-8") if isinstance(data, str) else data)
+	#
+
+	def __createProcess(self, procRootDirPath:str, pid:int, statLine:str, cmdLine:bytes, uid:int = None) -> str:
+		if uid is None:
+			uid = self.__uid
+		comm = statLine[statLine.find("(")+1:statLine.rfind(")")]
+		pidDirPath = os.path.join(procRootDirPath, str(pid))
+		os.mkdir(pidDirPath)
+		ProcFSProcessProviderCheck.__writeFile(os.path.join(pidDirPath, "stat"), statLine)
+		ProcFSProcessProviderCheck.__writeFile(os.path.join(pidDirPath, "status"), ProcFSProcessProviderCheck.__statusText(comm, uid, self.__gid))
+		ProcFSProcessProviderCheck.__writeFile(os.path.join(pidDirPath, "cmdline"), cmdLine)
+		return pidDirPath
+	#
+
+	def __record(self, ppid:int, pid:int, tty, stat:str, cmd:str, args:str, argsList:list, uid:int = None) -> dict:
+		if uid is None:
+			uid = self.__uid
+		try:
+			userName = pwd.getpwuid(uid).pw_name
+		except KeyError as ee:
+			userName = None
+		try:
+			groupName = grp.getgrgid(self.__gid).gr_name
+		except KeyError as ee:
+			groupName = None
+		ret = {
+			"ppid": ppid,
+			"pid": pid,
+			"tty": tty,
+			"stat": stat,
+			"uid": uid,
+			"gid": self.__gid,
+			"cmd": cmd,
+			"user": userName,
+			"group": groupName,
+			"args_list": argsList,
+		}
+		if args:
+			ret["args"] = args
+		return ret
+	#
+
+	#
+	# Fill the fake "proc" file system.
+	#
+	# @return	dict[] expected				The records expected if all processes are listed.
+	# @return	int[] otherUserPIDs			The IDs of the processes of the other user. (Empty if the owner could not be changed.)
+	#
+	def __createProcFS(self, procRootDirPath:str) -> tuple:
+		statLine = ProcFSProcessProviderCheck.__statLine
+		expected = []
+
+		os.mkdir(os.path.join(procRootDirPath, "self"))
+		ProcFSProcessProviderCheck.__writeFile(os.path.join(procRootDirPath, "self", "stat"), statLine(1, "init", "S", 0, 1))
+
+		# a kernel thread
+		self.__createProcess(procRootDirPath, 2, statLine(2, "kthreadd", "S", 0, 0), b"")
+		expected.append(self.__record(0, 2, None, "S", "[kthreadd]", None, []))
+
+		# command name with spaces and parentheses, an argument with spaces, a terminal, multiple threads
+		self.__createProcess(procRootDirPath, 100, statLine(100, "tmux: (server) 1", "S", 1, 100, ttyNr = (136 << 8) | 3, tpgid = 100, nThreads = 4),
+			b"tmux\0new-session\0-s\0my session\0")
+		expected.append(self.__record(1, 100, "pts/3", "Ssl+", "tmux", "new-session -s my session", [ "new-session", "-s", "my session" ]))
+
+		# NGINX: the process title overwrites the arguments and is padded with NUL characters
+		self.__createProcess(procRootDirPath, 200, statLine(200, "nginx", "S", 1, 200),
+			b"nginx: master process nginx -c /srv/wikis/etc/nginx/nginx.conf -p /srv/wikis/" + b"\0" * 24)
+		expected.append(self.__record(1, 200, None, "Ss", "nginx:", "master process nginx -c /srv/wikis/etc/nginx/nginx.conf -p /srv/wikis/", []))
+		self.__createProcess(procRootDirPath, 201, statLine(201, "nginx", "S", 200, 200), b"nginx: worker process" + b"\0" * 48)
+		expected.append(self.__record(200, 201, None, "S", "nginx:", "worker process", []))
+
+		# PHP-FPM: the process title overwrites the arguments
+		self.__createProcess(procRootDirPath, 300, statLine(300, "php-fpm7.4", "S", 1, 300, nice = -5),
+			b"php-fpm: master process (/srv/wikis/etc/php/7.4/fpm/php-fpm.conf)\0\0\0")
+		expected.append(self.__record(1, 300, None, "S<s", "php-fpm:", "master process (/srv/wikis/etc/php/7.4/fpm/php-fpm.conf)", []))
+		self.__createProcess(procRootDirPath, 301, statLine(301, "php-fpm7.4", "S", 300, 300, nice = 5), b"php-fpm: pool www\0\0\0\0\0\0")
+		expected.append(self.__record(300, 301, None, "SN", "php-fpm:", "pool www", []))
+
+		# a zombie
+		self.__createProcess(procRootDirPath, 400, statLine(400, "php", "Z", 1, 1), b"")
+		expected.append(self.__record(1, 400, None, "Z", "[php]", "<defunct>", []))
+
+		# a process of a different user
+		otherUserPIDs = []
+		pidDirPath = self.__createProcess(procRootDirPath, 500, statLine(500, "sshd", "S", 1, 500), b"sshd: root@pts/0\0", uid = self.__otherUID)
+		try:
+			os.chown(pidDirPath, self.__otherUID, -1)
+			otherUserPIDs.append(500)
+			expected.append(self.__record(1, 500, None, "Ss", "sshd:", "root@pts/0", [], uid = self.__otherUID))
+		except PermissionError as ee:
+			shutil.rmtree(pidDirPath)
+
+		# a process that terminates after it has been listed: the directory entry refers to nothing
+		os.symlink(os.path.join(procRootDirPath, "does-not-exist"), os.path.join(procRootDirPath, "600"))
+
+		# a process that terminates while it is read: only "stat" could be read
+		pidDirPath = os.path.join(procRootDirPath, "601")
+		os.mkdir(pidDirPath)
+		ProcFSProcessProviderCheck.__writeFile(os.path.join(pidDirPath, "stat"), statLine(601, "sleep", "S", 1, 1))
+
+		return expected, otherUserPIDs
+	#
+
+	@staticmethod
+	def __compare(name:str, expected:list, actual:list) -> list:
+		ret = []
+		expectedByPID = { x["pid"]: x for x in expected }
+		actualByPID = { x["pid"]: x for x in actual }
+		for pid in sorted(set(expectedByPID) | set(actualByPID)):
+			x = expectedByPID.get(pid)
+			y = actualByPID.get(pid)
+			if x is None:
+				ret.append(name + ": unexpected process " + str(pid) + ": " + repr(y))
+			elif y is None:
+				ret.append(name + ": missing process " + str(pid))
+			elif x != y:
+				ret.append(name + ": process " + str(pid) + " differs: expected " + repr(x) + " but got " + repr(y))
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Run the check.
+	#
+	# @return	dict						The results. This data can be serialized to JSON directly.
+	#
+	def run(self) -> dict:
+		messages = []
+		skipped = []
+
+		with tempfile.TemporaryDirectory() as procRootDirPath:
+			expected, otherUserPIDs = self.__createProcFS(procRootDirPath)
+			if not otherUserPIDs:
+				skipped.append("processes of other users (the owner of a directory can not be changed)")
+
+			if not ProcFSProcessProvider.isAvailable(procRootDirPath):
+				messages.append("isAvailable() returned False")
+
+			# all processes
+			actual = list(ProcFSProcessProvider(procRootDirPath = procRootDirPath).listProcesses())
+			messages.extend(ProcFSProcessProviderCheck.__compare("all users", expected, actual))
+			if [ x["pid"] for x in actual ] != sorted([ x["pid"] for x in actual ]):
+				messages.append("all users: processes are not sorted by process ID")
+
+			# the processes of the current user only
+			expectedOwn = [ x for x in expected if x["pid"] not in otherUserPIDs ]
+			actual = list(ProcFSProcessProvider(uid = self.__uid, procRootDirPath = procRootDirPath).listProcesses())
+			messages.extend(ProcFSProcessProviderCheck.__compare("current user", expectedOwn, actual))
+
+			# single processes
+			provider = ProcFSProcessProvider(procRootDirPath = procRootDirPath)
+			for x in expected:
+				y = provider.readProcess(x["pid"])
+				if y != x:
+					messages.append("readProcess(" + str(x["pid"]) + "): expected " + repr(x) + " but got " + repr(y))
+			for pid in [ 600, 601, 999 ]:
+				y = provider.readProcess(pid)
+				if y is not None:
+					messages.append("readProcess(" + str(pid) + "): expected None but got " + repr(y))
+
+		return {
+			"processes": len(expected),
+			"skipped": skipped,
+			"failures": messages,
+			"success": not messages,
+		}
+	#
+
+#
+
+
+
+
+
+
+
+
+
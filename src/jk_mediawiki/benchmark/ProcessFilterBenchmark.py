@@ -0,0 +1,232 @@
+import gc
+import time
+import random
+import platform
+import statistics
+
+
+from .. import __version__
+from ..impl.ProcessFilter import ProcessFilter
+from ..impl.ProcessSnapshot import ProcessSnapshot
+from ..impl.WikiCronProcessFilter import WikiCronProcessFilter
+from ..impl.WikiPHPProcessFilter import WikiPHPProcessFilter
+from ..impl.WikiNGINXProcessFilter import WikiNGINXProcessFilter
+
+
+
+
+
+
+#
+# This class runs timed scenarios against the process filters and reports the results as JSON compatible data.
+#
+# A synthetic process list is generated: a PHP-FPM master process with its pool processes, an NGINX master process with its workers, a
+# "runJobs.php" process for some of the wikis and a lot of unrelated processes of different users. The following scenarios are run:
+#
+# * <c>scalar</c>: Filter by user name and command.
+# * <c>strings</c>: Filter by command and string tests on the arguments (starts with, ends with, contains any of multiple values).
+# * <c>args</c>: Filter by exact argument and an argument ending with any of multiple values.
+# * <c>ppidRewrite</c>: Assign a different parent process ID to the same filter repeatedly and filter again every time.
+# * <c>wikiFilters</c>: Run the PHP, NGINX and cron filters of all wikis on a plain list of processes.
+# * <c>wikiFiltersSnapshot</c>: Run the same filters on a process snapshot. (The indexes are built during the first run.)
+#
+# Except for <c>wikiFiltersSnapshot</c> all scenarios filter a plain list, so every process is tested.
+#
+class ProcessFilterBenchmark(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	DEFAULT_PROCESS_COUNT = 50000
+
+	SCENARIO_NAMES = [ "scalar", "strings", "args", "ppidRewrite", "wikiFilters", "wikiFiltersSnapshot" ]
+
+	__USER_NAME = "wikiuser"
+
+	__WIKI_COUNT = 300
+
+	__PPID_REWRITE_COUNT = 20
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int seed					The seed for generating the process list.
+	# @param	int nRepeat					The number of times each scenario is run.
+	#
+	def __init__(self, seed:int = 1, nRepeat:int = 5):
+		assert isinstance(seed, int)
+		assert isinstance(nRepeat, int)
+		assert nRepeat > 0
+
+		self.__seed = seed
+		self.__nRepeat = nRepeat
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __wikiDirPath(i:int) -> str:
+		return "/srv/wikis/wiki" + str(i) + "/wiki" + str(i) + "-1.35"
+	#
+
+	#
+	# Generate a synthetic process list.
+	#
+	def __generate(self, nProcesses:int) -> list:
+		rng = random.Random(self.__seed)
+		userName = ProcessFilterBenchmark.__USER_NAME
+		ret = []
+
+		def add(ppid:int, user:str, cmd:str, args:list) -> int:
+			x = {
+				"ppid": ppid,
+				"pid": len(ret) + 100,
+				"tty": None,
+				"stat": "S",
+				"uid": 1000 if user == userName else 0,
+				"gid": 1000 if user == userName else 0,
+				"cmd": cmd,
+				"user": user,
+				"group": user,
+				"args_list": args,
+			}
+			if args:
+				x["args"] = " ".join(args)
+			ret.append(x)
+			return x["pid"]
+
+		phpPID = add(1, userName, "php-fpm:", [ "master", "process", "(/srv/wikis/etc/php/7.4/fpm/php-fpm.conf)" ])
+		for i in range(16):
+			add(phpPID, userName, "php-fpm:", [ "pool", "www" ])
+		nginxPID = add(1, userName, "nginx:", [ "master", "process", "nginx", "-c", "/srv/wikis/etc/nginx/nginx.conf", "-p", "/srv/wikis/" ])
+		for i in range(8):
+			add(nginxPID, userName, "nginx:", [ "worker", "process" ])
+		for i in range(0, ProcessFilterBenchmark.__WIKI_COUNT, 2):
+			add(1, userName, "php", [ ProcessFilterBenchmark.__wikiDirPath(i) + "/maintenance/runJobs.php", "--wait" ])
+
+		commands = [ "bash", "sleep", "python3", "php", "sshd:", "systemd", "cron", "node", "java", "postgres:" ]
+		users = [ userName, "root", "www-data", "postgres", "backup" ]
+		while len(ret) < nProcesses:
+			args = [ "--" + rng.choice([ "verbose", "config", "port", "wait", "daemon" ]) for i in range(rng.randrange(5)) ]
+			if rng.randrange(3) == 0:
+				args.append("/srv/data/file" + str(rng.randrange(100000)) + rng.choice([ ".php", ".conf", ".log" ]))
+			add(rng.randrange(1, len(ret) + 100), rng.choice(users), rng.choice(commands), args)
+
+		return ret
+	#
+
+	#
+	# Build the scenarios.
+	#
+	# @return	dict						Maps scenario names to functions that run the scenario and return the number of processes found.
+	#
+	def __buildScenarios(self, processes:list) -> dict:
+		userName = ProcessFilterBenchmark.__USER_NAME
+		source = lambda: processes
+		snapshot = ProcessSnapshot(processes)
+		snapshotSource = lambda: snapshot
+		ppids = [ x["pid"] for x in processes[:ProcessFilterBenchmark.__PPID_REWRITE_COUNT] ]
+
+		scalarFilter = ProcessFilter(source = source, userName = userName, cmdExact = [ "php", "php-fpm:" ])
+		stringsFilter = ProcessFilter(source = source, cmdExact = "php-fpm:", argsStartsWith = "master process",
+			argsEndsWith = "/fpm/php-fpm.conf)", argsContains = [ "/etc/php/", "/etc/php7/", "/etc/php8/" ])
+		argsFilter = ProcessFilter(source = source, argExact = "--wait", argEndsWith = [ ".php", ".conf" ])
+		ppidFilter = ProcessFilter(source = source, userName = userName, cmdExact = "php-fpm:", argsExact = "pool www")
+
+		def runPPIDRewrite() -> int:
+			n = 0
+			for ppid in ppids:
+				ppidFilter.ppid = ppid
+				n += len(ppidFilter.listProcesses())
+			return n
+
+		def runWikiFilters(source) -> int:
+			n = len(WikiPHPProcessFilter(userName, source).listProcesses())
+			n += len(WikiNGINXProcessFilter(userName, source).listProcesses())
+			for i in range(ProcessFilterBenchmark.__WIKI_COUNT):
+				n += len(WikiCronProcessFilter(userName, ProcessFilterBenchmark.__wikiDirPath(i), source).listProcesses())
+			return n
+
+		return {
+			"scalar": lambda: len(scalarFilter.listProcesses()),
+			"strings": lambda: len(stringsFilter.listProcesses()),
+			"args": lambda: len(argsFilter.listProcesses()),
+			"ppidRewrite": runPPIDRewrite,
+			"wikiFilters": lambda: runWikiFilters(source),
+			"wikiFiltersSnapshot": lambda: runWikiFilters(snapshotSource),
+		}
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Run the scenarios.
+	#
+	# @param	int nProcesses				(optional) The number of processes to generate. If not specified <c>DEFAULT_PROCESS_COUNT</c> is used.
+	# @param	str[] scenarioNames			(optional) The scenarios to run. If not specified all scenarios are run.
+	# @return	dict						The results. This data can be serialized to JSON directly.
+	#
+	def run(self, nProcesses:int = None, scenarioNames:list = None) -> dict:
+		if nProcesses is None:
+			nProcesses = ProcessFilterBenchmark.DEFAULT_PROCESS_COUNT
+		assert isinstance(nProcesses, int)
+		if scenarioNames is None:
+			scenarioNames = ProcessFilterBenchmark.SCENARIO_NAMES
+		else:
+			for scenarioName in scenarioNames:
+				if scenarioName not in ProcessFilterBenchmark.SCENARIO_NAMES:
+					raise Exception("No such scenario: " + repr(scenarioName))
+
+		processes = self.__generate(nProcesses)
+		scenarios = self.__buildScenarios(processes)
+
+		scenarioResults = {}
+		for scenarioName in scenarioNames:
+			runFunc = scenarios[scenarioName]
+			durations = []
+			nFound = 0
+			for i in range(self.__nRepeat):
+				gc.collect()
+				t0 = time.perf_counter()
+				nFound = runFunc()
+				durations.append(time.perf_counter() - t0)
+			scenarioResults[scenarioName] = {
+				"seconds": {
+					"min": min(durations),
+					"median": statistics.median(durations),
+					"mean": statistics.mean(durations),
+				},
+				"processesFound": nFound,
+			}
+
+		return {
+			"version": __version__,
+			"python": platform.python_implementation() + " " + platform.python_version(),
+			"platform": platform.platform(),
+			"timeStamp": time.time(),
+			"seed": self.__seed,
+			"repeat": self.__nRepeat,
+			"processes": len(processes),
+			"scenarios": scenarioResults,
+		}
+	#
+
+#
+
+
+
+
+
+
+
+
+
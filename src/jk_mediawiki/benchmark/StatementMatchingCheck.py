@@ -0,0 +1,205 @@
+import random
+
+
+from ..impl.lang_support_php import PHPTokenizer
+from ..lsfile.MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from .LocalSettingsGenerator import LocalSettingsGenerator
+
+
+
+
+
+
+#
+# This class verifies that the compiled statement matching of the "LocalSettings.php" parser produces exactly the same results as
+# interpreting the statement patterns does.
+#
+# Each text is parsed twice: once using the compiled state machines and once interpreting the patterns. Then the statements parsed are
+# compared. In order to detect statements that cover different tokens all statements are toggled (activated or deactivated) and the text
+# rendered from both files is compared as well.
+#
+# The corpus consists of files created by <c>LocalSettingsGenerator</c> and of variants of these files that are damaged on purpose: tokens
+# are removed, duplicated and moved around randomly. This way a lot of incomplete and malformed statements are tested as well.
+#
+class StatementMatchingCheck(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	DEFAULT_LINE_COUNTS = [ 100, 1000, 10000 ]
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int seed					The seed for generating the files and mutating them.
+	# @param	int nVariants				The number of damaged variants to check for every file generated.
+	#
+	def __init__(self, seed:int = 1, nVariants:int = 10):
+		assert isinstance(seed, int)
+		assert isinstance(nVariants, int)
+		assert nVariants >= 0
+
+		self.__seed = seed
+		self.__generator = LocalSettingsGenerator(seed)
+		self.__nVariants = nVariants
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __load(text:str, bInterpret:bool) -> MediaWikiLocalSettingsFile:
+		MediaWikiLocalSettingsFile._bInterpretStatementPatterns = bInterpret
+		try:
+			lsFile = MediaWikiLocalSettingsFile()
+			lsFile.load(rawText = text)
+			return lsFile
+		finally:
+			MediaWikiLocalSettingsFile._bInterpretStatementPatterns = False
+	#
+
+	@staticmethod
+	def __describe(lsFile:MediaWikiLocalSettingsFile) -> list:
+		return [ ( stype, item.lineNo, item.colNo, item.isActive, item.toPHP() ) for stype, item in lsFile.iterStatements() ]
+	#
+
+	@staticmethod
+	def __toggleAll(lsFile:MediaWikiLocalSettingsFile):
+		for stype, item in lsFile.iterStatements():
+			if item.isActive:
+				item.deactivate()
+			else:
+				item.activate()
+	#
+
+	#
+	# Damage a text by removing, duplicating and moving tokens randomly.
+	#
+	@staticmethod
+	def __mutate(rng:random.Random, text:str, nMutations:int) -> str:
+		parts = [ text[start:end] for start, end, token in PHPTokenizer.instance().tokenize(text, bEmitWhiteSpaces = True,
+			bEmitComments = True, bEmitNewLines = True, bEmitOffsets = True) ]
+		for i in range(nMutations):
+			if len(parts) < 2:
+				break
+			k = rng.randrange(len(parts))
+			action = rng.randrange(3)
+			if action == 0:
+				del parts[k]
+			elif action == 1:
+				parts.insert(k, parts[k])
+			else:
+				parts.insert(k, parts[rng.randrange(len(parts))])
+		return "".join(parts)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Verify a single text.
+	#
+	# @param	str text					The PHP source code.
+	# @return	str[]						Returns messages describing the differences found. (An empty list is returned if no differences exist.)
+	#
+	def checkText(self, text:str) -> list:
+		assert isinstance(text, str)
+
+		try:
+			lsFileCompiled = StatementMatchingCheck.__load(text, False)
+		except Exception as ee:
+			lsFileCompiled = ee
+		try:
+			lsFileInterpreted = StatementMatchingCheck.__load(text, True)
+		except Exception as ee:
+			lsFileInterpreted = ee
+
+		if isinstance(lsFileCompiled, Exception) or isinstance(lsFileInterpreted, Exception):
+			if isinstance(lsFileCompiled, Exception) and isinstance(lsFileInterpreted, Exception) \
+				and (str(lsFileCompiled) == str(lsFileInterpreted)):
+				# the text can't be parsed at all
+				return []
+			return [ "Parsing results differ: " + repr(lsFileCompiled) + " vs. " + repr(lsFileInterpreted) ]
+
+		ret = []
+		stmtsCompiled = StatementMatchingCheck.__describe(lsFileCompiled)
+		stmtsInterpreted = StatementMatchingCheck.__describe(lsFileInterpreted)
+		if stmtsCompiled != stmtsInterpreted:
+			for a, b in zip(stmtsCompiled, stmtsInterpreted):
+				if a != b:
+					ret.append("Statements differ: " + repr(a) + " vs. " + repr(b))
+					break
+			if len(stmtsCompiled) != len(stmtsInterpreted):
+				ret.append("Number of statements differs: " + str(len(stmtsCompiled)) + " vs. " + str(len(stmtsInterpreted)))
+
+		StatementMatchingCheck.__toggleAll(lsFileCompiled)
+		StatementMatchingCheck.__toggleAll(lsFileInterpreted)
+		if lsFileCompiled.toStr() != lsFileInterpreted.toStr():
+			ret.append("Texts rendered differ")
+
+		return ret
+	#
+
+	#
+	# Verify files of the specified sizes and damaged variants of them.
+	#
+	# @param	int[] lineCounts			(optional) The sizes of the files to generate. If not specified <c>DEFAULT_LINE_COUNTS</c> is used.
+	# @param	str[] texts					(optional) Additional texts to verify (e.g. existing "LocalSettings.php" files).
+	# @return	dict						The results. This data can be serialized to JSON directly.
+	#
+	def run(self, lineCounts:list = None, texts:list = None) -> dict:
+		if lineCounts is None:
+			lineCounts = StatementMatchingCheck.DEFAULT_LINE_COUNTS
+		rng = random.Random(self.__seed)
+
+		corpus = []
+		for nLines in lineCounts:
+			text = self.__generator.generate(nLines)
+			corpus.append(( "generated:" + str(nLines), text ))
+			for i in range(self.__nVariants):
+				corpus.append(( "generated:" + str(nLines) + ":variant:" + str(i), StatementMatchingCheck.__mutate(rng, text, max(1, nLines // 5)) ))
+		if texts:
+			for i, text in enumerate(texts):
+				corpus.append(( "text:" + str(i), text ))
+
+		nStatements = 0
+		failures = []
+		for name, text in corpus:
+			messages = self.checkText(text)
+			if messages:
+				failures.append({
+					"name": name,
+					"messages": messages,
+				})
+			else:
+				try:
+					nStatements += sum(1 for x in StatementMatchingCheck.__load(text, False).iterStatements())
+				except Exception as ee:
+					pass
+
+		return {
+			"seed": self.__seed,
+			"texts": len(corpus),
+			"statements": nStatements,
+			"failures": failures,
+			"success": not failures,
+		}
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,13 @@
+__version__ = "0.2022.1.12.1"
+
+
+
+from .LocalSettingsGenerator import LocalSettingsGenerator
+from .LocalSettingsBenchmark import LocalSettingsBenchmark
+from .StatementMatchingCheck import StatementMatchingCheck
+from .LegacyPHPStringCodec import LegacyPHPStringCodec
+from .PHPStringCodecCheck import PHPStringCodecCheck
+from .ProcessFilterBenchmark import ProcessFilterBenchmark
+from .ProcFSProcessProviderCheck import ProcFSProcessProviderCheck
+
+
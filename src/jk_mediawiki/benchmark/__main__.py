@@ -0,0 +1,120 @@
+#
+# Run the "LocalSettings.php" parser benchmark:
+#
+#	python3 -m jk_mediawiki.benchmark [--seed 1] [--lines 100,1000,10000,100000] [--repeat 5] [--output result.json] [--compare baseline.json]
+#
+# The results are written as JSON. If a baseline is specified the ratio of the durations to the durations of the baseline is printed to
+# STDERR for each scenario.
+#
+# Verify that the compiled statement matching produces the same results as interpreting the statement patterns (instead of running the
+# benchmark):
+#
+#	python3 -m jk_mediawiki.benchmark --verify [--seed 1] [--lines 100,1000,10000] [--variants 10] [LocalSettings.php ...]
+#
+# The exit code is 1 if differences have been found.
+#
+# Verify the PHP string codec: string literals are decoded the way PHP decodes them and random strings survive a round trip through
+# encoding, tokenizing and parsing (instead of running the benchmark):
+#
+#	python3 -m jk_mediawiki.benchmark --verify-codec [--seed 1] [--strings 10000]
+#
+# The exit code is 1 if differences have been found.
+#
+# Verify the process provider reading "/proc" against a fake "/proc" file system (instead of running the benchmark):
+#
+#	python3 -m jk_mediawiki.benchmark --verify-procfs
+#
+# The exit code is 1 if differences have been found.
+#
+# Run the process filter benchmark (instead of the parser benchmark):
+#
+#	python3 -m jk_mediawiki.benchmark --process-filter [--seed 1] [--processes 50000] [--repeat 5] [--scenarios ...] [--output result.json]
+#
+
+
+
+import sys
+import json
+import argparse
+
+
+from .LocalSettingsBenchmark import LocalSettingsBenchmark
+from .StatementMatchingCheck import StatementMatchingCheck
+from .PHPStringCodecCheck import PHPStringCodecCheck
+from .ProcessFilterBenchmark import ProcessFilterBenchmark
+from .ProcFSProcessProviderCheck import ProcFSProcessProviderCheck
+
+
+
+
+
+argParser = argparse.ArgumentParser(prog = "python3 -m jk_mediawiki.benchmark", description = "Benchmark the LocalSettings.php parser.")
+argParser.add_argument("--seed", type = int, default = 1, help = "The seed for generating the files.")
+argParser.add_argument("--lines", type = str, default = None,
+	help = "The sizes of the files to generate: a comma separated list of line counts.")
+argParser.add_argument("--repeat", type = int, default = 5, help = "The number of times each scenario is run.")
+argParser.add_argument("--scenarios", type = str, default = None,
+	help = "The scenarios to run: a comma separated list of " + ", ".join(LocalSettingsBenchmark.SCENARIO_NAMES)
+		+ " (or " + ", ".join(ProcessFilterBenchmark.SCENARIO_NAMES) + " for the process filter benchmark).")
+argParser.add_argument("--no-memory", action = "store_true", help = "Don't measure peak memory.")
+argParser.add_argument("--output", type = str, default = None, help = "The file to write the results to. (Default: STDOUT)")
+argParser.add_argument("--compare", type = str, default = None, help = "A file containing the results of a previous run to compare against.")
+argParser.add_argument("--verify", action = "store_true", help = "Verify the compiled statement matching instead of running the benchmark.")
+argParser.add_argument("--variants", type = int, default = 10, help = "The number of damaged variants to verify for every file generated.")
+argParser.add_argument("--verify-codec", action = "store_true", help = "Verify the PHP string codec instead of running the benchmark.")
+argParser.add_argument("--strings", type = int, default = None, help = "The number of random strings to verify the PHP string codec with.")
+argParser.add_argument("--verify-procfs", action = "store_true",
+	help = "Verify the process provider reading /proc against a fake /proc file system instead of running the benchmark.")
+argParser.add_argument("--process-filter", action = "store_true", help = "Run the process filter benchmark instead of the parser benchmark.")
+argParser.add_argument("--processes", type = int, default = None, help = "The number of processes to generate for the process filter benchmark.")
+argParser.add_argument("files", nargs = "*", help = "Additional files to verify.")
+args = argParser.parse_args()
+
+lineCounts = [ int(x) for x in args.lines.split(",") ] if args.lines else None
+scenarioNames = args.scenarios.split(",") if args.scenarios else None
+
+if args.verify:
+	texts = []
+	for filePath in args.files:
+		with open(filePath, "r", encoding = "utf-8") as f:
+			texts.append(f.read())
+	result = StatementMatchingCheck(seed = args.seed, nVariants = args.variants).run(lineCounts, texts)
+	json.dump(result, sys.stdout, indent = "\t")
+	sys.stdout.write("\n")
+	sys.exit(0 if result["success"] else 1)
+
+if args.verify_codec:
+	result = PHPStringCodecCheck(seed = args.seed, nStrings = args.strings).run()
+	json.dump(result, sys.stdout, indent = "\t")
+	sys.stdout.write("\n")
+	sys.exit(0 if result["success"] else 1)
+
+if args.verify_procfs:
+	result = ProcFSProcessProviderCheck().run()
+	json.dump(result, sys.stdout, indent = "\t")
+	sys.stdout.write("\n")
+	sys.exit(0 if result["success"] else 1)
+
+if args.process_filter:
+	result = ProcessFilterBenchmark(seed = args.seed, nRepeat = args.repeat).run(args.processes, scenarioNames)
+else:
+	benchmark = LocalSettingsBenchmark(seed = args.seed, nRepeat = args.repeat, bMeasureMemory = not args.no_memory)
+	result = benchmark.run(lineCounts, scenarioNames)
+
+if args.output:
+	with open(args.output, "w", encoding = "utf-8") as f:
+		json.dump(result, f, indent = "\t")
+		f.write("\n")
+else:
+	json.dump(result, sys.stdout, indent = "\t")
+	sys.stdout.write("\n")
+
+if args.compare and not args.process_filter:
+	with open(args.compare, "r", encoding = "utf-8") as f:
+		baseline = json.load(f)
+	for nLines, scenarioName, baselineSeconds, ratio in LocalSettingsBenchmark.compare(baseline, result):
+		sys.stderr.write("{:>8} {:<14} {:>12.6f}s {}\n".format(nLines, scenarioName, baselineSeconds,
+			"x{:.3f}".format(ratio) if ratio is not None else "-"))
+
+
+
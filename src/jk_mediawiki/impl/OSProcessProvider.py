@@ -7,6 +7,7 @@ import jk_typing
 import jk_sysinfo
 
 from .AbstractProcessFilter import AbstractProcessFilter
+from .ProcessSnapshot import ProcessSnapshot
 
 
 
@@ -39,7 +40,7 @@ class OSProcessProvider(AbstractProcessFilter):
 	## Public Methods
 	################################################################################################################################
 
-	def listProcesses(self) -> typing.List[dict]:
+	def listProcesses(self) -> ProcessSnapshot:
 		ret = []
 
 		# enrich the data dictionaries
@@ -53,7 +54,7 @@ class OSProcessProvider(AbstractProcessFilter):
 				x["args_list"] = []
 			ret.append(x)
 
-		return ret
+		return ProcessSnapshot(ret)
 	#
 
 	def invalidate(self):
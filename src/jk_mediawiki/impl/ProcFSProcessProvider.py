@@ -0,0 +1,279 @@
+import os
+import typing
+import pwd
+import grp
+import resource
+
+import jk_typing
+
+from .AbstractProcessFilter import AbstractProcessFilter
+from .ProcessSnapshot import ProcessSnapshot
+
+
+
+
+
+
+#
+# This process provider reads process information directly from the "/proc" file system.
+#
+# In contrast to <c>OSProcessProvider</c> no "ps" process is spawned: The records are built from "/proc/[pid]/stat", "/proc/[pid]/status"
+# and "/proc/[pid]/cmdline". If a user ID is specified the owner of every "/proc/[pid]" directory is checked with a single <c>stat()</c>
+# call and processes of other users are skipped before anything else is read.
+#
+# The records produced have the same format as the ones produced by <c>OSProcessProvider</c>: "ppid", "pid", "tty", "stat", "uid", "gid",
+# "user", "group", "cmd", "args" (if there are arguments) and "args_list". But other than there "args_list" contains the exact arguments as
+# passed to the process: "/proc/[pid]/cmdline" separates them by NUL characters, so arguments containing spaces are not split.
+#
+class ProcFSProcessProvider(AbstractProcessFilter):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	__PAGESIZE_KB = resource.getpagesize() // 1024
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	int uid						(optional) If specified only processes owned by this user are listed.
+	# @param	str procRootDirPath			(optional) The directory the "proc" file system is mounted at. (Specify a different directory here
+	#										for reading a copy or a fake of the "proc" file system.)
+	# @param	bool bAddVMemSize			(optional) If <c>True</c> the size of the virtual memory is read from "/proc/[pid]/statm" and
+	#										stored as "vmsizeKB" as well.
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, uid:typing.Union[int,None] = None, procRootDirPath:str = "/proc", bAddVMemSize:bool = False):
+		self.__uid = uid
+		self.__procRootDirPath = procRootDirPath
+		self.__bAddVMemSize = bAddVMemSize
+		self.__userNamesByID = {}
+		self.__groupNamesByID = {}
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def uid(self) -> typing.Union[int,None]:
+		return self.__uid
+	#
+
+	@property
+	def procRootDirPath(self) -> str:
+		return self.__procRootDirPath
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __getUserName(self, uid:int) -> typing.Union[str,None]:
+		if uid not in self.__userNamesByID:
+			try:
+				self.__userNamesByID[uid] = pwd.getpwuid(uid).pw_name
+			except KeyError as ee:
+				self.__userNamesByID[uid] = None
+		return self.__userNamesByID[uid]
+	#
+
+	def __getGroupName(self, gid:int) -> typing.Union[str,None]:
+		if gid not in self.__groupNamesByID:
+			try:
+				self.__groupNamesByID[gid] = grp.getgrgid(gid).gr_name
+			except KeyError as ee:
+				self.__groupNamesByID[gid] = None
+		return self.__groupNamesByID[gid]
+	#
+
+	#
+	# Convert a device number as found in "/proc/[pid]/stat" to the name "ps" displays.
+	#
+	@staticmethod
+	def __ttyNrToStr(ttyNr:int) -> typing.Union[str,None]:
+		if ttyNr == 0:
+			return None
+		major = (ttyNr >> 8) & 0xfff
+		minor = (ttyNr & 0xff) | ((ttyNr >> 12) & 0xfff00)
+		if 136 <= major <= 143:
+			return "pts/" + str((major - 136) * 256 + minor)
+		if major == 4:
+			return ("tty" + str(minor)) if minor < 64 else ("ttyS" + str(minor - 64))
+		return str(major) + "," + str(minor)
+	#
+
+	@staticmethod
+	def __readBinary(filePath:str) -> bytes:
+		with open(filePath, "rb") as f:
+			return f.read()
+	#
+
+	#
+	# Read the data of a single process.
+	#
+	# @return	dict				Returns the process record or <c>None</c> if the process does not exist (any more).
+	#
+	def __readProcess(self, pidDirPath:str, pid:int) -> typing.Union[dict,None]:
+		try:
+			rawStat = ProcFSProcessProvider.__readBinary(os.path.join(pidDirPath, "stat")).decode("utf-8", "replace")
+			rawStatus = ProcFSProcessProvider.__readBinary(os.path.join(pidDirPath, "status")).decode("utf-8", "replace")
+			rawCmdLine = ProcFSProcessProvider.__readBinary(os.path.join(pidDirPath, "cmdline"))
+			rawStatm = ProcFSProcessProvider.__readBinary(os.path.join(pidDirPath, "statm")) if self.__bAddVMemSize else None
+		except (FileNotFoundError, ProcessLookupError, PermissionError) as ee:
+			# the process terminated in the meantime
+			return None
+
+		# "/proc/[pid]/stat": the command name is enclosed in parentheses and may contain spaces and parentheses itself
+
+		iOpen = rawStat.find("(")
+		iClose = rawStat.rfind(")")
+		if (iOpen < 0) or (iClose < iOpen):
+			return None
+		comm = rawStat[iOpen+1:iClose]
+		fields = rawStat[iClose+1:].split()
+		# fields[0] is field #3 as documented in proc(5)
+		state = fields[0]
+		ppid = int(fields[1])
+		pgrp = int(fields[2])
+		session = int(fields[3])
+		ttyNr = int(fields[4])
+		tpgid = int(fields[5])
+		nice = int(fields[16])
+		nThreads = int(fields[17])
+
+		# "/proc/[pid]/status": the effective user and group ID and the memory locked
+
+		uid = None
+		gid = None
+		bLocked = False
+		for line in rawStatus.split("\n"):
+			if line.startswith("Uid:"):
+				uid = int(line.split()[2])
+			elif line.startswith("Gid:"):
+				gid = int(line.split()[2])
+			elif line.startswith("VmLck:"):
+				bLocked = int(line.split()[1]) > 0
+
+		# "/proc/[pid]/cmdline": the arguments are terminated by NUL characters
+
+		if rawCmdLine.endswith(b"\0"):
+			rawCmdLine = rawCmdLine[:-1]
+		argv = [ a.decode("utf-8", "replace") for a in rawCmdLine.split(b"\0") ] if rawCmdLine else []
+		# processes that change their title (e.g. "nginx: master process ...") might leave empty padding
+		while argv and not argv[-1]:
+			del argv[-1]
+
+		# build the record the same way as "ps" does
+
+		if argv:
+			cmdLine = " ".join(argv)
+		else:
+			# kernel threads and zombies have no command line
+			cmdLine = "[" + comm + "]"
+			if state == "Z":
+				cmdLine += " <defunct>"
+		pos = cmdLine.find(" ")
+		if pos < 0:
+			cmd = cmdLine
+			args = ""
+		else:
+			cmd = cmdLine[:pos]
+			args = cmdLine[pos+1:]
+
+		stat = state
+		if nice < 0:
+			stat += "<"
+		elif nice > 0:
+			stat += "N"
+		if bLocked:
+			stat += "L"
+		if session == pid:
+			stat += "s"
+		if nThreads > 1:
+			stat += "l"
+		if (ttyNr != 0) and (tpgid == pgrp):
+			stat += "+"
+
+		ret = {
+			"ppid": ppid,
+			"pid": pid,
+			"tty": ProcFSProcessProvider.__ttyNrToStr(ttyNr),
+			"stat": stat,
+			"uid": uid,
+			"gid": gid,
+			"cmd": cmd,
+			"user": self.__getUserName(uid) if uid is not None else None,
+			"group": self.__getGroupName(gid) if gid is not None else None,
+			"args_list": argv[1:],
+		}
+		if args:
+			ret["args"] = args
+		if rawStatm is not None:
+			ret["vmsizeKB"] = int(rawStatm.split()[0]) * ProcFSProcessProvider.__PAGESIZE_KB
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Returns <c>True</c> if a "proc" file system is available at the specified location.
+	#
+	@staticmethod
+	def isAvailable(procRootDirPath:str = "/proc") -> bool:
+		return os.path.isfile(os.path.join(procRootDirPath, "self", "stat"))
+	#
+
+	def listProcesses(self) -> ProcessSnapshot:
+		ret = []
+
+		with os.scandir(self.__procRootDirPath) as it:
+			for entry in it:
+				if not entry.name.isdigit():
+					continue
+				if self.__uid is not None:
+					# a single stat() call to skip processes of other users before reading anything
+					try:
+						if entry.stat().st_uid != self.__uid:
+							continue
+					except (FileNotFoundError, ProcessLookupError) as ee:
+						continue
+				x = self.__readProcess(entry.path, int(entry.name))
+				if x is not None:
+					ret.append(x)
+
+		ret.sort(key=lambda x: x["pid"])
+		return ProcessSnapshot(ret)
+	#
+
+	#
+	# Read the data of a single process. (The user ID specified in the constructor is ignored here.)
+	#
+	# @param	int pid				The ID of the process.
+	# @return	dict				Returns the process record or <c>None</c> if there is no such process.
+	#
+	@jk_typing.checkFunctionSignature()
+	def readProcess(self, pid:int) -> typing.Union[dict,None]:
+		return self.__readProcess(os.path.join(self.__procRootDirPath, str(pid)), pid)
+	#
+
+	def invalidate(self):
+		pass
+	#
+
+#
+
+
+
+
+
+
+
+
+
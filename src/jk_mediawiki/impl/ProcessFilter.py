@@ -1,10 +1,12 @@
 
 
+import re
 import typing
 
 import jk_typing
 
 from .AbstractProcessFilter import AbstractProcessFilter
+from .ProcessSnapshot import ProcessSnapshot
 
 
 
@@ -12,8 +14,55 @@ from .AbstractProcessFilter import AbstractProcessFilter
 
 
 
+#
+# Creates a property for a filter criterion. Assigning a value to the property recompiles the test of this criterion.
+#
+def _criterionProperty(criterionName:str) -> property:
+	def getter(self):
+		return self._getCriterion(criterionName)
+	def setter(self, value):
+		self._setCriterion(criterionName, value)
+	return property(getter, setter)
+#
+
+
+
+#
+# This class filters the processes provided by another process provider.
+#
+# All criteria specified must be met. If multiple values are specified for a criterion any of these values must match. Criteria with
+# names starting with "arg" refer to the individual arguments of a process: Any argument must match. Criteria with names starting with
+# "args" refer to the arguments of a process as a single string.
+#
+# The criteria are compiled to a single predicate function: For every criterion a specialized function is built when the criterion is
+# assigned. Criteria can be modified at any time: Only the test of the criterion modified is compiled again.
+#
 class ProcessFilter(AbstractProcessFilter):
 
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	# 3-tuples: the name of the criterion, the name of the field of a process record to test and the kind of test
+	__CRITERIA = (
+		( "ppid", "ppid", "eq" ),
+		( "userName", "user", "eq" ),
+		( "cmdExact", "cmd", "eq" ),
+		( "argStartsWith", "args_list", "startsWith" ),
+		( "argEndsWith", "args_list", "endsWith" ),
+		( "argExact", "args_list", "eq" ),
+		( "argContains", "args_list", "contains" ),
+		( "argsStartsWith", "args", "startsWith" ),
+		( "argsEndsWith", "args", "endsWith" ),
+		( "argsExact", "args", "eq" ),
+		( "argsContains", "args", "contains" ),
+	)
+
+	__CRITERIA_BY_NAME = { x[0]: x for x in __CRITERIA }
+
+	# the fields of a process record that contain lists of values; all other fields contain a single value
+	__LIST_FIELDS = ( "args_list", )
+
 	################################################################################################################################
 	## Constructor
 	################################################################################################################################
@@ -39,76 +88,198 @@ class ProcessFilter(AbstractProcessFilter):
 		assert callable(source)
 		self.__source = source
 
-		self.ppid = ppid
-		self.userName = userName
-		self.cmdExact = cmdExact
-		self.argEndsWith = argEndsWith
-		self.argStartsWith = argStartsWith
-		self.argExact = argExact
-		self.argContains = argContains
-		self.argsEndsWith = argsEndsWith
-		self.argsStartsWith = argsStartsWith
-		self.argsExact = argsExact
-		self.argsContains = argsContains
+		self.__criteria = {}			# maps the name of a criterion to its value
+		self.__tests = {}				# maps the name of a criterion to its compiled test (or <c>None</c> if the criterion is not specified)
+		self.__predicate = None			# the combination of all tests (or <c>None</c> if no criterion is specified)
+
+		for criterionName, value in [
+				( "ppid", ppid ),
+				( "userName", userName ),
+				( "cmdExact", cmdExact ),
+				( "argStartsWith", argStartsWith ),
+				( "argEndsWith", argEndsWith ),
+				( "argExact", argExact ),
+				( "argContains", argContains ),
+				( "argsStartsWith", argsStartsWith ),
+				( "argsEndsWith", argsEndsWith ),
+				( "argsExact", argsExact ),
+				( "argsContains", argsContains ),
+			]:
+			self.__criteria[criterionName] = value
+			self.__tests[criterionName] = ProcessFilter.__compileTest(criterionName, value)
+		self.__predicate = self.__combineTests()
 	#
 
 	################################################################################################################################
 	## Public Properties
 	################################################################################################################################
 
+	ppid = _criterionProperty("ppid")
+	userName = _criterionProperty("userName")
+	cmdExact = _criterionProperty("cmdExact")
+	argStartsWith = _criterionProperty("argStartsWith")
+	argEndsWith = _criterionProperty("argEndsWith")
+	argExact = _criterionProperty("argExact")
+	argContains = _criterionProperty("argContains")
+	argsStartsWith = _criterionProperty("argsStartsWith")
+	argsEndsWith = _criterionProperty("argsEndsWith")
+	argsExact = _criterionProperty("argsExact")
+	argsContains = _criterionProperty("argsContains")
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
 
-	@jk_typing.checkFunctionSignature()
-	def __isMatch(self, jData:dict, varName:str, fn:typing.Callable, validValueOrValues:typing.Union[str,int,typing.List[typing.Union[str,int]]]) -> bool:
-		if isinstance(validValueOrValues, (str, int)):
-			validValues = [ validValueOrValues ]
+	#
+	# Compile the test of a single criterion.
+	#
+	# @return	callable			Returns a function that receives a process record and returns <c>True</c> if the criterion is met.
+	#								<c>None</c> is returned if the criterion is not specified.
+	#
+	@staticmethod
+	def __compileTest(criterionName:str, valueOrValues) -> typing.Union[typing.Callable,None]:
+		_, fieldName, testKind = ProcessFilter.__CRITERIA_BY_NAME[criterionName]
+
+		# a process ID of 0 is a valid criterion; for all other criteria empty values are ignored
+		if criterionName == "ppid":
+			if valueOrValues is None:
+				return None
+		elif not valueOrValues:
+			return None
+
+		if isinstance(valueOrValues, (str, int)):
+			values = [ valueOrValues ]
 		else:
-			validValues = validValueOrValues
-
-		if varName not in jData:
-			return False
+			values = list(valueOrValues)
+
+		if fieldName in ProcessFilter.__LIST_FIELDS:
+			# any element of the list must match
+
+			if testKind == "eq":
+				if len(values) == 1:
+					v = values[0]
+					return lambda x: v in x.get(fieldName, ())
+				validValues = frozenset(values)
+				return lambda x: not validValues.isdisjoint(x.get(fieldName, ()))
+
+			if testKind == "startsWith":
+				prefixes = tuple(values)
+				return lambda x: any([ a.startswith(prefixes) for a in x.get(fieldName, ()) ])
+
+			if testKind == "endsWith":
+				suffixes = tuple(values)
+				return lambda x: any([ a.endswith(suffixes) for a in x.get(fieldName, ()) ])
+
+			if testKind == "contains":
+				# the elements are joined by NUL characters: a value (not containing a NUL character) can't span multiple elements then
+				pattern = re.compile("|".join([ re.escape(v) for v in values ]))
+				def test(x):
+					a = x.get(fieldName)
+					return bool(a) and (pattern.search("\0".join(a)) is not None)
+				return test
 
-		encounteredValueOrValues = jData[varName]
-		if isinstance(encounteredValueOrValues, (tuple, list)):
-			for x in encounteredValueOrValues:
-				for validValue in validValues:
-					if fn(x, validValue):
-						return True
 		else:
-			x = encounteredValueOrValues
-			for validValue in validValues:
-				if fn(x, validValue):
-					return True
-
-		return False
+			if testKind == "eq":
+				# no value in the process record: the criterion is not met (as values of criteria are never None)
+				if len(values) == 1:
+					v = values[0]
+					return lambda x: x.get(fieldName) == v
+				validValues = frozenset(values)
+				return lambda x: x.get(fieldName) in validValues
+
+			if testKind == "startsWith":
+				prefixes = tuple(values)
+				def test(x):
+					s = x.get(fieldName)
+					return (s is not None) and s.startswith(prefixes)
+				return test
+
+			if testKind == "endsWith":
+				suffixes = tuple(values)
+				def test(x):
+					s = x.get(fieldName)
+					return (s is not None) and s.endswith(suffixes)
+				return test
+
+			if testKind == "contains":
+				if len(values) == 1:
+					v = values[0]
+					def test(x):
+						s = x.get(fieldName)
+						return (s is not None) and (v in s)
+					return test
+				pattern = re.compile("|".join([ re.escape(v) for v in values ]))
+				def test(x):
+					s = x.get(fieldName)
+					return (s is not None) and (pattern.search(s) is not None)
+				return test
+
+		raise Exception("Unknown test: " + repr(testKind))
 	#
 
-	def __test_any_eq(self, encounteredValue, referenceValue) -> bool:
-		return encounteredValue == referenceValue
 	#
-
-	def __test_any_ne(self, encounteredValue, referenceValue) -> bool:
-		return encounteredValue == referenceValue
+	# Combine the compiled tests of all criteria specified to a single predicate.
+	#
+	def __combineTests(self) -> typing.Union[typing.Callable,None]:
+		tests = [ self.__tests[x[0]] for x in ProcessFilter.__CRITERIA if self.__tests[x[0]] is not None ]
+
+		if not tests:
+			return None
+		if len(tests) == 1:
+			return tests[0]
+		if len(tests) == 2:
+			t1, t2 = tests
+			return lambda x: t1(x) and t2(x)
+		if len(tests) == 3:
+			t1, t2, t3 = tests
+			return lambda x: t1(x) and t2(x) and t3(x)
+		if len(tests) == 4:
+			t1, t2, t3, t4 = tests
+			return lambda x: t1(x) and t2(x) and t3(x) and t4(x)
+		tests = tuple(tests)
+		return lambda x: all([ t(x) for t in tests ])
 	#
 
-	def __test_str_endsWith(self, encounteredValue:str, referenceValue:str) -> bool:
-		assert isinstance(encounteredValue, str)
-		assert isinstance(referenceValue, str)
-		return encounteredValue.endswith(referenceValue)
+	def _getCriterion(self, criterionName:str):
+		return self.__criteria[criterionName]
 	#
 
-	def __test_str_startsWith(self, encounteredValue:str, referenceValue:str) -> bool:
-		assert isinstance(encounteredValue, str)
-		assert isinstance(referenceValue, str)
-		return encounteredValue.startswith(referenceValue)
+	def _setCriterion(self, criterionName:str, value):
+		self.__criteria[criterionName] = value
+		self.__tests[criterionName] = ProcessFilter.__compileTest(criterionName, value)
+		self.__predicate = self.__combineTests()
 	#
 
-	def __test_str_contains(self, encounteredValue:str, referenceValue:str) -> bool:
-		assert isinstance(encounteredValue, str)
-		assert isinstance(referenceValue, str)
-		return encounteredValue.find(referenceValue) >= 0
+	#
+	# Select the processes to check. If the source provides a snapshot, its indexes are used for all criteria that require an exact
+	# match: Only the processes found for the most selective of these criteria need to be checked.
+	#
+	def __selectCandidates(self, processes) -> typing.Iterable[dict]:
+		if not isinstance(processes, ProcessSnapshot):
+			return processes
+
+		criteria = []
+		if self.ppid is not None:
+			criteria.append(( "ppid", self.ppid ))
+		if self.userName:
+			criteria.append(( "user", self.userName ))
+		if self.cmdExact:
+			criteria.append(( "cmd", self.cmdExact ))
+		if self.argExact:
+			criteria.append(( "args_list", self.argExact ))
+		if self.argsExact:
+			criteria.append(( "args", self.argsExact ))
+		if not criteria:
+			return processes
+
+		bestPositions = None
+		for fieldName, valueOrValues in criteria:
+			positions = processes.lookupPositions(fieldName, valueOrValues)
+			if (bestPositions is None) or (len(positions) < len(bestPositions)):
+				bestPositions = positions
+				if not bestPositions:
+					break
+		return [ processes[i] for i in bestPositions ]
 	#
 
 	################################################################################################################################
@@ -116,66 +287,12 @@ class ProcessFilter(AbstractProcessFilter):
 	################################################################################################################################
 
 	def listProcesses(self) -> typing.List[dict]:
-		ret = []
-
-		for x in self.__source():
-			# filter by ppid
-
-			if self.ppid is not None:
-				if not self.__isMatch(x, "ppid", self.__test_any_eq, self.ppid):
-					continue
-
-			# filter by user name
-
-			if self.userName:
-				if not self.__isMatch(x, "user", self.__test_any_eq, self.userName):
-					continue
-
-			#print("------ ", x)
-
-			# filter by command
-
-			if self.cmdExact:
-				if not self.__isMatch(x, "cmd", self.__test_any_eq, self.cmdExact):
-					continue
-
-			# filter by argument
+		candidates = self.__selectCandidates(self.__source())
 
-			if self.argStartsWith:
-				if not self.__isMatch(x, "args_list", self.__test_str_startsWith, self.argStartsWith):
-					continue
-
-			if self.argEndsWith:
-				if not self.__isMatch(x, "args_list", self.__test_str_endsWith, self.argEndsWith):
-					continue
-
-			if self.argExact:
-				if not self.__isMatch(x, "args_list", self.__test_any_eq, self.argExact):
-					continue
-
-			if self.argContains:
-				if not self.__isMatch(x, "args_list", self.__test_str_contains, self.argContains):
-					continue
-
-			if self.argsStartsWith:
-				if not self.__isMatch(x, "args", self.__test_str_startsWith, self.argsStartsWith):
-					continue
-
-			if self.argsEndsWith:
-				if not self.__isMatch(x, "args", self.__test_str_endsWith, self.argsEndsWith):
-					continue
-
-			if self.argsExact:
-				if not self.__isMatch(x, "args", self.__test_any_eq, self.argsExact):
-					continue
-
-			if self.argsContains:
-				if not self.__isMatch(x, "args", self.__test_str_contains, self.argsContains):
-					continue
-
-			ret.append(x)
-
-		return ret
+		predicate = self.__predicate
+		if predicate is None:
+			return list(candidates)
+		return list(filter(predicate, candidates))
 	#
 
 	def invalidate(self):
@@ -192,3 +309,5 @@ class ProcessFilter(AbstractProcessFilter):
 
 
 
+
+
@@ -1,8 +1,7 @@
-
-
 import os
 import typing
 import time
+import threading
 
 import jk_typing
 
@@ -13,6 +12,16 @@ from .AbstractProcessFilter import AbstractProcessFilter
 
 
 
+#
+# This class caches the process list of another process provider for a specified amount of time.
+#
+# Instances of this class are thread safe. Concurrent requests that find the cache expired are coalesced: Only one thread retrieves a new
+# process list from the source, all other threads wait for it and use the result as well.
+#
+# If <c>bStaleWhileRevalidate</c> is enabled an expired process list is still returned immediately, and a new process list is retrieved
+# by a background thread. (If <c>maxStaleSeconds</c> is specified process lists older than this are never returned: Then the caller waits
+# for the new process list.)
+#
 class ProcessProviderCache(AbstractProcessFilter):
 
 	################################################################################################################################
@@ -22,44 +31,185 @@ class ProcessProviderCache(AbstractProcessFilter):
 	#
 	# Constructor method.
 	#
+	# @param	AbstractProcessFilter source		The process provider to retrieve the process lists from.
+	# @param	int|float cachingSeconds			(optional) The number of seconds a process list is considered to be up to date.
+	# @param	bool bStaleWhileRevalidate			(optional) If <c>True</c> expired process lists are returned while a new process list is
+	#												retrieved in the background.
+	# @param	int|float maxStaleSeconds			(optional) The maximum age of an expired process list that may still be returned.
+	#												(Only relevant if <c>bStaleWhileRevalidate</c> is <c>True</c>.)
+	#
 	@jk_typing.checkFunctionSignature()
-	def __init__(self, source:AbstractProcessFilter, cachingSeconds:int = 2):
+	def __init__(self,
+		source:AbstractProcessFilter,
+		cachingSeconds:typing.Union[int,float] = 2,
+		bStaleWhileRevalidate:bool = False,
+		maxStaleSeconds:typing.Union[int,float,None] = None,
+		):
+
 		assert cachingSeconds > 0
+		if maxStaleSeconds is not None:
+			assert maxStaleSeconds >= cachingSeconds
 
 		self.__source = source
 		self.__cachingSeconds = cachingSeconds
+		self.__bStaleWhileRevalidate = bStaleWhileRevalidate
+		self.__maxStaleSeconds = maxStaleSeconds
+
 		self.__lastT = 0
 		self.__lastData = None
+		self.__generation = 0					# incremented on every invalidation; used to discard process lists retrieved before
+		self.__bRefreshingInBackground = False
+
+		self.__lock = threading.Lock()			# protects all fields
+		self.__refreshLock = threading.Lock()	# is held while retrieving a new process list from the source
+
+		self.__resetStats()
 	#
 
 	################################################################################################################################
 	## Public Properties
 	################################################################################################################################
 
+	@property
+	def cachingSeconds(self) -> typing.Union[int,float]:
+		return self.__cachingSeconds
+	#
+
+	@property
+	def bStaleWhileRevalidate(self) -> bool:
+		return self.__bStaleWhileRevalidate
+	#
+
+	#
+	# Statistics about the use of this cache. This data can be serialized to JSON directly.
+	#
+	# * "hits" - the number of requests served with an up to date process list
+	# * "staleHits" - the number of requests served with an expired process list (while a new one was retrieved in the background)
+	# * "misses" - the number of requests that had to wait for a new process list
+	# * "coalesced" - the number of misses that did not retrieve a process list themselves but used the one retrieved by another thread
+	# * "refreshes" - the number of process lists retrieved from the source
+	# * "refreshErrors" - the number of failed attempts to retrieve a process list from the source
+	# * "lastRefreshSeconds", "maxRefreshSeconds", "avgRefreshSeconds" - the durations of retrieving a process list from the source
+	#
+	@property
+	def stats(self) -> dict:
+		with self.__lock:
+			return {
+				"hits": self.__nHits,
+				"staleHits": self.__nStaleHits,
+				"misses": self.__nMisses,
+				"coalesced": self.__nCoalesced,
+				"refreshes": self.__nRefreshes,
+				"refreshErrors": self.__nRefreshErrors,
+				"lastRefreshSeconds": self.__lastRefreshDuration,
+				"maxRefreshSeconds": self.__maxRefreshDuration,
+				"avgRefreshSeconds": (self.__totalRefreshDuration / self.__nRefreshes) if self.__nRefreshes else None,
+			}
+	#
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
 
+	def __resetStats(self):
+		self.__nHits = 0
+		self.__nStaleHits = 0
+		self.__nMisses = 0
+		self.__nCoalesced = 0
+		self.__nRefreshes = 0
+		self.__nRefreshErrors = 0
+		self.__lastRefreshDuration = None
+		self.__maxRefreshDuration = None
+		self.__totalRefreshDuration = 0
+	#
+
+	#
+	# Retrieve a new process list from the source and store it. The caller must hold <c>__refreshLock</c>.
+	#
+	def __refresh(self) -> typing.List[dict]:
+		with self.__lock:
+			generation = self.__generation
+
+		t0 = time.monotonic()
+		try:
+			data = self.__source.listProcesses()
+		except:
+			with self.__lock:
+				self.__nRefreshErrors += 1
+			raise
+		t1 = time.monotonic()
+		duration = t1 - t0
+
+		with self.__lock:
+			self.__nRefreshes += 1
+			self.__lastRefreshDuration = duration
+			self.__totalRefreshDuration += duration
+			if (self.__maxRefreshDuration is None) or (duration > self.__maxRefreshDuration):
+				self.__maxRefreshDuration = duration
+			if generation == self.__generation:
+				# the age of a process list is measured from the time retrieving it was started
+				self.__lastData = data
+				self.__lastT = t0
+
+		return data
+	#
+
+	def __refreshInBackground(self):
+		try:
+			with self.__refreshLock:
+				self.__refresh()
+		except Exception as ee:
+			# already counted in the statistics; the next request will try again
+			pass
+		finally:
+			with self.__lock:
+				self.__bRefreshingInBackground = False
+	#
+
 	################################################################################################################################
 	## Public Methods
 	################################################################################################################################
 
 	def listProcesses(self) -> typing.List[dict]:
-		tNow = time.time()
-		tAge = tNow - self.__lastT
-
-		if (tAge > 1) or (self.__lastData is None):
-			self.__lastData = self.__source.listProcesses()
-			self.__lastT = tNow
-
-		return self.__lastData
+		with self.__lock:
+			if self.__lastData is not None:
+				tAge = time.monotonic() - self.__lastT
+				if tAge <= self.__cachingSeconds:
+					self.__nHits += 1
+					return self.__lastData
+				if self.__bStaleWhileRevalidate and ((self.__maxStaleSeconds is None) or (tAge <= self.__maxStaleSeconds)):
+					self.__nStaleHits += 1
+					if not self.__bRefreshingInBackground:
+						self.__bRefreshingInBackground = True
+						threading.Thread(target=self.__refreshInBackground, daemon=True).start()
+					return self.__lastData
+			self.__nMisses += 1
+
+		# only a single thread retrieves a new process list; all other threads wait for it
+
+		with self.__refreshLock:
+			with self.__lock:
+				if (self.__lastData is not None) and (time.monotonic() - self.__lastT <= self.__cachingSeconds):
+					self.__nCoalesced += 1
+					return self.__lastData
+			return self.__refresh()
 	#
 
 	def invalidate(self):
-		self.__lastData = None
+		with self.__lock:
+			self.__lastData = None
+			self.__generation += 1
 		self.__source.invalidate()
 	#
 
+	#
+	# Reset all counters of the statistics.
+	#
+	def resetStats(self):
+		with self.__lock:
+			self.__resetStats()
+	#
+
 #
 
 
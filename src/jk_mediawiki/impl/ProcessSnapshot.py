@@ -0,0 +1,166 @@
+import typing
+
+
+
+
+
+
+#
+# This class represents the list of processes retrieved by a process provider at a certain point in time.
+#
+# An instance of this class behaves like a (read only) list of process records. Additionally processes can be looked up by the value of a
+# field such as "pid", "ppid", "uid", "user" or "cmd". The indexes required for this are built on first use and reused afterwards: As
+# long as the same snapshot is queried (e.g. while a process provider cache returns it) every lookup takes constant time instead of
+# scanning all processes. If the value of a field is a list (such as "args_list") every element of this list is indexed.
+#
+# NOTE: Do not modify the process records of a snapshot: The indexes would not reflect the changes.
+#
+class ProcessSnapshot(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	dict[] processes			The process records.
+	#
+	def __init__(self, processes:typing.Iterable[dict]):
+		self.__processes = tuple(processes)
+		self.__indexes = {}				# maps a field name to a dictionary that maps a value to the positions of the processes
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The names of the fields indexes have been built for so far.
+	#
+	@property
+	def indexedFields(self) -> typing.List[str]:
+		return sorted(self.__indexes.keys())
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Get the index of the specified field. The index is built on first access.
+	#
+	# (Concurrent threads might build the same index at the same time. This is not a problem: Both indexes built are identical.)
+	#
+	def __getIndex(self, fieldName:str) -> dict:
+		index = self.__indexes.get(fieldName)
+		if index is None:
+			index = {}
+			for i, x in enumerate(self.__processes):
+				if fieldName not in x:
+					continue
+				value = x[fieldName]
+				if isinstance(value, (tuple, list)):
+					for v in set(value):
+						index.setdefault(v, []).append(i)
+				else:
+					index.setdefault(value, []).append(i)
+			self.__indexes[fieldName] = index
+		return index
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__processes)
+	#
+
+	def __iter__(self):
+		return iter(self.__processes)
+	#
+
+	def __getitem__(self, i):
+		return self.__processes[i]
+	#
+
+	def __bool__(self):
+		return len(self.__processes) > 0
+	#
+
+	#
+	# Get the positions of all processes with the specified value (or any of the specified values) in the specified field.
+	#
+	# @param	str fieldName			The name of the field, e.g. "ppid".
+	# @param	any valueOrValues		A single value or a list of values.
+	# @return	int[]					Returns the positions of the processes in ascending order.
+	#
+	def lookupPositions(self, fieldName:str, valueOrValues) -> typing.List[int]:
+		assert isinstance(fieldName, str)
+
+		index = self.__getIndex(fieldName)
+		if isinstance(valueOrValues, (tuple, list)):
+			positions = set()
+			for v in valueOrValues:
+				positions.update(index.get(v, ()))
+			return sorted(positions)
+		else:
+			return list(index.get(valueOrValues, ()))
+	#
+
+	#
+	# Get all processes with the specified value (or any of the specified values) in the specified field.
+	#
+	# @param	str fieldName			The name of the field, e.g. "ppid".
+	# @param	any valueOrValues		A single value or a list of values.
+	# @return	dict[]					Returns the process records (in the order of the snapshot).
+	#
+	def lookup(self, fieldName:str, valueOrValues) -> typing.List[dict]:
+		processes = self.__processes
+		return [ processes[i] for i in self.lookupPositions(fieldName, valueOrValues) ]
+	#
+
+	#
+	# Get the process with the specified process ID.
+	#
+	# @return	dict					Returns the process record or <c>None</c> if there is no such process.
+	#
+	def getProcess(self, pid:int) -> typing.Union[dict,None]:
+		positions = self.lookupPositions("pid", pid)
+		return self.__processes[positions[0]] if positions else None
+	#
+
+	#
+	# Get the child processes of the specified process.
+	#
+	def getChildren(self, pid:int) -> typing.List[dict]:
+		return self.lookup("ppid", pid)
+	#
+
+	#
+	# Get all descendants of the specified process: its children, their children and so on.
+	#
+	def getDescendants(self, pid:int) -> typing.List[dict]:
+		ret = []
+		pending = [ pid ]
+		seen = { pid }
+		while pending:
+			for x in self.lookup("ppid", pending.pop()):
+				if x["pid"] not in seen:
+					seen.add(x["pid"])
+					ret.append(x)
+					pending.append(x["pid"])
+		return ret
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,206 @@
+import os
+import time
+import errno
+import select
+import typing
+
+from .AbstractProcessFilter import AbstractProcessFilter
+
+
+
+
+
+
+#
+# This class provides methods for waiting until processes have started or terminated.
+#
+# Waiting for processes to terminate is event driven where possible: A process file descriptor is opened for every process
+# (<c>os.pidfd_open()</c>, Linux 5.3 and later) and all of them are waited for with <c>select.poll()</c>. This way the caller is woken up
+# as soon as the last process has terminated. On older systems the processes are checked by polling with short intervals.
+#
+# There is no event for a process to start. Therefore waiting for processes to start checks the process provider repeatedly: The interval
+# starts short and is increased up to <c>MAX_POLL_INTERVAL</c>. (The process provider is invalidated before each check in order to
+# bypass a process provider cache.)
+#
+class ProcessWaiter(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	MIN_POLL_INTERVAL = 0.01
+	MAX_POLL_INTERVAL = 0.25
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __isProcessAlive(pid:int) -> bool:
+		try:
+			os.kill(pid, 0)
+			return True
+		except ProcessLookupError as ee:
+			return False
+		except PermissionError as ee:
+			# the process exists but belongs to a different user
+			return True
+	#
+
+	#
+	# Open process file descriptors for all processes specified.
+	#
+	# @return	dict			Maps file descriptors to process IDs. <c>None</c> is returned if process file descriptors are not supported.
+	#
+	@staticmethod
+	def __openPIDFDs(pids:typing.Iterable[int]) -> typing.Union[typing.Dict[int,int],None]:
+		if not hasattr(os, "pidfd_open"):
+			return None
+
+		ret = {}
+		try:
+			for pid in pids:
+				try:
+					ret[os.pidfd_open(pid)] = pid
+				except ProcessLookupError as ee:
+					# already terminated
+					pass
+		except OSError as ee:
+			for fd in ret:
+				os.close(fd)
+			if ee.errno in (errno.ENOSYS, errno.EPERM, errno.EINVAL):
+				# not supported by the kernel (or forbidden by a security policy)
+				return None
+			raise
+		return ret
+	#
+
+	@staticmethod
+	def __waitForExitPIDFD(pidsByFD:typing.Dict[int,int], tEnd:float) -> bool:
+		try:
+			poller = select.poll()
+			for fd in pidsByFD:
+				poller.register(fd, select.POLLIN)
+			nRemaining = len(pidsByFD)
+			while nRemaining > 0:
+				tRemaining = tEnd - time.monotonic()
+				if tRemaining <= 0:
+					return False
+				for fd, event in poller.poll(max(1, int(tRemaining * 1000))):
+					poller.unregister(fd)
+					nRemaining -= 1
+			return True
+		finally:
+			for fd in pidsByFD:
+				os.close(fd)
+	#
+
+	@staticmethod
+	def __waitForExitPolling(pids:typing.Iterable[int], tEnd:float) -> bool:
+		remainingPIDs = set(pids)
+		interval = ProcessWaiter.MIN_POLL_INTERVAL
+		while True:
+			remainingPIDs = { pid for pid in remainingPIDs if ProcessWaiter.__isProcessAlive(pid) }
+			if not remainingPIDs:
+				return True
+			tRemaining = tEnd - time.monotonic()
+			if tRemaining <= 0:
+				return False
+			time.sleep(min(interval, tRemaining))
+			interval = min(interval * 2, ProcessWaiter.MAX_POLL_INTERVAL)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Wait until all processes specified have terminated.
+	#
+	# @param	int[] pids				The IDs of the processes.
+	# @param	int|float timeout		The maximum number of seconds to wait.
+	# @return	bool					Returns <c>True</c> if all processes have terminated and <c>False</c> if the timeout has been reached.
+	#
+	@staticmethod
+	def waitForExit(pids:typing.Iterable[int], timeout:typing.Union[int,float]) -> bool:
+		pids = list(pids)
+		assert timeout >= 0
+
+		tEnd = time.monotonic() + timeout
+		pidsByFD = ProcessWaiter.__openPIDFDs(pids)
+		if pidsByFD is None:
+			return ProcessWaiter.__waitForExitPolling(pids, tEnd)
+		else:
+			return ProcessWaiter.__waitForExitPIDFD(pidsByFD, tEnd)
+	#
+
+	#
+	# Wait until the specified process provider returns processes.
+	#
+	# @param	AbstractProcessFilter processProvider		The process provider, e.g. <c>MediaWikiLocalUserServiceMgr.getNGINXMasterProcessesProvider()</c>.
+	# @param	int|float timeout							The maximum number of seconds to wait.
+	# @return	dict[]										Returns the processes or <c>None</c> if the timeout has been reached.
+	#
+	@staticmethod
+	def waitForProcesses(processProvider:AbstractProcessFilter, timeout:typing.Union[int,float]) -> typing.Union[typing.List[dict],None]:
+		assert callable(processProvider)
+		assert timeout >= 0
+
+		tEnd = time.monotonic() + timeout
+		interval = ProcessWaiter.MIN_POLL_INTERVAL
+		while True:
+			processProvider.invalidate()
+			processes = processProvider()
+			if processes:
+				return processes
+			tRemaining = tEnd - time.monotonic()
+			if tRemaining <= 0:
+				return None
+			time.sleep(min(interval, tRemaining))
+			interval = min(interval * 2, ProcessWaiter.MAX_POLL_INTERVAL)
+	#
+
+	#
+	# Wait until the specified process provider does not return any processes any more. The processes returned are waited for with
+	# <c>waitForExit()</c>. (As new processes might have been started in the meantime the process provider is checked again afterwards.)
+	#
+	# @param	AbstractProcessFilter processProvider		The process provider, e.g. <c>MediaWikiLocalUserServiceMgr.getNGINXMasterProcessesProvider()</c>.
+	# @param	int|float timeout							The maximum number of seconds to wait.
+	# @return	bool										Returns <c>True</c> if there are no more processes and <c>False</c> if the timeout has been reached.
+	#
+	@staticmethod
+	def waitForNoProcesses(processProvider:AbstractProcessFilter, timeout:typing.Union[int,float]) -> bool:
+		assert callable(processProvider)
+		assert timeout >= 0
+
+		tEnd = time.monotonic() + timeout
+		interval = ProcessWaiter.MIN_POLL_INTERVAL
+		lastPIDs = None
+		while True:
+			processProvider.invalidate()
+			processes = processProvider()
+			if not processes:
+				return True
+			tRemaining = tEnd - time.monotonic()
+			if tRemaining <= 0:
+				return False
+			pids = sorted([ x["pid"] for x in processes ])
+			if pids == lastPIDs:
+				# the processes have terminated but are still listed (e.g. zombies not reaped yet): don't loop busily
+				time.sleep(min(interval, tRemaining))
+				interval = min(interval * 2, ProcessWaiter.MAX_POLL_INTERVAL)
+			elif not ProcessWaiter.waitForExit(pids, tRemaining):
+				return False
+			lastPIDs = pids
+	#
+
+#
+
+
+
+
+
+
+
+
+
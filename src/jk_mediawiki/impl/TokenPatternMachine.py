@@ -0,0 +1,511 @@
+
+
+import threading
+
+from jk_utils import TypedValue
+from jk_utils.tokenizer import AbstractTokenPattern, TokenPattern, TokenPatternSequence, TokenPatternAlternatives, TokenPatternOptional, \
+	TokenPatternRepeat
+
+
+
+
+
+
+#
+# This class compiles token patterns of <c>jk_utils.tokenizer</c> into a deterministic state machine over token types.
+#
+# The machine is constructed from a list of patterns. <c>tryMatch()</c> tries these patterns in the order specified and returns the result
+# of the first pattern that matches - exactly like calling <c>tryMatch()</c> on each pattern in turn would do. But instead of interpreting
+# the pattern objects (which backtracks over the tokens for each alternative tried) the tokens are inspected in a single forward pass: each
+# token requires a single lookup in a transition table.
+#
+# The semantics of the patterns are preserved exactly: Alternatives are ordered (the first alternative that matches is taken, even if
+# a later one would match more tokens), optional and repeated patterns match greedily and never give back tokens, and a sequence matching
+# no tokens fails. To achieve this the patterns are first compiled to the instructions of a backtracking parsing machine. All execution
+# paths of this machine are then simulated side by side: Every path is a thread that knows which threads it would have to fall back to
+# on failure. A state of the state machine is the set of threads that are still relevant; captures are recorded in registers that are
+# carried along with the threads. States and transitions are created on demand the first time they are needed and are cached afterwards.
+#
+# A machine can be used by multiple threads at the same time: Looking up a transition that already exists requires no locking, creating
+# states and transitions is serialized by a lock.
+#
+# The tokens that need to be distinguished are determined by the patterns: A token is identified by its type. Only if there is a pattern
+# that requires a specific value for a token type the value is considered as well.
+#
+class TokenPatternMachine(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	# The instructions of the parsing machine. All instructions are tuples: the first element is the operation code.
+	__OP_TOKEN = 0			# ( op, tokenType, tokenValue, actions, nextPC ): consume a token
+	__OP_CHOICE = 1			# ( op, alternativePC, nextPC ): remember an alternative to fall back to on failure and continue
+	__OP_COMMIT = 2			# ( op, nextPC ): forget the alternative remembered last and continue
+	__OP_ACTIONS = 3		# ( op, actions, nextPC ): record tags
+	__OP_MATCH = 4			# ( op, patternIndex ): a pattern has matched
+
+	# The kinds of the nodes of a state
+	__NODE_RUNNING = 0		# ( kind, pc, stack ): a thread waiting for the next token
+	__NODE_MATCHED = 1		# ( kind, patternIndex ): a thread that has matched a pattern
+	__NODE_FAILED = 2		# (only used during the construction of a transition)
+
+	# The results of a transition
+	__TRANSITION_CONTINUE = 0
+	__TRANSITION_MATCH = 1
+	__TRANSITION_FAIL = 2
+
+	# The key used for the end of the token list
+	__KEY_END = None
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	AbstractTokenPattern[] tokenPatterns		The patterns to match. They are tried in this order.
+	#
+	def __init__(self, tokenPatterns:list):
+		assert isinstance(tokenPatterns, list)
+		assert len(tokenPatterns) > 0
+		for tokenPattern in tokenPatterns:
+			assert isinstance(tokenPattern, AbstractTokenPattern)
+			if TokenPatternMachine.__isNullable(tokenPattern):
+				raise Exception("Patterns that can match without consuming a token are not supported!")
+
+		self.__tokenPatterns = list(tokenPatterns)
+
+		# compile the patterns to a program: try one pattern after another
+
+		self.__program = []
+		self.__valueKeys = set()
+		self.__entryPC = self.__emit(( TokenPatternMachine.__OP_MATCH, len(tokenPatterns) - 1 ))
+		self.__entryPC = self.__compile(tokenPatterns[-1], self.__entryPC)
+		for i in range(len(tokenPatterns) - 2, -1, -1):
+			pc = self.__emit(( TokenPatternMachine.__OP_MATCH, i ))
+			pc = self.__compile(tokenPatterns[i], pc)
+			self.__entryPC = self.__emit(( TokenPatternMachine.__OP_CHOICE, self.__entryPC, pc ))
+		self.__valueKeys = frozenset(self.__valueKeys)
+
+		# the states are created on demand
+
+		self.__lock = threading.Lock()			# is held while states and transitions are created
+		self.__stateIDsByNodes = {}
+		self.__stateNodes = []
+		self.__transitions = []
+		self.__initialState = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The patterns this machine has been compiled from.
+	#
+	@property
+	def tokenPatterns(self) -> list:
+		return list(self.__tokenPatterns)
+	#
+
+	#
+	# The number of states that have been created so far.
+	#
+	@property
+	def stateCount(self) -> int:
+		return len(self.__stateNodes)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __emit(self, instruction:tuple) -> int:
+		self.__program.append(instruction)
+		return len(self.__program) - 1
+	#
+
+	#
+	# The actions that record the tags of a pattern.
+	#
+	@staticmethod
+	def __getTagActions(tokenPattern:AbstractTokenPattern) -> tuple:
+		tags = tokenPattern.tags
+		if not tags:
+			return ()
+		return tuple([ ( "t", tagName, tagValue ) for tagName, tagValue in tags.items() ])
+	#
+
+	#
+	# Get the patterns a pattern consists of. (<c>jk_utils</c> does not expose them: the private attributes need to be accessed.)
+	#
+	@staticmethod
+	def __getChildren(tokenPattern:AbstractTokenPattern) -> list:
+		if isinstance(tokenPattern, TokenPatternSequence):
+			return tokenPattern._TokenPatternSequence__tokenPatterns
+		elif isinstance(tokenPattern, TokenPatternAlternatives):
+			return tokenPattern._TokenPatternAlternatives__tokenPatterns
+		elif isinstance(tokenPattern, TokenPatternOptional):
+			return [ tokenPattern._TokenPatternOptional__tokenPattern ]
+		elif isinstance(tokenPattern, TokenPatternRepeat):
+			return [ tokenPattern._TokenPatternRepeat__tokenPattern ]
+		else:
+			return []
+	#
+
+	#
+	# Can the specified pattern match without consuming a token?
+	#
+	@staticmethod
+	def __isNullable(tokenPattern:AbstractTokenPattern) -> bool:
+		children = TokenPatternMachine.__getChildren(tokenPattern)
+		if isinstance(tokenPattern, TokenPattern):
+			return False
+		elif isinstance(tokenPattern, TokenPatternSequence):
+			return all([ TokenPatternMachine.__isNullable(p) for p in children ])
+		elif isinstance(tokenPattern, TokenPatternAlternatives):
+			return any([ TokenPatternMachine.__isNullable(p) for p in children ])
+		elif isinstance(tokenPattern, TokenPatternOptional):
+			return True
+		else:
+			return TokenPatternMachine.__isNullable(children[0])
+	#
+
+	#
+	# Compile a pattern. The code is generated backwards: the code following the pattern has already been generated.
+	#
+	# @param	AbstractTokenPattern tokenPattern		The pattern to compile.
+	# @param	int nextPC								The address of the code to execute after the pattern has matched.
+	# @return	int									The address of the code generated.
+	#
+	def __compile(self, tokenPattern:AbstractTokenPattern, nextPC:int) -> int:
+		tagActions = TokenPatternMachine.__getTagActions(tokenPattern)
+
+		if isinstance(tokenPattern, TokenPattern):
+			tokenType = tokenPattern._TokenPattern__tokenType
+			tokenValue = tokenPattern._TokenPattern__tokenValue
+			actions = []
+			if tokenPattern._TokenPattern__assignToVar is not None:
+				actions.append(( "v", tokenPattern._TokenPattern__assignToVar, tokenPattern._TokenPattern__bVarIsArray ))
+			if tokenPattern._TokenPattern__assignToVarTyped is not None:
+				actions.append(( "vv", tokenPattern._TokenPattern__assignToVarTyped, tokenPattern._TokenPattern__bVarIsArray ))
+			if tokenValue is not None:
+				self.__valueKeys.add(( tokenType, tokenValue ))
+			return self.__emit(( TokenPatternMachine.__OP_TOKEN, tokenType, tokenValue, tuple(actions) + tagActions, nextPC ))
+
+		if tagActions:
+			nextPC = self.__emit(( TokenPatternMachine.__OP_ACTIONS, tagActions, nextPC ))
+		children = TokenPatternMachine.__getChildren(tokenPattern)
+
+		if isinstance(tokenPattern, TokenPatternSequence):
+			# a sequence that matches no tokens fails: this can't be expressed by the instructions of the parsing machine
+			if TokenPatternMachine.__isNullable(tokenPattern):
+				raise Exception("Sequences that can match without consuming a token are not supported!")
+			pc = nextPC
+			for child in reversed(children):
+				pc = self.__compile(child, pc)
+			return pc
+
+		elif isinstance(tokenPattern, TokenPatternAlternatives):
+			if not children:
+				raise Exception("Alternatives without patterns are not supported!")
+			pc = self.__compile(children[-1], nextPC)
+			for child in reversed(children[:-1]):
+				childPC = self.__compile(child, self.__emit(( TokenPatternMachine.__OP_COMMIT, nextPC )))
+				pc = self.__emit(( TokenPatternMachine.__OP_CHOICE, pc, childPC ))
+			return pc
+
+		elif isinstance(tokenPattern, TokenPatternOptional):
+			childPC = self.__compile(children[0], self.__emit(( TokenPatternMachine.__OP_COMMIT, nextPC )))
+			return self.__emit(( TokenPatternMachine.__OP_CHOICE, nextPC, childPC ))
+
+		elif isinstance(tokenPattern, TokenPatternRepeat):
+			# a pattern that matches no tokens would be repeated forever by the interpreter
+			if TokenPatternMachine.__isNullable(children[0]):
+				raise Exception("Repeating patterns that can match without consuming a token is not supported!")
+			# match once, then loop
+			loopPC = self.__emit(None)
+			childPC = self.__compile(children[0], self.__emit(( TokenPatternMachine.__OP_COMMIT, loopPC )))
+			self.__program[loopPC] = ( TokenPatternMachine.__OP_CHOICE, nextPC, childPC )
+			return self.__compile(children[0], loopPC)
+
+		else:
+			raise Exception("Unsupported token pattern: " + type(tokenPattern).__name__)
+	#
+
+	#
+	# Run the instructions of a thread until it needs to consume a token or has matched. Threads spawned by CHOICE instructions are
+	# appended to <c>nodes</c> and are advanced as well.
+	#
+	# Temporary nodes are lists: [ kind, pc or pattern index or fallback node, stack, source register index, actions ].
+	#
+	def __advance(self, nodes:list, i:int):
+		program = self.__program
+		node = nodes[i]
+		pc = node[1]
+		stack = node[2]
+		actions = node[4]
+		while True:
+			instruction = program[pc]
+			op = instruction[0]
+			if op == TokenPatternMachine.__OP_TOKEN:
+				break
+			elif op == TokenPatternMachine.__OP_CHOICE:
+				j = len(nodes)
+				nodes.append([ TokenPatternMachine.__NODE_RUNNING, instruction[1], list(stack), node[3], list(actions) ])
+				self.__advance(nodes, j)
+				stack.append(j)
+				pc = instruction[2]
+			elif op == TokenPatternMachine.__OP_COMMIT:
+				stack.pop()
+				pc = instruction[1]
+			elif op == TokenPatternMachine.__OP_ACTIONS:
+				actions.extend(instruction[1])
+				pc = instruction[2]
+			else:
+				# match: the end marker records the position of the last token consumed
+				node[0] = TokenPatternMachine.__NODE_MATCHED
+				node[2] = None
+				actions.append(( "e", instruction[1] ))
+				pc = instruction[1]
+				break
+		node[1] = pc
+	#
+
+	#
+	# Convert temporary nodes to a state. The lock must be held by the caller.
+	#
+	# @return	tuple					Returns the transition: a 3-tuple of result, state (or <c>None</c>) and register specifications.
+	#
+	def __buildTransition(self, nodes:list) -> tuple:
+		NODE_FAILED = TokenPatternMachine.__NODE_FAILED
+
+		def resolve(i:int) -> int:
+			# a failed thread continues with the thread it falls back to
+			while (i >= 0) and (nodes[i][0] == NODE_FAILED):
+				i = nodes[i][1]
+			return i
+
+		root = resolve(0)
+		if root < 0:
+			return ( TokenPatternMachine.__TRANSITION_FAIL, None, None )
+		if nodes[root][0] == TokenPatternMachine.__NODE_MATCHED:
+			return ( TokenPatternMachine.__TRANSITION_MATCH, None, ( nodes[root][3], tuple(nodes[root][4]) ) )
+
+		# collect all threads that can still be reached and number them canonically
+
+		order = [ root ]
+		newIndices = { root: 0 }
+		for i in order:
+			if nodes[i][0] == TokenPatternMachine.__NODE_RUNNING:
+				for j in reversed(nodes[i][2]):
+					j = resolve(j)
+					if (j >= 0) and (j not in newIndices):
+						newIndices[j] = len(order)
+						order.append(j)
+
+		stateNodes = []
+		registerSpecs = []
+		for i in order:
+			node = nodes[i]
+			if node[0] == TokenPatternMachine.__NODE_RUNNING:
+				stack = []
+				for j in node[2]:
+					j = resolve(j)
+					stack.append(newIndices[j] if j >= 0 else -1)
+				stateNodes.append(( node[0], node[1], tuple(stack) ))
+			else:
+				stateNodes.append(( node[0], node[1] ))
+			registerSpecs.append(( node[3], tuple(node[4]) ))
+		stateNodes = tuple(stateNodes)
+
+		stateID = self.__stateIDsByNodes.get(stateNodes)
+		if stateID is None:
+			# (the transition table must exist before the state ID is visible to other threads)
+			stateID = len(self.__stateNodes)
+			self.__transitions.append({})
+			self.__stateNodes.append(stateNodes)
+			self.__stateIDsByNodes[stateNodes] = stateID
+
+		return ( TokenPatternMachine.__TRANSITION_CONTINUE, stateID, tuple(registerSpecs) )
+	#
+
+	def __getInitialState(self) -> tuple:
+		ret = self.__initialState
+		if ret is None:
+			with self.__lock:
+				ret = self.__initialState
+				if ret is None:
+					nodes = [ [ TokenPatternMachine.__NODE_RUNNING, self.__entryPC, [], 0, [] ] ]
+					self.__advance(nodes, 0)
+					ret = self.__buildTransition(nodes)
+					assert ret[0] == TokenPatternMachine.__TRANSITION_CONTINUE
+					self.__initialState = ret
+		return ret
+	#
+
+	#
+	# Create the transition of a state for the specified token key. If another thread has created the transition in the meantime that
+	# transition is returned.
+	#
+	def __createTransition(self, stateID:int, key) -> tuple:
+		with self.__lock:
+			ret = self.__transitions[stateID].get(key)
+			if ret is None:
+				ret = self.__createTransitionLocked(stateID, key)
+			return ret
+	#
+
+	def __createTransitionLocked(self, stateID:int, key) -> tuple:
+		program = self.__program
+
+		if key is TokenPatternMachine.__KEY_END:
+			tokenType = None
+		elif isinstance(key, tuple):
+			tokenType, tokenValue = key
+		else:
+			tokenType, tokenValue = key, None
+
+		# consume the token: all threads either advance or fail
+
+		nodes = []
+		for i, stateNode in enumerate(self.__stateNodes[stateID]):
+			if stateNode[0] == TokenPatternMachine.__NODE_MATCHED:
+				nodes.append([ stateNode[0], stateNode[1], None, i, [] ])
+				continue
+			stack = list(stateNode[2])
+			instruction = program[stateNode[1]]
+			if (tokenType is not None) and (instruction[1] == tokenType) and ((instruction[2] is None) or (instruction[2] == tokenValue)):
+				nodes.append([ stateNode[0], instruction[4], stack, i, list(instruction[3]) ])
+			else:
+				nodes.append([ TokenPatternMachine.__NODE_FAILED, stack[-1] if stack else -1, None, i, None ])
+
+		for i in range(len(self.__stateNodes[stateID])):
+			if nodes[i][0] == TokenPatternMachine.__NODE_RUNNING:
+				self.__advance(nodes, i)
+
+		ret = self.__buildTransition(nodes)
+		self.__transitions[stateID][key] = ret
+		return ret
+	#
+
+	#
+	# Build the result data exactly like <c>AbstractTokenPattern.tryMatch()</c> does. The data is recorded in the register: a linked list of
+	# 3-tuples of the previous register, the actions to perform and the position of the token consumed when they were recorded.
+	#
+	@staticmethod
+	def __buildResult(tokens:list, offset:int, defaults:dict, register) -> tuple:
+		chain = []
+		while register is not None:
+			chain.append(register)
+			register = register[0]
+
+		ret = {
+			"lineNo": tokens[offset].lineNo,
+			"colNo": tokens[offset].colNo,
+		}
+		if defaults is not None:
+			ret.update(defaults)
+
+		n = 0
+		patternIndex = -1
+		for _, actions, pos in reversed(chain):
+			for action in actions:
+				actionType = action[0]
+				if actionType == "t":
+					ret[action[1]] = action[2]
+				elif actionType == "e":
+					n = pos + 1 - offset
+					patternIndex = action[1]
+				else:
+					token = tokens[pos]
+					value = token.value if actionType == "v" else TypedValue(token.type, token.value)
+					varName = action[1]
+					v = ret.get(varName, None)
+					if v is None:
+						if action[2]:
+							ret[varName] = [ value ]
+						else:
+							ret[varName] = value
+					else:
+						if isinstance(v, list):
+							v.append(value)
+						else:
+							ret[varName] = [ v, value ]
+
+		return (True, n, ret, patternIndex)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Try to match the patterns at the specified position.
+	#
+	# @param	Token[] tokens			The tokens to match.
+	# @param	int offset				The position of the first token to match.
+	# @param	dict defaults			(optional) Default values for the result data.
+	# @return	tuple					Returns a 4-tuple: a boolean value indicating success, the number of tokens matched, the data parsed (just
+	#									like <c>AbstractTokenPattern.tryMatch()</c> returns them) and the index of the pattern that matched.
+	#
+	def tryMatch(self, tokens:list, offset:int = 0, defaults:dict = None) -> tuple:
+		assert isinstance(tokens, list)
+		assert isinstance(offset, int)
+
+		TRANSITION_CONTINUE = TokenPatternMachine.__TRANSITION_CONTINUE
+		valueKeys = self.__valueKeys
+		transitions = self.__transitions
+		nTokens = len(tokens)
+
+		_, stateID, registerSpecs = self.__getInitialState()
+		registers = [ ((None, actions, offset) if actions else None) for src, actions in registerSpecs ]
+
+		pos = offset
+		while True:
+			if pos < nTokens:
+				token = tokens[pos]
+				key = ( token.type, token.value )
+				if key not in valueKeys:
+					key = token.type
+			else:
+				key = TokenPatternMachine.__KEY_END
+
+			transition = transitions[stateID].get(key)
+			if transition is None:
+				transition = self.__createTransition(stateID, key)
+
+			result, stateID, registerSpecs = transition
+			if result == TRANSITION_CONTINUE:
+				registers = [ ((registers[src], actions, pos) if actions else registers[src]) for src, actions in registerSpecs ]
+				pos += 1
+			elif result == TokenPatternMachine.__TRANSITION_MATCH:
+				src, actions = registerSpecs
+				register = (registers[src], actions, pos) if actions else registers[src]
+				return TokenPatternMachine.__buildResult(tokens, offset, defaults, register)
+			else:
+				return (False, 0, None, -1)
+	#
+
+	#
+	# Try to match the patterns at the specified position by interpreting the pattern objects. This is much slower than <c>tryMatch()</c>
+	# but must always give the same result: it is provided for verifying the machine.
+	#
+	def tryMatchInterpreted(self, tokens:list, offset:int = 0, defaults:dict = None) -> tuple:
+		for i, tokenPattern in enumerate(self.__tokenPatterns):
+			(bResult, n, data) = tokenPattern.tryMatch(tokens, offset, defaults)
+			if bResult:
+				return (True, n, data, i)
+		return (False, 0, None, -1)
+	#
+
+#
+
+
+
+
+
+
+
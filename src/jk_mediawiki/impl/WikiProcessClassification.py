@@ -0,0 +1,119 @@
+import typing
+
+
+
+
+
+
+#
+# This class represents the result of classifying the processes of a process snapshot by <c>WikiProcessClassifier</c>.
+#
+class WikiProcessClassification(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	def __init__(self,
+			nginxMasterProcesses:typing.List[dict],
+			nginxWorkerProcesses:typing.List[dict],
+			phpFPMMasterProcesses:typing.List[dict],
+			phpFPMPoolProcesses:typing.List[dict],
+			cronProcessesByWikiName:typing.Dict[str,typing.List[dict]],
+		):
+
+		self.__nginxMasterProcesses = nginxMasterProcesses
+		self.__nginxWorkerProcesses = nginxWorkerProcesses
+		self.__phpFPMMasterProcesses = phpFPMMasterProcesses
+		self.__phpFPMPoolProcesses = phpFPMPoolProcesses
+		self.__cronProcessesByWikiName = cronProcessesByWikiName
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def nginxMasterProcesses(self) -> typing.List[dict]:
+		return list(self.__nginxMasterProcesses)
+	#
+
+	@property
+	def nginxWorkerProcesses(self) -> typing.List[dict]:
+		return list(self.__nginxWorkerProcesses)
+	#
+
+	#
+	# The NGINX master processes followed by their worker processes. (This is the same as <c>WikiNGINXProcessFilter</c> returns.)
+	#
+	@property
+	def nginxProcesses(self) -> typing.List[dict]:
+		return self.__nginxMasterProcesses + self.__nginxWorkerProcesses
+	#
+
+	@property
+	def phpFPMMasterProcesses(self) -> typing.List[dict]:
+		return list(self.__phpFPMMasterProcesses)
+	#
+
+	@property
+	def phpFPMPoolProcesses(self) -> typing.List[dict]:
+		return list(self.__phpFPMPoolProcesses)
+	#
+
+	#
+	# The PHP-FPM master processes followed by their pool processes. (This is the same as <c>WikiPHPProcessFilter</c> returns.)
+	#
+	@property
+	def phpFPMProcesses(self) -> typing.List[dict]:
+		return self.__phpFPMMasterProcesses + self.__phpFPMPoolProcesses
+	#
+
+	#
+	# Maps the names of all wikis with cron processes to these processes.
+	#
+	@property
+	def cronProcessesByWikiName(self) -> typing.Dict[str,typing.List[dict]]:
+		return { wikiName: list(processes) for wikiName, processes in self.__cronProcessesByWikiName.items() }
+	#
+
+	#
+	# The names of all wikis with cron processes (sorted alphabetically).
+	#
+	@property
+	def runningWikiNames(self) -> typing.List[str]:
+		return sorted(self.__cronProcessesByWikiName.keys())
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get the cron processes of the specified wiki.
+	#
+	# @return	dict[]				Returns the process records or <c>None</c> if there are no cron processes for this wiki. (This is the
+	#								same as <c>MediaWikiLocalUserInstallationMgr.getCronProcesses()</c> returns.)
+	#
+	def getCronProcesses(self, wikiName:str) -> typing.Union[typing.List[dict],None]:
+		processes = self.__cronProcessesByWikiName.get(wikiName)
+		return list(processes) if processes else None
+	#
+
+	def isCronScriptRunning(self, wikiName:str) -> bool:
+		return wikiName in self.__cronProcessesByWikiName
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,122 @@
+import os
+import typing
+
+import jk_typing
+
+from .WikiProcessClassification import WikiProcessClassification
+
+
+
+
+
+
+#
+# This class assigns the processes of a user to the local services and wikis they belong to: NGINX master and worker processes, PHP-FPM
+# master and pool processes and the cron processes ("maintenance/runJobs.php") of each wiki.
+#
+# All processes are classified in a single pass, regardless of the number of wikis: Instead of running <c>WikiNGINXProcessFilter</c>,
+# <c>WikiPHPProcessFilter</c> and a <c>WikiCronProcessFilter</c> for every wiki on the same process list use this class. The processes
+# are recognized by the same criteria these filters use.
+#
+class WikiProcessClassifier(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	str userName							The name of the user account the services and wikis are run with.
+	# @param	dict wikiInstDirPathsByWikiName			Maps the names of the wikis to the directories of the wiki installations (= the
+	#													directories where the "LocalSettings.php" files reside).
+	#
+	@jk_typing.checkFunctionSignature()
+	def __init__(self, userName:str, wikiInstDirPathsByWikiName:typing.Dict[str,str]):
+		self.__userName = userName
+		self.__wikiNamesByRunJobsPath = {
+			os.path.join(wikiInstDirPath, "maintenance", "runJobs.php"): wikiName
+			for wikiName, wikiInstDirPath in wikiInstDirPathsByWikiName.items()
+		}
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def userName(self) -> str:
+		return self.__userName
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Classify processes.
+	#
+	# @param	dict[] processes					The process records, e.g. a <c>ProcessSnapshot</c>.
+	# @return	WikiProcessClassification			The processes found.
+	#
+	def classify(self, processes:typing.Iterable[dict]) -> WikiProcessClassification:
+		userName = self.__userName
+		wikiNamesByRunJobsPath = self.__wikiNamesByRunJobsPath
+
+		nginxMasterProcesses = []
+		nginxOtherProcesses = []
+		phpFPMMasterProcesses = []
+		phpFPMPoolCandidates = []
+		cronProcessesByWikiName = {}
+
+		for x in processes:
+			if x.get("user") != userName:
+				continue
+
+			cmd = x.get("cmd")
+			if cmd == "nginx:":
+				if x.get("args", "").startswith("master process nginx -c"):
+					nginxMasterProcesses.append(x)
+				else:
+					nginxOtherProcesses.append(x)
+
+			elif cmd == "php-fpm:":
+				args = x.get("args")
+				if args is None:
+					continue
+				if args.endswith("/fpm/php-fpm.conf)"):
+					phpFPMMasterProcesses.append(x)
+				elif args == "pool www":
+					phpFPMPoolCandidates.append(x)
+
+			elif cmd == "php":
+				for arg in x.get("args_list", ()):
+					wikiName = wikiNamesByRunJobsPath.get(arg)
+					if wikiName is not None:
+						cronProcessesByWikiName.setdefault(wikiName, []).append(x)
+						break
+
+		# workers and pool processes are recognized by their parent process
+
+		nginxMasterPIDs = { x["pid"] for x in nginxMasterProcesses }
+		phpFPMMasterPIDs = { x["pid"] for x in phpFPMMasterProcesses }
+
+		return WikiProcessClassification(
+			nginxMasterProcesses = nginxMasterProcesses,
+			nginxWorkerProcesses = [ x for x in nginxOtherProcesses if x.get("ppid") in nginxMasterPIDs ],
+			phpFPMMasterProcesses = phpFPMMasterProcesses,
+			phpFPMPoolProcesses = [ x for x in phpFPMPoolCandidates if x.get("ppid") in phpFPMMasterPIDs ],
+			cronProcessesByWikiName = cronProcessesByWikiName,
+		)
+	#
+
+#
+
+
+
+
+
+
+
+
+
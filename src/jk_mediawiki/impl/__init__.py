@@ -6,14 +6,20 @@ __version__ = "0.2022.1.12.1"
 
 
 from .Utils import Utils
+from .TokenPatternMachine import TokenPatternMachine
 
 from .LocalWikiInstInfo import LocalWikiInstInfo
 from .LocalWikiScanner import LocalWikiScanner
 
+from .ProcessSnapshot import ProcessSnapshot
 from .AbstractProcessFilter import AbstractProcessFilter
 from .OSProcessProvider import OSProcessProvider
+from .ProcFSProcessProvider import ProcFSProcessProvider
 from .ProcessProviderCache import ProcessProviderCache
 from .ProcessFilter import ProcessFilter
+from .ProcessWaiter import ProcessWaiter
 from .WikiCronProcessFilter import WikiCronProcessFilter
 from .WikiPHPProcessFilter import WikiPHPProcessFilter
 from .WikiNGINXProcessFilter import WikiNGINXProcessFilter
+from .WikiProcessClassification import WikiProcessClassification
+from .WikiProcessClassifier import WikiProcessClassifier
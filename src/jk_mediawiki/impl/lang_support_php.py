@@ -5,15 +5,13 @@
 
 
 import re
-import os
-import sys
 
 
 
 
 
 from jk_utils import TypedValue
-from jk_utils.tokenizer import RegExBasedTokenizer, Token
+from jk_utils.tokenizer import Token
 
 
 
@@ -26,7 +24,7 @@ def tokenValueToPHP(dataType:str, value):
 	elif dataType == "str2":
 		return "\"" + PHP.encodeString(value) + "\""
 	elif dataType == "str1":
-		return "\'" + PHP.encodeString(value) + "\'"
+		return "\'" + PHP.encodeSingleQuotedString(value) + "\'"
 	elif dataType == "int":
 		return str(value)
 	elif dataType == "op":
@@ -35,6 +33,8 @@ def tokenValueToPHP(dataType:str, value):
 		return value
 	elif dataType == "magic":
 		return value
+	elif dataType == "null":
+		return "null"
 	else:
 		raise Exception("Implementation Error! (" + repr(dataType) + ", " + repr(value) + ")")
 #
@@ -58,69 +58,269 @@ setattr(TypedValue, "toPHP", __toPHP)
 #
 # This tokenizer parses a PHP file.
 #
-class PHPTokenizer(RegExBasedTokenizer):
+# All token patterns are combined into a single master regular expression with named groups. This expression is built and compiled only once
+# per process: all instances of this class share it. Use <c>PHPTokenizer.instance()</c> to obtain a shared instance instead of creating a new
+# tokenizer for every file to parse.
+#
+class PHPTokenizer(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
 
+	# The token pattern definitions. Each definition is a 2-tuple (group name, regex) or a 4-tuple (group name, prefix regex, regex, postfix regex).
+	# The token type is the part of the group name before the first underscore.
+	#
+	# All patterns match in linear time: Strings (which may contain escaped quotes) and block comments use the "unrolled loop" form instead of
+	# a lazy quantifier, heredoc and nowdoc strings are scanned line by line for the closing identifier. (A heredoc string is a token of type "str2", a nowdoc string is a token
+	# of type "str1".) Like PHP does an unterminated block comment extends to the end of the text; so does an unterminated heredoc or nowdoc
+	# string. This way text added after such a token can not change the tokens before it.
+	__PATTERN_DEFS = [
+		( "phpintro", "<\\?php" ),
+		( "phpoutro", "\\?>" ),
+		( "str1", r"'", r"[^'\\]*(?:\\[\s\S][^'\\]*)*", r"'" ),
+		( "str2", r"\"", r"[^\"\\]*(?:\\[\s\S][^\"\\]*)*", r"\"" ),
+		( "str2_heredoc", r"<<<[ \t]*(?P<heredocQ>\"?)(?P<heredocId>[a-zA-Z_][a-zA-Z0-9_]*)(?P=heredocQ)\n(?:[^\n]*\n)*?(?:[ \t]*(?P=heredocId)(?![a-zA-Z0-9_])|[^\n]*\Z)" ),
+		( "str1_nowdoc", r"<<<[ \t]*'(?P<nowdocId>[a-zA-Z_][a-zA-Z0-9_]*)'\n(?:[^\n]*\n)*?(?:[ \t]*(?P=nowdocId)(?![a-zA-Z0-9_])|[^\n]*\Z)" ),
+		( "int_1", r"[+-]?[1-9][0-9]*" ),
+		( "int_2", r"0" ),
+		( "varref", r"\$", r"[a-zA-Z_][a-zA-Z0-9_]*", None ),
+		( "commentx", "#=#" ),
+		( "comment_1", "#[^\n]*" ),
+		( "comment_2", "//[^\n]*" ),
+		( "comment_3", r"/\*[^*]*\*+(?:[^/*][^*]*\*+)*/|/\*[^*]*(?:\*+[^/*][^*]*)*\**\Z" ),
+		( "lparen1", "\\(" ),
+		( "rparen1", "\\)" ),
+		( "lparen2", "\\[" ),
+		( "rparen2", "\\]" ),
+		( "lparen3", "\\{" ),
+		( "rparen3", "\\}" ),
+		( "semicolon", r";" ),
+		( "bool_1", r"true" ),
+		( "bool_2", r"false" ),
+		( "null", r"null" ),
+		( "word", r"[a-zA-Z_][a-zA-Z0-9_]*" ),
+	]
+
+	# The groups of tokens that can contain line breaks
+	__MULTI_LINE_GROUP_NAMES = [ "str1", "str2", "str2_heredoc", "str1_nowdoc", "comment_3" ]
+
+	__OPERATORS = [ "===", "!==", "<<=", ">>=", "<=>",
+		"<>", "||", "&&", "==", "!=", "+=", "-=", "*=", "/=", "%=", "<=", ">=", "^=", "=>", "++", "--", ">>", "<<", "??", "->",
+		"^", "!", "%", "+", "-", "*", "/", ".", ",", "?", ":", "~", "@", "&", "|", "=" ]
+
+	################################################################################################################################
+	## Variables
+	################################################################################################################################
+
+	# @field		re.Pattern __masterRegEx		The compiled master regular expression; shared by all instances
+	# @field		re.Pattern __masterRegExB		The same regular expression compiled for matching binary data (such as memory mapped files)
+	# @field		dict __groupInfos				Maps a regex group name to a 3-tuple: the token type, a value parsing function (or <c>None</c>) and
+	#												a flag indicating whether tokens of this group can contain line breaks
+	# @field		PHPTokenizer __instance			The shared tokenizer instance
+
+	__masterRegEx = None
+	__masterRegExB = None
+	__groupInfos = None
+	__instance = None
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
 	def __init__(self):
-		super().__init__([
-			( "phpintro", "<\\?php" ),
-			( "phpoutro", "\\?>" ),
-			( "str1", r"'", r"[^']*", r"'" ),
-			( "str2", r"\"", r"[^\"]*", r"\"" ),
-			( "int_1", r"[+-]?[1-9][0-9]*" ),
-			( "int_2", r"0" ),
-			( "varref", r"\$", r"[a-zA-Z_][a-zA-Z0-9_]*", None ),
-			( "commentx", "#=#" ),
-			( "comment_1", "#[^\n]*" ),
-			( "comment_2", "//[^\n]*" ),
-			( "comment_3", "/*[.*?]*/" ),
-			( "lparen1", "\\(" ),
-			( "rparen1", "\\)" ),
-			( "lparen2", "\\[" ),
-			( "rparen2", "\\]" ),
-			( "lparen3", "\\{" ),
-			( "rparen3", "\\}" ),
-			( "semicolon", r";" ),
-			( "bool_1", r"true" ),
-			( "bool_2", r"false" ),
-			( "null", r"null" ),
-			( "word", r"[a-zA-Z_][a-zA-Z0-9_]*" ),
-		])
-
-		i = 1
-		for op in [ "===", "!==", "<<=", ">>=", "<=>",
-			"<>", "||", "&&", "==", "!=", "+=", "-=", "*=", "/=", "%=", "<=", ">=", "^=", "=>", "++", "--", ">>", "<<", "??", "->",
-			"^", "!", "%", "+", "-", "*", "/", ".", ",", "?", ":", "~", "@", "&", "|", "=" ]:
-			self.addTokenPattern("op_" + str(i), re.escape(op))
-			i += 1
-
-		self.compile()
-
-		self.registerTypeParsingDelegate("int", "1", self.__parseInt)
-		self.registerTypeParsingDelegate("int", "2", self.__parseInt)
-		self.registerTypeParsingDelegate("str1", None, PHP.decodeString)
-		self.registerTypeParsingDelegate("str2", None, PHP.decodeString)
-		self.registerTypeParsingDelegate("bool", "1", self.__parseBool)
-		self.registerTypeParsingDelegate("bool", "2", self.__parseBool)
-		self.registerTypeParsingDelegate("null", None, self.__parseNull)
-	#
-
-	def __parseNull(self, rawTokenText):
+		if PHPTokenizer.__masterRegEx is None:
+			PHPTokenizer.__compileMasterRegEx()
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __parseNull(rawTokenText):
 		return None
 	#
 
-	def __parseBool(self, rawTokenText):
+	@staticmethod
+	def __parseBool(rawTokenText):
 		return rawTokenText == "true"
 	#
 
-	def __parseInt(self, rawTokenText):
+	@staticmethod
+	def __parseInt(rawTokenText):
 		return int(rawTokenText)
 	#
 
-	def tokenize(self, text, bEmitWhiteSpaces = False, bEmitNewLines = False, bEmitComments = False):
-		for token in super().tokenize(text, bEmitWhiteSpaces, bEmitNewLines):
-			if (token.type == "comment") and not bEmitComments:
-				continue
-			yield token
+	@staticmethod
+	def __compileMasterRegEx():
+		# all operators go into a single group: the regex engine can then test them at once instead of trying some dozens of alternatives
+		patternDefs = list(PHPTokenizer.__PATTERN_DEFS)
+		patternDefs.append(( "op", "|".join([ re.escape(op) for op in PHPTokenizer.__OPERATORS ]) ))
+
+		# whitespace is by far the most frequent token and no other pattern can start with a whitespace character: try it first
+		parts = [ "(?P<NEWLINE>\n)", "(?P<SPACE>[\t ]+)" ]
+		groupInfos = {}
+		for patternDef in patternDefs:
+			groupName = patternDef[0]
+			if len(patternDef) == 2:
+				parts.append("(?P<" + groupName + ">" + patternDef[1] + ")")
+			else:
+				p = ""
+				if patternDef[1] is not None:
+					p += "(?:" + patternDef[1] + ")"
+				p += "(?P<" + groupName + ">" + patternDef[2] + ")"
+				if patternDef[3] is not None:
+					p += "(?:" + patternDef[3] + ")"
+				parts.append(p)
+			groupInfos[groupName] = ( groupName.split("_", 1)[0], None, groupName in PHPTokenizer.__MULTI_LINE_GROUP_NAMES )
+		parts.append("(?P<ERROR>.)")
+
+		for groupName, fn in [
+				( "int_1", PHPTokenizer.__parseInt ),
+				( "int_2", PHPTokenizer.__parseInt ),
+				( "str1", PHP.decodeSingleQuotedString ),
+				( "str2", PHP.decodeString ),
+				( "str2_heredoc", PHP.decodeHeredoc ),
+				( "str1_nowdoc", PHP.decodeHeredoc ),
+				( "bool_1", PHPTokenizer.__parseBool ),
+				( "bool_2", PHPTokenizer.__parseBool ),
+				( "null", PHPTokenizer.__parseNull ),
+			]:
+			groupInfos[groupName] = ( groupInfos[groupName][0], fn, groupInfos[groupName][2] )
+
+		PHPTokenizer.__groupInfos = groupInfos
+		PHPTokenizer.__masterRegEx = re.compile("|".join(parts))
+		# all patterns are pure ASCII: they match UTF-8 encoded data just the same way
+		PHPTokenizer.__masterRegExB = re.compile("|".join(parts).encode("ascii"))
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Tokenize the specified PHP source code.
+	#
+	# Line breaks within tokens (such as block comments or multi line strings) are counted: The line and column numbers of all tokens are
+	# the positions of the tokens in the text.
+	#
+	# @param		str text				The source code
+	# @param		bool bEmitOffsets		If <c>True</c> 3-tuples are returned: the start offset and end offset of the token in the text and the token.
+	# @return		Token[] tokens			Returns token objects. Whitespace, newline and comment tokens are only emitted if requested.
+	#
+	def tokenize(self, text, bEmitWhiteSpaces = False, bEmitNewLines = False, bEmitComments = False, bEmitOffsets = False):
+		groupInfos = PHPTokenizer.__groupInfos
+
+		lineNo = 1
+		lineStart = 0
+		for mo in PHPTokenizer.__masterRegEx.finditer(text):
+			groupName = mo.lastgroup
+			if groupName == "NEWLINE":
+				if bEmitNewLines:
+					t = Token("NEWLINE", "\n", lineNo, mo.start() - lineStart + 1)
+					yield (mo.start(), mo.end(), t) if bEmitOffsets else t
+				lineStart = mo.end()
+				lineNo += 1
+			elif groupName == "SPACE":
+				if bEmitWhiteSpaces:
+					t = Token("SPACE", mo.group(groupName), lineNo, mo.start() - lineStart + 1)
+					yield (mo.start(), mo.end(), t) if bEmitOffsets else t
+			elif groupName == "ERROR":
+				raise RuntimeError("Tokenization error encountered at " + str(lineNo) + ":" + str(mo.start() - lineStart + 1) + "!")
+			else:
+				tokenType, fn, bMultiLine = groupInfos[groupName]
+				start = mo.start()
+				if (tokenType == "comment") and not bEmitComments:
+					t = None
+				else:
+					value = mo.group(groupName)
+					if fn is not None:
+						value = fn(value)
+					t = Token(tokenType, value, lineNo, start - lineStart + 1)
+				if bMultiLine:
+					end = mo.end()
+					n = text.count("\n", start, end)
+					if n > 0:
+						lineNo += n
+						lineStart = text.rfind("\n", start, end) + 1
+				if t is not None:
+					yield (start, mo.end(), t) if bEmitOffsets else t
+	#
+
+	#
+	# Tokenize the specified PHP source code provided as binary data. Use this to tokenize a memory mapped file: Tokens are produced
+	# as the data is scanned, the data is never decoded as a whole.
+	#
+	# Column numbers and offsets are counted in characters (not bytes), so the tokens produced are exactly the same as <c>tokenize()</c>
+	# would produce for the decoded text.
+	#
+	# @param		bytes|mmap buffer		The UTF-8 encoded source code
+	# @param		bool bEmitOffsets		If <c>True</c> 3-tuples are returned: the start offset and end offset of the token in the text and the token.
+	# @return		Token[] tokens			Returns token objects. Whitespace, newline and comment tokens are only emitted if requested.
+	#
+	def tokenizeBuffer(self, buffer, bEmitWhiteSpaces = False, bEmitNewLines = False, bEmitComments = False, bEmitOffsets = False):
+		groupInfos = PHPTokenizer.__groupInfos
+
+		lineNo = 1
+		lineStart = 0
+		nExtraBytes = 0			# the number of bytes so far that are part of multi byte characters but do not start a character
+		for mo in PHPTokenizer.__masterRegExB.finditer(buffer):
+			groupName = mo.lastgroup
+			if groupName == "NEWLINE":
+				if bEmitNewLines:
+					t = Token("NEWLINE", "\n", lineNo, mo.start() - lineStart + 1)
+					yield (mo.start() - nExtraBytes, mo.end() - nExtraBytes, t) if bEmitOffsets else t
+				lineStart = mo.end()
+				lineNo += 1
+			elif groupName == "SPACE":
+				if bEmitWhiteSpaces:
+					t = Token("SPACE", mo.group(groupName).decode("ascii"), lineNo, mo.start() - lineStart + 1)
+					yield (mo.start() - nExtraBytes, mo.end() - nExtraBytes, t) if bEmitOffsets else t
+			elif groupName == "ERROR":
+				raise RuntimeError("Tokenization error encountered at " + str(lineNo) + ":" + str(mo.start() - lineStart + 1) + "!")
+			else:
+				tokenType, fn, bMultiLine = groupInfos[groupName]
+				tokenLineNo = lineNo
+				colNo = mo.start() - lineStart + 1
+				start = mo.start() - nExtraBytes
+				rawValue = mo.group(groupName)
+				value = rawValue.decode("utf-8")
+				# multi byte characters: make sure all subsequent column numbers in this line and all offsets are counted in characters
+				# (prefixes and postfixes of token patterns are pure ASCII)
+				n = len(rawValue) - len(value)
+				lineStart += n
+				nExtraBytes += n
+				if bMultiLine:
+					rawText = mo.group()
+					i = rawText.rfind(b"\n")
+					if i >= 0:
+						lineNo += rawText.count(b"\n")
+						tail = rawText[i+1:]
+						lineStart = mo.start() + i + 1 + len(tail) - len(tail.decode("utf-8"))
+				if (tokenType == "comment") and not bEmitComments:
+					continue
+				if fn is not None:
+					value = fn(value)
+				t = Token(tokenType, value, tokenLineNo, colNo)
+				yield (start, mo.end() - nExtraBytes, t) if bEmitOffsets else t
+	#
+
+	################################################################################################################################
+	## Static Methods
+	################################################################################################################################
+
+	#
+	# Returns a tokenizer instance that is shared process wide. As tokenizers have no state this instance can be used freely.
+	#
+	@staticmethod
+	def instance():
+		if PHPTokenizer.__instance is None:
+			PHPTokenizer.__instance = PHPTokenizer()
+		return PHPTokenizer.__instance
 	#
 
 #
@@ -133,6 +333,15 @@ class PHPTokenizer(RegExBasedTokenizer):
 
 
 
+#
+# Encoding and decoding of PHP string literals.
+#
+# Double quoted strings (and heredoc strings) support escape sequences: "\n", "\t", "\\", "\$", "\"", octal and hexadecimal values, "\u{...}"
+# and some more. A backslash followed by any other character is kept as it is. In single quoted strings (and nowdoc strings) only "\\"
+# and "\'" are escape sequences; every other backslash is an ordinary character.
+#
+# See: http://php.net/manual/en/language.types.string.php
+#
 class PHP(object):
 
 	_REPL1 = {
@@ -142,10 +351,13 @@ class PHP(object):
 		"v": "\v",
 		"e": "\x1B",
 		"f": "\f",
+		"\\": "\\",
+		"$": "$",
+		"\"": "\"",
 	}
 
 	_REPL2 = {
-		"\x00": "\\0",
+		"\x00": "\\x00",		# (not "\\0": this would be ambiguous if followed by a digit)
 		"\x01": "\\x01",
 		"\x02": "\\x02",
 		"\x03": "\\x03",
@@ -179,11 +391,24 @@ class PHP(object):
 		"\x1f": "\\x1f",
 		"\"": "\\\"",
 		"\\": "\\\\",
+		"$": "\\$",			# (otherwise PHP would substitute variables)
 	}
 
-	_RE_OCTAL = re.compile("[0-7]{1,3}")
-	_RE_HEX = re.compile("x[0-9A-Fa-f]{1,2}")
-	_RE_UNICODE = re.compile("u{[0-9A-Fa-f]+}")
+	# Translation table for encoding strings: maps the ordinal of every character to escape to its escape sequence
+	_ENCODE_TABLE = str.maketrans(_REPL2)
+
+	# Translation table for encoding single quoted strings
+	_ENCODE_TABLE_SINGLE_QUOTED = str.maketrans({
+		"\'": "\\'",
+		"\\": "\\\\",
+	})
+
+	# Matches a single escape sequence. Groups: 1 = unicode code point (hex), 2 = hex value, 3 = octal value, 4 = any other character.
+	# A single backslash at the end of the string matches as well (and is kept).
+	_RE_ESCAPE = re.compile(r"\\(?:u\{([0-9A-Fa-f]+)\}|x([0-9A-Fa-f]{1,2})|([0-7]{1,3})|(.)|\Z)", re.DOTALL)
+
+	# Matches a single escape sequence of a single quoted string. Group 1 = the character escaped.
+	_RE_ESCAPE_SINGLE_QUOTED = re.compile(r"\\([\\'])")
 
 	"""
 	@staticmethod
@@ -237,67 +462,81 @@ class PHP(object):
 	"""
 
 	#
-	# Creates a text from a given string that directly could be inserted into a PHP source code file to represent a string.
+	# Creates a text from a given string that directly could be inserted into a PHP source code file to represent a string (enclosed in
+	# double quotes).
 	#
 	@staticmethod
 	def encodeString(someString):
-		ret = ""
-		for c in someString:
-			ret += PHP._REPL2.get(c, c)
-		return ret
+		return someString.translate(PHP._ENCODE_TABLE)
 	#
 
 	#
-	# Parses (= decodes) a PHP source code string.
+	# Creates a text from a given string that directly could be inserted into a PHP source code file to represent a string enclosed in
+	# single quotes.
+	#
+	@staticmethod
+	def encodeSingleQuotedString(someString):
+		return someString.translate(PHP._ENCODE_TABLE_SINGLE_QUOTED)
+	#
+
+	@staticmethod
+	def __decodeEscape(matchResult):
+		hexCodePoint, hexValue, octValue, c = matchResult.groups()
+		if hexCodePoint is not None:
+			return chr(int(hexCodePoint, 16))
+		if hexValue is not None:
+			return chr(int(hexValue, 16))
+		if octValue is not None:
+			# PHP strings are byte strings: values above "\377" overflow
+			return chr(int(octValue, 8) & 0xff)
+		if c is not None:
+			ret = PHP._REPL1.get(c)
+			return ("\\" + c) if ret is None else ret
+		return "\\"
+	#
+
+	#
+	# Parses (= decodes) a PHP heredoc or nowdoc string. The text specified is the complete token: starting with "<<<" and ending with the
+	# closing identifier. The indentation of the closing identifier is removed from all lines (as PHP 7.3 does). Escape sequences are decoded
+	# in heredoc strings only.
+	#
+	# See: https://www.php.net/manual/en/language.types.string.php#language.types.string.syntax.heredoc
+	#
+	@staticmethod
+	def decodeHeredoc(rawTokenText):
+		lines = rawTokenText.split("\n")
+		closingLine = lines[-1]
+		indentation = closingLine[:len(closingLine) - len(closingLine.lstrip(" \t"))]
+		bodyLines = lines[1:-1]
+		if indentation:
+			bodyLines = [ line[len(indentation):] if line.startswith(indentation) else line.lstrip(" \t") for line in bodyLines ]
+		body = "\n".join(bodyLines)
+		if "'" in lines[0]:
+			# nowdoc
+			return body
+		return PHP.decodeString(body)
+	#
+
+	#
+	# Parses (= decodes) a PHP source code string enclosed in double quotes. (The quotes must not be included.)
 	#
 	# See: http://php.net/manual/en/language.types.string.php
 	#
 	@staticmethod
 	def decodeString(someString):
-		ret = ""
-		bMasked = False
-		i = 0
-		imax = len(someString)
-		while i < imax:
-			c = someString[i]
-			if bMasked:
-				result = PHP._RE_UNICODE.match(someString, i)
-				if result:
-					clip = someString[i:result.endpos()]
-					i += len(clip)
-					ret += chr(int(clip))
-				else:
-					result = PHP._RE_HEX.match(someString, i)
-					if result:
-						clip = someString[i:result.endpos()]
-						i += len(clip)
-						if len(clip) == 1:
-							clip = "0" + clip
-						ret += chr(int(clip, 16))
-					else:
-						result = PHP._RE_OCTAL.match(someString, i)
-						if result:
-							clip = someString[i:result.endpos()]
-							i += len(clip)
-							while len(clip) < 3:
-								clip = "0" + clip
-							ret += chr(int(clip, 8))
-						else:
-							# fallback
-							repl = PHP._REPL1.get(c, None)
-							if repl is None:
-								ret += c
-							else:
-								ret += repl
-							i += 1
-				bMasked = False
-			else:
-				if c == "\\":
-					bMasked = True
-				else:
-					ret += c
-				i += 1
-		return ret
+		if "\\" not in someString:
+			return someString
+		return PHP._RE_ESCAPE.sub(PHP.__decodeEscape, someString)
+	#
+
+	#
+	# Parses (= decodes) a PHP source code string enclosed in single quotes. (The quotes must not be included.)
+	#
+	@staticmethod
+	def decodeSingleQuotedString(someString):
+		if "\\" not in someString:
+			return someString
+		return PHP._RE_ESCAPE_SINGLE_QUOTED.sub(r"\1", someString)
 	#
 
 #
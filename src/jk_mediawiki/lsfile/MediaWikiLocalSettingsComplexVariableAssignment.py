@@ -35,6 +35,7 @@ class MediaWikiLocalSettingsComplexVariableAssignment(object):
 		self.__bIsActive = bIsActive
 		self.__varName = varName
 		self.__x = x
+		self.__nModifications = 0
 	#
 
 	# ================================================================================================================================
@@ -65,6 +66,22 @@ class MediaWikiLocalSettingsComplexVariableAssignment(object):
 		return not self.__bIsActive
 	#
 
+	#
+	# Has this entry been modified since it has been parsed? (Only modified entries need to be rendered again on saving.)
+	#
+	@property
+	def isModified(self) -> bool:
+		return self.__nModifications > 0
+	#
+
+	#
+	# The number of modifications of this entry. (This is used to detect if values derived from this entry are still valid.)
+	#
+	@property
+	def modificationCount(self) -> int:
+		return self.__nModifications
+	#
+
 	# ================================================================================================================================
 	# ==== Methods
 
@@ -94,15 +111,25 @@ class MediaWikiLocalSettingsComplexVariableAssignment(object):
 	def activate(self):
 		if not self.__bIsActive:
 			self.__bIsActive = True
+			self.__nModifications += 1
 			self.__changedFlag.setChanged(True)
 	#
 
 	def deactivate(self):
 		if self.__bIsActive:
 			self.__bIsActive = False
+			self.__nModifications += 1
 			self.__changedFlag.setChanged(True)
 	#
 
+	#
+	# Move this entry by the specified number of lines. This is used by <c>MediaWikiLocalSettingsFile.reload()</c> if lines have been
+	# inserted or removed before this entry. (This does not change the file's content.)
+	#
+	def _shiftLineNo(self, delta:int):
+		self.__lineNo += delta
+	#
+
 	#
 	# Use this method to obtain the value of this variable.
 	#
@@ -0,0 +1,269 @@
+
+
+
+import bisect
+from array import array
+
+from jk_utils.tokenizer import Token
+
+from ..impl.lang_support_php import PHP, tokenValueToPHP
+
+
+
+
+
+
+#
+# This class stores the entries of a parsed "LocalSettings.php" file in a compact way.
+#
+# An entry is either a token or a statement (= a variable assignment object). Instead of keeping a <c>Token</c> object for every token
+# (which would require more than hundred bytes even for a single space character) only the kind of the token, its position in the original
+# text and its line and column number is stored - in arrays of machine integers. Token objects are created on demand only.
+# Statements are kept as objects.
+#
+# Iterating over an instance of this class yields 2-tuples exactly like iterating over a list of entries did before: the entry type (either
+# "arrayAppend", "varAssign", "varAssignComplex", "include", "loadExtension" or "other") and the statement or token.
+#
+class MediaWikiLocalSettingsEntryList(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	# All token types. The index of a token type in this list is used as kind code.
+	__TOKEN_TYPES = (
+		"NEWLINE", "SPACE", "comment", "commentx", "varref", "op", "semicolon", "word", "str1", "str2", "int", "bool", "null",
+		"lparen1", "rparen1", "lparen2", "rparen2", "lparen3", "rparen3", "phpintro", "phpoutro",
+	)
+
+	__KINDS_BY_TOKEN_TYPE = { tokenType: i for i, tokenType in enumerate(__TOKEN_TYPES) }
+
+	# The kind code of a statement
+	__KIND_STATEMENT = 255
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	str text				The text the entries are parsed from.
+	#
+	def __init__(self, text:str):
+		assert isinstance(text, str)
+
+		self.__text = text
+		self.__kinds = array("B")
+		self.__starts = array("I")
+		self.__ends = array("I")
+		self.__lineNos = array("i")
+		self.__colNos = array("i")
+
+		# the indices of all statements (in ascending order) and the statements as 2-tuples of entry type and statement object
+		self.__stmtIndices = array("I")
+		self.__stmts = []
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def text(self) -> str:
+		return self.__text
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Recreate the token at the specified position.
+	#
+	def __getToken(self, i:int) -> Token:
+		tokenType = MediaWikiLocalSettingsEntryList.__TOKEN_TYPES[self.__kinds[i]]
+		s = self.__text[self.__starts[i]:self.__ends[i]]
+		if tokenType == "varref":
+			value = s[1:]
+		elif (tokenType == "str1") or (tokenType == "str2"):
+			if s.startswith("<<<"):
+				value = PHP.decodeHeredoc(s)
+			elif tokenType == "str1":
+				value = PHP.decodeSingleQuotedString(s[1:-1])
+			else:
+				value = PHP.decodeString(s[1:-1])
+		elif tokenType == "int":
+			value = int(s)
+		elif tokenType == "bool":
+			value = s == "true"
+		elif tokenType == "null":
+			value = None
+		else:
+			value = s
+		return Token(tokenType, value, self.__lineNos[i], self.__colNos[i])
+	#
+
+	#
+	# Build the PHP representation of a token. (This is only used for tokens that are not part of the original text.)
+	#
+	@staticmethod
+	def __tokenToPHP(token:Token) -> str:
+		if token.type == "varref":
+			return "$" + token.value
+		elif token.type in [ "bool", "str1", "str2", "int", "word" ]:
+			return tokenValueToPHP(token.type, token.value)
+		elif token.type == "null":
+			return "null"
+		else:
+			assert isinstance(token.value, str)
+			return token.value
+	#
+
+	def __appendRaw(self, kind:int, start:int, end:int, lineNo:int, colNo:int):
+		self.__kinds.append(kind)
+		self.__starts.append(start)
+		self.__ends.append(end)
+		self.__lineNos.append(lineNo)
+		self.__colNos.append(colNo)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __len__(self):
+		return len(self.__kinds)
+	#
+
+	def __iter__(self):
+		kindStatement = MediaWikiLocalSettingsEntryList.__KIND_STATEMENT
+		kinds = self.__kinds
+		stmts = self.__stmts
+		j = 0
+		for i in range(len(kinds)):
+			if kinds[i] == kindStatement:
+				yield stmts[j]
+				j += 1
+			else:
+				yield ( "other", self.__getToken(i) )
+	#
+
+	def __getitem__(self, i:int):
+		if i < 0:
+			i += len(self.__kinds)
+		if self.__kinds[i] == MediaWikiLocalSettingsEntryList.__KIND_STATEMENT:
+			return self.__stmts[bisect.bisect_left(self.__stmtIndices, i)]
+		else:
+			return ( "other", self.__getToken(i) )
+	#
+
+	#
+	# Iterate over all statements.
+	#
+	# @return		tuple[]				Returns 2-tuples: the entry type and the statement object.
+	#
+	def iterStatements(self):
+		return iter(self.__stmts)
+	#
+
+	#
+	# Iterate over the parts of the PHP source code represented by all entries. All unmodified regions are returned as slices of the text:
+	# Only statements that have been modified are rendered again.
+	#
+	# @return		str[]				Returns the parts of the PHP source code. Join them to get the complete source code.
+	#
+	def iterTextParts(self):
+		text = self.__text
+		starts = self.__starts
+		ends = self.__ends
+		pos = 0
+		for i, (stype, stmt) in zip(self.__stmtIndices, self.__stmts):
+			if stmt.isModified:
+				yield text[pos:starts[i]]
+				yield stmt.toPHP()
+				pos = ends[i]
+		yield text[pos:]
+	#
+
+	#
+	# Add a token that has been parsed from the text.
+	#
+	def appendToken(self, token:Token, start:int, end:int):
+		self.__appendRaw(MediaWikiLocalSettingsEntryList.__KINDS_BY_TOKEN_TYPE[token.type], start, end, token.lineNo, token.colNo)
+	#
+
+	#
+	# Add a statement that has been parsed from the text.
+	#
+	def appendStatement(self, stype:str, stmt, start:int, end:int):
+		self.__stmtIndices.append(len(self.__kinds))
+		self.__stmts.append( ( stype, stmt ) )
+		self.__appendRaw(MediaWikiLocalSettingsEntryList.__KIND_STATEMENT, start, end, stmt.lineNo, stmt.colNo)
+	#
+
+	#
+	# Add a new entry that is not part of the original text. The PHP source code of this entry is appended to the text.
+	#
+	# @param	tuple entry			A 2-tuple: the entry type and the token or statement object.
+	#
+	def append(self, entry:tuple):
+		stype, item = entry
+		start = len(self.__text)
+		if stype == "other":
+			self.__text += MediaWikiLocalSettingsEntryList.__tokenToPHP(item)
+			self.appendToken(item, start, len(self.__text))
+		else:
+			self.__text += item.toPHP()
+			self.appendStatement(stype, item, start, len(self.__text))
+	#
+
+	#
+	# Copy entries from another list of entries.
+	#
+	# The text of all entries copied must exist at the new position in this list's text as well. (This is used by
+	# <c>MediaWikiLocalSettingsFile.reload()</c> for copying entries of unmodified regions of a file.)
+	#
+	# @param	MediaWikiLocalSettingsEntryList other		The list to copy entries from
+	# @param	int iFrom								The index of the first entry to copy
+	# @param	int iTo									The index after the last entry to copy
+	# @param	int lineDelta							The number of lines to move the entries
+	# @param	int offsetDelta							The number of characters to move the entries
+	#
+	def extendFrom(self, other, iFrom:int, iTo:int, lineDelta:int, offsetDelta:int):
+		assert isinstance(other, MediaWikiLocalSettingsEntryList)
+
+		k1 = bisect.bisect_left(other.__stmtIndices, iFrom)
+		k2 = bisect.bisect_left(other.__stmtIndices, iTo)
+		indexDelta = len(self.__kinds) - iFrom
+		for k in range(k1, k2):
+			self.__stmtIndices.append(other.__stmtIndices[k] + indexDelta)
+			stype, stmt = other.__stmts[k]
+			if lineDelta != 0:
+				stmt._shiftLineNo(lineDelta)
+			self.__stmts.append( ( stype, stmt ) )
+
+		self.__kinds.extend(other.__kinds[iFrom:iTo])
+		self.__colNos.extend(other.__colNos[iFrom:iTo])
+		if offsetDelta == 0:
+			self.__starts.extend(other.__starts[iFrom:iTo])
+			self.__ends.extend(other.__ends[iFrom:iTo])
+		else:
+			self.__starts.extend([ x + offsetDelta for x in other.__starts[iFrom:iTo] ])
+			self.__ends.extend([ x + offsetDelta for x in other.__ends[iFrom:iTo] ])
+		if lineDelta == 0:
+			self.__lineNos.extend(other.__lineNos[iFrom:iTo])
+		else:
+			self.__lineNos.extend([ x + lineDelta for x in other.__lineNos[iFrom:iTo] ])
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -4,6 +4,11 @@ import os
 import codecs
 import re
 import shutil
+import tempfile
+import bisect
+import difflib
+import mmap
+import itertools
 
 
 from jk_utils import *
@@ -11,10 +16,15 @@ from jk_utils.tokenizer import *
 import jk_console
 
 from ..impl.lang_support_php import *
+from ..impl.TokenPatternMachine import TokenPatternMachine
 
 from .MediaWikiLocalSettingsVariableAssignment import MediaWikiLocalSettingsVariableAssignment
 from .MediaWikiLocalSettingsComplexVariableAssignment import MediaWikiLocalSettingsComplexVariableAssignment
 from .MediaWikiLocalSettingsArrayAppend import MediaWikiLocalSettingsArrayAppend
+from .MediaWikiLocalSettingsInclude import MediaWikiLocalSettingsInclude
+from .MediaWikiLocalSettingsLoadExtension import MediaWikiLocalSettingsLoadExtension
+from .MediaWikiLocalSettingsFileCache import MediaWikiLocalSettingsFileCache
+from .MediaWikiLocalSettingsEntryList import MediaWikiLocalSettingsEntryList
 
 
 
@@ -24,10 +34,9 @@ from .MediaWikiLocalSettingsArrayAppend import MediaWikiLocalSettingsArrayAppend
 #
 # This class represents the "LocalSettings.php" file in a MediaWiki installation.
 #
-# During loading the file data is parsed. Internally a line is stored in an array. Each array entry is a 3-tuple containing the following data:
-# 0) An identifier specifying the type of the line: "-", "varappend", "var", "vari" and "varii"
-# 1) The raw text of the line
-# 2) An instance of <c>MediaWikiLocalSettingsValue</c> representing the parsed version of the line or <c>None</c> otherwise
+# During loading the file data is parsed. Internally the entries parsed are stored in a <c>MediaWikiLocalSettingsEntryList</c>. An entry is
+# either a token or a variable related statement (such as a variable assignment). Tokens are not kept as objects: The entry list only stores
+# their positions within the text of the file.
 #
 class MediaWikiLocalSettingsFile(object):
 
@@ -60,17 +69,12 @@ class MediaWikiLocalSettingsFile(object):
 		])))
 	])
 
-	__PARSING_DEFAULTS = {
-		"active": True,
-	}
+	# All statements recognized start with the same prefix: an optional "#=#" marker followed by a variable reference or a keyword. This prefix
+	# is matched only once by <c>__tryMatchStatement()</c>; the following patterns only describe what comes after this prefix.
 
+	# $someVar[] = value
+	# $someVar[] = array(value)
 	__STMT_VARIABLE_APPENDING = TokenPatternSequence([
-		TokenPatternOptional(TokenPatternSequence([
-			TokenPattern("commentx").setTag("active", False),
-			__OPTIONAL_SPACE_OR_NEWLINE,
-		])),
-		TokenPattern("varref", assignToVar = "varName"),
-		__OPTIONAL_SPACE_OR_NEWLINE,
 		TokenPattern("lparen2"),
 		__OPTIONAL_SPACE_OR_NEWLINE,
 		TokenPattern("rparen2"),
@@ -99,12 +103,6 @@ class MediaWikiLocalSettingsFile(object):
 	# $someVar = array(value)
 	# $someVar[value] = array(value)
 	__STMT_VARIABLE_ASSIGNMENT = TokenPatternSequence([
-		TokenPatternOptional(TokenPatternSequence([
-			TokenPattern("commentx").setTag("active", False),
-			__OPTIONAL_SPACE_OR_NEWLINE,
-		])),
-		TokenPattern("varref", assignToVar = "varName"),
-		__OPTIONAL_SPACE_OR_NEWLINE,
 		TokenPatternOptional(TokenPatternRepeat(TokenPatternSequence([
 			TokenPattern("lparen2"),
 			__OPTIONAL_SPACE_OR_NEWLINE,
@@ -165,12 +163,6 @@ class MediaWikiLocalSettingsFile(object):
 	])
 
 	__STMT_VARIABLE_ASSIGNMENT_2 = TokenPatternSequence([
-		TokenPatternOptional(TokenPatternSequence([
-			TokenPattern("commentx").setTag("active", False),
-			__OPTIONAL_SPACE_OR_NEWLINE,
-		])),
-		TokenPattern("varref", assignToVar = "varName"),
-		__OPTIONAL_SPACE_OR_NEWLINE,
 		TokenPattern("op", "="),
 		__OPTIONAL_SPACE_OR_NEWLINE,
 		TokenPatternRepeat(
@@ -186,6 +178,178 @@ class MediaWikiLocalSettingsFile(object):
 		TokenPattern("semicolon"),
 	])
 
+	# The path of a file included: a concatenation of strings, variables and magic constants
+	__INCLUDE_PATH = TokenPatternRepeat(TokenPatternSequence([
+		TokenPatternAlternatives([
+			TokenPattern("varref").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPattern("op", ".").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPattern("str1").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPattern("str2").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPattern("word", "__DIR__").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPattern("word", "__FILE__").derive(assignToVarTyped = "x", bVarIsArray = True),
+			TokenPatternSequence([
+				TokenPattern("word", "dirname").derive(assignToVarTyped = "x", bVarIsArray = True),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPattern("lparen1"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPatternAlternatives([
+					TokenPattern("word", "__DIR__").derive(assignToVarTyped = "x", bVarIsArray = True),
+					TokenPattern("word", "__FILE__").derive(assignToVarTyped = "x", bVarIsArray = True),
+				]),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPattern("rparen1"),
+			]),
+		]),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+	]))
+
+	# require_once "path";
+	# require_once( __DIR__ . "/path" );
+	# (the same for "require", "include" and "include_once")
+	__STMT_INCLUDE = TokenPatternSequence([
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPatternAlternatives([
+			TokenPatternSequence([
+				TokenPattern("lparen1"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				__INCLUDE_PATH,
+				TokenPattern("rparen1"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+			]),
+			__INCLUDE_PATH,
+		]),
+		TokenPattern("semicolon"),
+	])
+
+	# The name of an extension or skin
+	__EXTENSION_NAME = TokenPatternAlternatives([
+		TokenPattern("str1").derive(assignToVarTyped = "name", bVarIsArray = True),
+		TokenPattern("str2").derive(assignToVarTyped = "name", bVarIsArray = True),
+	])
+
+	__EXTENSION_NAME_LIST = TokenPatternSequence([
+		__EXTENSION_NAME,
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPatternOptional(TokenPatternRepeat(TokenPatternSequence([
+			TokenPattern("op", ","),
+			__OPTIONAL_SPACE_OR_NEWLINE,
+			__EXTENSION_NAME,
+			__OPTIONAL_SPACE_OR_NEWLINE,
+		]))),
+		TokenPatternOptional(TokenPatternSequence([
+			TokenPattern("op", ","),
+			__OPTIONAL_SPACE_OR_NEWLINE,
+		])),
+	])
+
+	# wfLoadExtension( 'Name' );
+	# wfLoadExtension( 'Name', "$IP/extensions/Name/extension.json" );
+	# (the same for "wfLoadSkin")
+	__STMT_LOAD_EXTENSION = TokenPatternSequence([
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPattern("lparen1"),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		__EXTENSION_NAME,
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPatternOptional(TokenPatternSequence([
+			TokenPattern("op", ","),
+			__OPTIONAL_SPACE_OR_NEWLINE,
+			TokenPatternRepeat(TokenPatternSequence([
+				TokenPatternAlternatives([
+					TokenPattern("str1").derive(assignToVarTyped = "path", bVarIsArray = True),
+					TokenPattern("str2").derive(assignToVarTyped = "path", bVarIsArray = True),
+					TokenPattern("varref").derive(assignToVarTyped = "path", bVarIsArray = True),
+					TokenPattern("op", ".").derive(assignToVarTyped = "path", bVarIsArray = True),
+					TokenPattern("word", "__DIR__").derive(assignToVarTyped = "path", bVarIsArray = True),
+				]),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+			])),
+		])),
+		TokenPattern("rparen1"),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPattern("semicolon"),
+	])
+
+	# wfLoadExtensions( [ 'Name1', 'Name2' ] );
+	# wfLoadExtensions( array( 'Name1', 'Name2' ) );
+	# (the same for "wfLoadSkins")
+	__STMT_LOAD_EXTENSIONS = TokenPatternSequence([
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPattern("lparen1"),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPatternAlternatives([
+			TokenPatternSequence([
+				TokenPattern("lparen2"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPatternOptional(__EXTENSION_NAME_LIST),
+				TokenPattern("rparen2"),
+			]),
+			TokenPatternSequence([
+				TokenPattern("word", "array"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPattern("lparen1"),
+				__OPTIONAL_SPACE_OR_NEWLINE,
+				TokenPatternOptional(__EXTENSION_NAME_LIST),
+				TokenPattern("rparen1"),
+			]),
+		]),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPattern("rparen1"),
+		__OPTIONAL_SPACE_OR_NEWLINE,
+		TokenPattern("semicolon"),
+	])
+
+	# Dispatch table: Maps the type of the token following the common prefix to the statement patterns to try (in this order).
+	# Each entry is a 3-tuple of the pattern, the entry type and the function to create the entry from the parsed data.
+	__STMT_TAILS_BY_TOKEN_TYPE = {
+		"lparen2": [
+			( __STMT_VARIABLE_APPENDING, "arrayAppend", MediaWikiLocalSettingsArrayAppend.parseFromDict ),
+			( __STMT_VARIABLE_ASSIGNMENT, "varAssign", MediaWikiLocalSettingsVariableAssignment.parseFromDict ),
+		],
+		"op": [
+			( __STMT_VARIABLE_ASSIGNMENT, "varAssign", MediaWikiLocalSettingsVariableAssignment.parseFromDict ),
+			( __STMT_VARIABLE_ASSIGNMENT_2, "varAssignComplex", MediaWikiLocalSettingsComplexVariableAssignment.parseFromDict ),
+		],
+	}
+
+	# Only tokens of these types can start a statement. At all other positions no statement matching needs to be tried.
+	__STMT_START_TOKEN_TYPES = frozenset([ "varref", "commentx" ])
+
+	# Word tokens that can start a statement. Each of these words is mapped to the statement patterns to try (in this order).
+	__STMT_TAILS_BY_WORD = {
+		"include": [ ( __STMT_INCLUDE, "include", MediaWikiLocalSettingsInclude.parseFromDict ) ],
+		"include_once": [ ( __STMT_INCLUDE, "include", MediaWikiLocalSettingsInclude.parseFromDict ) ],
+		"require": [ ( __STMT_INCLUDE, "include", MediaWikiLocalSettingsInclude.parseFromDict ) ],
+		"require_once": [ ( __STMT_INCLUDE, "include", MediaWikiLocalSettingsInclude.parseFromDict ) ],
+		"wfLoadExtension": [ ( __STMT_LOAD_EXTENSION, "loadExtension", MediaWikiLocalSettingsLoadExtension.parseFromDict ) ],
+		"wfLoadExtensions": [ ( __STMT_LOAD_EXTENSIONS, "loadExtension", MediaWikiLocalSettingsLoadExtension.parseFromDict ) ],
+		"wfLoadSkin": [ ( __STMT_LOAD_EXTENSION, "loadExtension", MediaWikiLocalSettingsLoadExtension.parseFromDict ) ],
+		"wfLoadSkins": [ ( __STMT_LOAD_EXTENSIONS, "loadExtension", MediaWikiLocalSettingsLoadExtension.parseFromDict ) ],
+	}
+
+	# The dispatch tables compiled: Each list of statement patterns is compiled into a single <c>TokenPatternMachine</c> that tries all of them in
+	# one forward pass. The entries are 2-tuples of the machine and a list of 2-tuples of the entry type and the function to create the entry.
+	__STMT_MACHINES_BY_TOKEN_TYPE = {
+		key: ( TokenPatternMachine([ x[0] for x in stmtTails ]), [ x[1:] for x in stmtTails ] )
+		for key, stmtTails in __STMT_TAILS_BY_TOKEN_TYPE.items()
+	}
+	__STMT_MACHINES_BY_WORD = {
+		key: ( TokenPatternMachine([ x[0] for x in stmtTails ]), [ x[1:] for x in stmtTails ] )
+		for key, stmtTails in __STMT_TAILS_BY_WORD.items()
+	}
+
+	__SPACE_TOKEN_TYPES = frozenset([ "SPACE", "NEWLINE" ])
+
+	# The entry types that represent variables
+	__VAR_ENTRY_TYPES = frozenset([ "arrayAppend", "varAssign", "varAssignComplex" ])
+
+	# Strings that PHP converts to integers if they are used as array keys
+	__INT_KEY_PATTERN = re.compile(r"^(0|-?[1-9][0-9]*)$")
+
+	# For verification purposes only: Match statements by interpreting the statement patterns instead of running the compiled state machines.
+	# Both must always produce the same entries.
+	_bInterpretStatementPatterns = False
+
 	################################################################################################################################
 	## Constructor
 	################################################################################################################################
@@ -198,6 +362,20 @@ class MediaWikiLocalSettingsFile(object):
 		self.__changedFlag = ChangedFlag(False)
 		self.__filePath = None
 		self.__magicVarValues = None
+		self.__varIndex = None
+		self.__indexedVarIndex = None
+		self.__extensionIndex = None
+		self.__skinIndex = None
+		self.__enabledExtensionNames = None
+		self.__enabledSkinNames = None
+		self.__enabledExtensionsFrozen = None
+		self.__enabledSkinsFrozen = None
+		self.__sortedVarNames = None
+		self.__sortedIndexedVars = None
+		self.__varValueCache = None
+		self.__rawText = None
+		self.__syncDataIndices = None
+		self.__syncLineIndices = None
 	#
 
 	################################################################################################################################
@@ -214,10 +392,373 @@ class MediaWikiLocalSettingsFile(object):
 		return self.__data != None
 	#
 
+	#
+	# The names of all extensions loaded by an active <c>wfLoadExtension()</c> or <c>wfLoadExtensions()</c> statement.
+	#
+	@property
+	def enabledExtensions(self) -> frozenset:
+		if self.__data is None:
+			raise Exception("Not loaded!")
+		if self.__enabledExtensionsFrozen is None:
+			self.__enabledExtensionsFrozen = frozenset(self.__enabledExtensionNames)
+		return self.__enabledExtensionsFrozen
+	#
+
+	#
+	# The names of all skins loaded by an active <c>wfLoadSkin()</c> or <c>wfLoadSkins()</c> statement.
+	#
+	@property
+	def enabledSkins(self) -> frozenset:
+		if self.__data is None:
+			raise Exception("Not loaded!")
+		if self.__enabledSkinsFrozen is None:
+			self.__enabledSkinsFrozen = frozenset(self.__enabledSkinNames)
+		return self.__enabledSkinsFrozen
+	#
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
 
+	#
+	# Build a hashable key from a list of index values.
+	#
+	@staticmethod
+	def __toIndexKey(indexValues:list) -> tuple:
+		return tuple([ (v.dataType, v.value) for v in indexValues ])
+	#
+
+	#
+	# Build a sortable key from an array index the way PHP does: integers, booleans and strings representing integers are integer keys, all
+	# other strings (and <c>null</c>) are string keys. Constants can't be evaluated: they are kept apart.
+	#
+	@staticmethod
+	def __toArrayKey(dataType:str, value) -> tuple:
+		if dataType == "word":
+			return ( 2, value )
+		if isinstance(value, (bool, int)):
+			return ( 0, int(value) )
+		if value is None:
+			return ( 1, "" )
+		value = str(value)
+		if MediaWikiLocalSettingsFile.__INT_KEY_PATTERN.match(value):
+			return ( 0, int(value) )
+		return ( 1, value )
+	#
+
+	#
+	# Register a single entry in the variable indices.
+	#
+	def __addToIndex(self, stype:str, item):
+		if stype in MediaWikiLocalSettingsFile.__VAR_ENTRY_TYPES:
+			items = self.__varIndex.get(item.varName)
+			if items is None:
+				self.__varIndex[item.varName] = [ item ]
+				self.__sortedVarNames = None
+			else:
+				items.append(item)
+			if stype == "varAssign":
+				indexValues = item.indexValues
+				key = (item.varName, MediaWikiLocalSettingsFile.__toIndexKey(indexValues))
+				self.__indexedVarIndex.setdefault(key, []).append(item)
+				if indexValues:
+					self.__sortedIndexedVars.pop(item.varName, None)
+		elif stype == "loadExtension":
+			index = self.__skinIndex if item.isSkin else self.__extensionIndex
+			for name in item.names:
+				index.setdefault(name, []).append(item)
+			item._setActiveStateListener(self.__onLoadExtensionActiveStateChanged)
+			if item.isActive:
+				self.__updateEnabledNames(item)
+	#
+
+	#
+	# Update the sets of enabled extensions (or skins) for all names loaded by the specified statement.
+	#
+	def __updateEnabledNames(self, item):
+		if item.isSkin:
+			index = self.__skinIndex
+			enabledNames = self.__enabledSkinNames
+			self.__enabledSkinsFrozen = None
+		else:
+			index = self.__extensionIndex
+			enabledNames = self.__enabledExtensionNames
+			self.__enabledExtensionsFrozen = None
+		for name in item.names:
+			# (an entry that has been removed by reloading the file is not in the index any more: it is ignored this way)
+			if any([ x.isActive for x in index.get(name, []) ]):
+				enabledNames.add(name)
+			else:
+				enabledNames.discard(name)
+	#
+
+	#
+	# Invoked if a statement loading extensions (or skins) has been activated or deactivated.
+	#
+	def __onLoadExtensionActiveStateChanged(self, item):
+		if self.__data is not None:
+			self.__updateEnabledNames(item)
+	#
+
+	#
+	# (Re)build the variable indices from scratch. Both indices map a key to a list of entries in the order they appear in the file:
+	#
+	# * <c>__varIndex</c> maps variable names to all variable entries
+	# * <c>__indexedVarIndex</c> maps a tuple of the variable name and the (hashable) index values to all variable assignment entries
+	# * <c>__extensionIndex</c> and <c>__skinIndex</c> map extension (or skin) names to all entries loading this extension (or skin)
+	# * <c>__enabledExtensionNames</c> and <c>__enabledSkinNames</c> contain the names of all extensions (or skins) loaded by an active entry;
+	#	they are kept up to date if an entry is activated or deactivated
+	#
+	# The sorted indices used for prefix queries are derived from these indices on demand: They are dropped whenever an entry is added that
+	# affects them.
+	#
+	def __rebuildIndex(self):
+		self.__varIndex = {}
+		self.__indexedVarIndex = {}
+		self.__extensionIndex = {}
+		self.__skinIndex = {}
+		self.__enabledExtensionNames = set()
+		self.__enabledSkinNames = set()
+		self.__enabledExtensionsFrozen = None
+		self.__enabledSkinsFrozen = None
+		self.__sortedVarNames = None
+		self.__sortedIndexedVars = {}
+		self.__varValueCache = {}
+		for stype, item in self.__data.iterStatements():
+			self.__addToIndex(stype, item)
+	#
+
+	#
+	# Get the sorted index of all assignments to elements of the specified array variable.
+	#
+	# @return	tuple			Returns a 2-tuple of two lists of equal length: the sorted keys (tuples of array keys built by
+	#							<c>__toArrayKey()</c>) and the assignments.
+	#
+	def __getSortedIndexedVar(self, varName:str) -> tuple:
+		ret = self.__sortedIndexedVars.get(varName)
+		if ret is None:
+			entries = []
+			for item in self.__varIndex.get(varName, []):
+				if isinstance(item, MediaWikiLocalSettingsVariableAssignment):
+					indexValues = item.indexValues
+					if indexValues:
+						key = tuple([ MediaWikiLocalSettingsFile.__toArrayKey(v.dataType, v.value) for v in indexValues ])
+						entries.append(( key, len(entries), item ))
+			entries.sort(key = lambda x: x[:2])
+			ret = ( [ x[0] for x in entries ], [ x[2] for x in entries ] )
+			self.__sortedIndexedVars[varName] = ret
+		return ret
+	#
+
+	#
+	# Returns the parsing state of this object for serialization. (The variable indices are not included as they can easily be rebuilt.)
+	#
+	def __getState(self) -> tuple:
+		return ( self.__changedFlag, self.__data, self.__magicVarValues )
+	#
+
+	#
+	# Restore the parsing state of this object from a state previously returned by <c>__getState()</c>.
+	#
+	def __setState(self, state:tuple):
+		# NOTE: all entries share the same changed flag object. Pickling preserves this, so the unpickled flag must be used from now on.
+		self.__changedFlag, self.__data, self.__magicVarValues = state
+		self.__changedFlag.setChanged(False)
+		self.__rebuildIndex()
+		self.__rawText = None
+	#
+
+	#
+	# Load the file again. This is invoked by <c>reload()</c> if the file can not be parsed incrementally.
+	#
+	def __reloadCompletely(self):
+		dirPath = self.__magicVarValues["__DIR__"]
+		self.load(dirPath = dirPath, filePath = self.__filePath)
+	#
+
+	#
+	# Append an entry to the data. Always use this method for adding entries so that the variable indices are maintained.
+	#
+	def __appendEntry(self, stype:str, item):
+		self.__data.append( ( stype, item ) )
+		self.__addToIndex(stype, item)
+	#
+
+	#
+	# Parse the specified tokens.
+	#
+	# Additionally this method determines sync points: positions where parsing could be restarted without affecting the parsing result before
+	# this position. A sync point is the beginning of a line (= directly after a NEWLINE token) where all statement matching attempts made
+	# so far have been decided by the tokens before this position. As every statement ends with a semicolon and can not contain another semicolon
+	# this is the case if there is a semicolon after the last token that could start a statement.
+	#
+	# The tokens are consumed as they are needed: Only the tokens of the statement currently matched are kept in a lookahead window.
+	#
+	# @param		iterable tokens				The tokens to parse as 3-tuples of start offset, end offset and token (as produced by the tokenizer
+	#											if offsets are requested)
+	# @param		MediaWikiLocalSettingsEntryList entries		The entry list to receive the entries parsed.
+	# @param		set stopAfterVarNames		(optional) Stop parsing as soon as there is an entry for each of these variables. (This set is
+	#											modified.)
+	# @return		int[] syncDataIndices		The entry indices of the sync points
+	# @return		int[] syncLineIndices		The line indices (counted from zero) of the sync points
+	# @return		bool bPending				Is there a token that could start a statement that is not followed by a semicolon?
+	#
+	def __parseTokens(self, tokens, entries:MediaWikiLocalSettingsEntryList, stopAfterVarNames:set = None) -> tuple:
+		syncDataIndices = []
+		syncLineIndices = []
+		bPending = False
+
+		stmtStartTokenTypes = MediaWikiLocalSettingsFile.__STMT_START_TOKEN_TYPES
+		stmtStartWords = MediaWikiLocalSettingsFile.__STMT_TAILS_BY_WORD
+		tokenIterator = iter(tokens)
+		bExhausted = False
+
+		# the lookahead window: it receives all tokens up to (and including) the next semicolon if a statement could start at the current position
+		window = []
+		windowStarts = []
+		windowEnds = []
+		pos = 0
+		posSemicolon = -1		# the position of the last semicolon in the window
+
+		while True:
+			if pos == len(window):
+				# all tokens in the window have been processed: start a new window
+				x = next(tokenIterator, None)
+				if x is None:
+					break
+				start, end, token = x
+				window = [ token ]
+				windowStarts = [ start ]
+				windowEnds = [ end ]
+				pos = 0
+				posSemicolon = 0 if token.type == "semicolon" else -1
+
+			token = window[pos]
+			tokenType = token.type
+			if (tokenType in stmtStartTokenTypes) or ((tokenType == "word") and (token.value in stmtStartWords)):
+				# a statement ends at the first semicolon: make sure the window contains all tokens up to the next semicolon
+				if (posSemicolon < pos) and not bExhausted:
+					for start, end, t in tokenIterator:
+						window.append(t)
+						windowStarts.append(start)
+						windowEnds.append(end)
+						if t.type == "semicolon":
+							posSemicolon = len(window) - 1
+							break
+					else:
+						bExhausted = True
+
+				result = self.__tryMatchStatement(window, pos)
+				if result is not None:
+					# store the entry and advance
+					n, (stype, item) = result
+					entries.appendStatement(stype, item, windowStarts[pos], windowEnds[pos + n - 1])
+					bPending = False
+					pos += n
+					if (stopAfterVarNames is not None) and (stype in MediaWikiLocalSettingsFile.__VAR_ENTRY_TYPES):
+						stopAfterVarNames.discard(item.varName)
+						if not stopAfterVarNames:
+							break
+					continue
+				bPending = True
+			elif tokenType == "semicolon":
+				bPending = False
+			elif tokenType == "NEWLINE":
+				if not bPending:
+					syncDataIndices.append(len(entries) + 1)
+					syncLineIndices.append(token.lineNo)
+
+			entries.appendToken(token, windowStarts[pos], windowEnds[pos])
+			pos += 1
+
+		return syncDataIndices, syncLineIndices, bPending
+	#
+
+	#
+	# Split the specified text into lines. Each line keeps its terminating line break so that a line is considered to be modified if a
+	# line break is added to (or removed from) the end of the text.
+	#
+	@staticmethod
+	def __splitLines(text:str) -> list:
+		lines = [ line + "\n" for line in text.split("\n") ]
+		lines[-1] = lines[-1][:-1]
+		if not lines[-1]:
+			del lines[-1]
+		return lines
+	#
+
+	#
+	# Get the offsets of the beginnings of all lines. (The last item is the length of the text.)
+	#
+	@staticmethod
+	def __getLineOffsets(lines:list) -> list:
+		ret = [ 0 ]
+		ret.extend(itertools.accumulate(map(len, lines)))
+		return ret
+	#
+
+	#
+	# Try to match a statement at the specified position. This method is only invoked for tokens that can start a statement.
+	#
+	# @return		tuple			Returns <c>None</c> if no statement could be matched or a 2-tuple containing the number of tokens eaten and the
+	#								entry to store.
+	#
+	def __tryMatchStatement(self, tokens:list, pos:int):
+		nTokens = len(tokens)
+
+		# match the common prefix
+
+		t = tokens[pos]
+		defaults = {
+			"lineNo": t.lineNo,
+			"colNo": t.colNo,
+			"active": True,
+		}
+		p = pos
+		if t.type == "commentx":
+			defaults["active"] = False
+			p += 1
+			if (p < nTokens) and (tokens[p].type in MediaWikiLocalSettingsFile.__SPACE_TOKEN_TYPES):
+				p += 1
+			if p >= nTokens:
+				return None
+
+		if tokens[p].type == "word":
+			# a statement starting with a keyword: the keyword determines the patterns to try
+			stmtMatcher = MediaWikiLocalSettingsFile.__STMT_MACHINES_BY_WORD.get(tokens[p].value)
+			if stmtMatcher is None:
+				return None
+			defaults["keyword"] = tokens[p].value
+			p += 1
+
+		else:
+			if tokens[p].type != "varref":
+				return None
+			defaults["varName"] = tokens[p].value
+			p += 1
+			if (p < nTokens) and (tokens[p].type in MediaWikiLocalSettingsFile.__SPACE_TOKEN_TYPES):
+				p += 1
+
+			# match the rest of the statement
+
+			if p >= nTokens:
+				return None
+			stmtMatcher = MediaWikiLocalSettingsFile.__STMT_MACHINES_BY_TOKEN_TYPE.get(tokens[p].type)
+			if stmtMatcher is None:
+				return None
+
+		machine, stmtTypes = stmtMatcher
+		if MediaWikiLocalSettingsFile._bInterpretStatementPatterns:
+			(bResult, n, data, i) = machine.tryMatchInterpreted(tokens, p, defaults)
+		else:
+			(bResult, n, data, i) = machine.tryMatch(tokens, p, defaults)
+		if not bResult:
+			return None
+		assert n > 0
+		stype, parseFromDict = stmtTypes[i]
+		return (p - pos + n, ( stype, parseFromDict(self.__changedFlag, data) ))
+	#
+
 	################################################################################################################################
 	## Public Methods
 	################################################################################################################################
@@ -280,85 +821,83 @@ class MediaWikiLocalSettingsFile(object):
 	# specifying the installation directory (parameter: <c>dirPath</c>). <c>rawText</c> has higher precedence over <c>filePath</c>, which in turn
 	# has higher precedence over <c>dirPath</c>.
 	#
-	# @param	str dirPath			The MediaWiki installation directory path.
-	# @param	str filePath		The file path of the MediaWiki "LocalSettings.php" file.
-	# @param	str rawText			The raw file content of a "LocalSettings.php" file.
+	# If a parse cache is specified and the data is loaded from a file the parsing result is taken from the cache if the file has not been
+	# modified since it has been parsed the last time. Otherwise the file is parsed and the result is stored in the cache.
 	#
-	def load(self, dirPath = None, filePath = None, rawText:str = None):			# TODO: add logging
+	# In streaming mode a file is memory mapped and tokenized directly from the mapped data: No list of all tokens is built in memory; parsing
+	# only needs to hold the tokens of the current statement. Use this for very large files.
+	#
+	# @param	str dirPath										The MediaWiki installation directory path.
+	# @param	str filePath									The file path of the MediaWiki "LocalSettings.php" file.
+	# @param	str rawText										The raw file content of a "LocalSettings.php" file.
+	# @param	MediaWikiLocalSettingsFileCache parseCache		(optional) A cache for parsing results.
+	# @param	bool bStreaming									(optional) Tokenize the file from a memory mapped buffer. (This is ignored if
+	#															<c>rawText</c> is specified.)
+	#
+	def load(self, dirPath = None, filePath = None, rawText:str = None, parseCache:MediaWikiLocalSettingsFileCache = None, bStreaming:bool = False):			# TODO: add logging
+		if parseCache is not None:
+			assert isinstance(parseCache, MediaWikiLocalSettingsFileCache)
+		assert isinstance(bStreaming, bool)
+
+		st = None
 		if rawText is not None:
 			assert isinstance(rawText, str)
 			filePath = None
-		elif filePath is not None:
-			assert isinstance(filePath, str)
-			# TODO: add logging
-			with codecs.open(filePath, "r", "utf-8") as f:
-				rawText = f.read()
-		elif dirPath is not None:
-			assert isinstance(dirPath, str)
-			filePath = os.path.join(dirPath, "LocalSettings.php")
-			# TODO: add logging
-			with codecs.open(filePath, "r", "utf-8") as f:
-				rawText = f.read()
 		else:
-			raise Exception("At least one of the following arguments must be specified: 'rawText' or 'filePath'!")
+			if filePath is not None:
+				assert isinstance(filePath, str)
+				if dirPath is None:
+					dirPath = os.path.dirname(filePath)
+			elif dirPath is not None:
+				assert isinstance(dirPath, str)
+				filePath = os.path.join(dirPath, "LocalSettings.php")
+			else:
+				raise Exception("At least one of the following arguments must be specified: 'rawText' or 'filePath'!")
+
+			if parseCache is not None:
+				# stat before reading: if the file gets modified after this point the cache entry written will not be used later
+				filePath = os.path.abspath(filePath)
+				st = os.stat(filePath)
+				state = parseCache.get(filePath, st)
+				if state is not None:
+					self.__setState(state)
+					self.__filePath = filePath
+					return
+
+			if not bStreaming:
+				# TODO: add logging
+				with codecs.open(filePath, "r", "utf-8") as f:
+					rawText = f.read()
 
 		self.__magicVarValues = {
 			"__FILE__": filePath,
 			"__DIR__": dirPath,
-			"dirname(__DIR__)": os.path.dirname(dirPath),
+			"dirname(__DIR__)": os.path.dirname(dirPath) if dirPath is not None else None,
 		}
 
-		tokens = list(PHPTokenizer().tokenize(rawText, bEmitWhiteSpaces = True, bEmitComments = True, bEmitNewLines = True))
-		#for t in tokens:
-		#	print(t)
+		if rawText is not None:
+			tokens = PHPTokenizer.instance().tokenize(rawText, bEmitWhiteSpaces = True, bEmitComments = True, bEmitNewLines = True, bEmitOffsets = True)
+			#for t in tokens:
+			#	print(t)
 
-		# resultDataList will receive 2-tuples where
-		# the first item indicates the entry type - either "arrayAppend", "varAssignComplex", "varAssign" or "other" - and
-		# the second item will either be a token or a MediaWikiLocalSettingsValue.
-		resultDataList = []
-		pos = 0
-		while pos < len(tokens):
-			(bResult, n, data) = MediaWikiLocalSettingsFile.__STMT_VARIABLE_APPENDING.tryMatch(tokens, pos, MediaWikiLocalSettingsFile.__PARSING_DEFAULTS)
-			if bResult:
-				assert n > 0
-				# interpret pattern encountered and store it
-				resultDataList.append( ( "arrayAppend", MediaWikiLocalSettingsArrayAppend.parseFromDict(self.__changedFlag, data) ) )
-				#print("--arrayAppend--")				# DEBUG
-				#for i in range(0, n):					# DEBUG
-				#	print("\t", tokens[pos+i])			# DEBUG
-
-				# advance
-				pos += n
-				continue
-
-			(bResult, n, data) = MediaWikiLocalSettingsFile.__STMT_VARIABLE_ASSIGNMENT.tryMatch(tokens, pos, MediaWikiLocalSettingsFile.__PARSING_DEFAULTS)
-			if bResult:
-				assert n > 0
-				# interpret pattern encountered and store it
-				resultDataList.append( ( "varAssign", MediaWikiLocalSettingsVariableAssignment.parseFromDict(self.__changedFlag, data) ) )
-				#print("--varAssign--")					# DEBUG
-				#for i in range(0, n):					# DEBUG
-				#	print("\t", tokens[pos+i])			# DEBUG
-
-				# advance
-				pos += n
-				continue
-
-			(bResult, n, data) = MediaWikiLocalSettingsFile.__STMT_VARIABLE_ASSIGNMENT_2.tryMatch(tokens, pos, MediaWikiLocalSettingsFile.__PARSING_DEFAULTS)
-			if bResult:
-				assert n > 0
-				# interpret pattern encountered and store it
-				resultDataList.append( ( "varAssignComplex", MediaWikiLocalSettingsComplexVariableAssignment.parseFromDict(self.__changedFlag, data) ) )
-				#print("--varAssignComplex--")			# DEBUG
-				#for i in range(0, n):					# DEBUG
-				#	print("\t", tokens[pos+i])			# DEBUG
-
-				# advance
-				pos += n
-				continue
-
-			resultDataList.append( ( "other", tokens[pos] ) )
-			pos += 1
+			resultDataList = MediaWikiLocalSettingsEntryList(rawText)
+			syncDataIndices, syncLineIndices, _ = self.__parseTokens(tokens, resultDataList)
+		else:
+			with open(filePath, "rb") as f:
+				if os.fstat(f.fileno()).st_size == 0:
+					# an empty file can not be memory mapped
+					buffer = b""
+				else:
+					buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+				try:
+					# the entries refer to the text: decode it (but do not build any tokens from it)
+					rawText = str(buffer, "utf-8")
+					tokens = PHPTokenizer.instance().tokenizeBuffer(buffer, bEmitWhiteSpaces = True, bEmitComments = True, bEmitNewLines = True, bEmitOffsets = True)
+					resultDataList = MediaWikiLocalSettingsEntryList(rawText)
+					syncDataIndices, syncLineIndices, _ = self.__parseTokens(tokens, resultDataList)
+				finally:
+					if isinstance(buffer, mmap.mmap):
+						buffer.close()
 
 		#for b, t in resultDataList:
 		#	print(str(b) + "\t\t" + str(t))
@@ -366,50 +905,250 @@ class MediaWikiLocalSettingsFile(object):
 		#sys.exit(0)
 
 		self.__data = resultDataList
+		self.__rebuildIndex()
 		self.__filePath = filePath
+		self.__rawText = rawText
+		self.__syncDataIndices = [ 0 ] + syncDataIndices
+		self.__syncLineIndices = [ 0 ] + syncLineIndices
 		self.__changedFlag.setChanged(False)
+
+		if st is not None:
+			parseCache.put(filePath, st, self.__getState())
 	#
 
 	#
 	# Write the file (and all changes applied). If the data has not been loaded from a file calling this method will fail.
 	# In that case use <c>toStr()</c> instead.
 	#
-	# Before writing to the file a backup file of "LocalSettings.php" named "LocalSettings.php.sav" is created.
+	# Before writing to the file a backup file of "LocalSettings.php" named "LocalSettings.php.sav" is created (if not disabled).
+	#
+	# The data is written to a temporary file in the same directory first. This file is flushed to disk and then atomically renamed to
+	# "LocalSettings.php": Readers (such as PHP) will either see the old or the new file, but never a partially written file. If
+	# "LocalSettings.php" is a symbolic link the file the link refers to is replaced this way; the link itself remains unchanged.
+	#
+	# @param	bool bBackup			(optional) Create a backup file "LocalSettings.php.sav" before writing.
 	#
-	def save(self):
+	def save(self, bBackup:bool = True):
+		assert isinstance(bBackup, bool)
+
 		if not self.__changedFlag.value:
 			return
 		if self.__data is None:
 			raise Exception("Not loaded!")
 		if self.__filePath is None:
 			raise Exception("Data was originally not loaded from a file!")
-		shutil.copy2(self.__filePath, self.__filePath + ".sav")
-		with codecs.open(self.__filePath, "w", "utf-8") as f:
-			f.write(self.toStr())
+		if bBackup:
+			shutil.copy2(self.__filePath, self.__filePath + ".sav")
+
+		# if the file is a symbolic link the file it refers to must be replaced (and not the link)
+		targetFilePath = os.path.realpath(self.__filePath)
+		dirPath = os.path.dirname(targetFilePath)
+		fd, tempFilePath = tempfile.mkstemp(prefix = ".LocalSettings.", suffix = ".tmp", dir = dirPath)
+		try:
+			with os.fdopen(fd, "w", encoding = "utf-8", newline = "") as f:
+				f.write(self.toStr())
+				f.flush()
+				os.fsync(f.fileno())
+			shutil.copymode(targetFilePath, tempFilePath)
+			os.replace(tempFilePath, targetFilePath)
+		except:
+			try:
+				os.unlink(tempFilePath)
+			except OSError:
+				pass
+			raise
+
+		# make the rename itself durable
+		fd = os.open(dirPath, os.O_RDONLY)
+		try:
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+
 		self.__changedFlag.setChanged(False)
+		# the data no longer reflects the text originally read: the next reload() must parse the file completely
+		self.__rawText = None
+	#
+
+	#
+	# Reload the file after it has been modified on disk.
+	#
+	# Only the regions of the file that have changed since it has been loaded are parsed again. All entries in regions that have not been
+	# modified are kept: they remain the same objects. If this is not possible - e.g. as the data has been modified in the meantime - the
+	# file is loaded and parsed completely.
+	#
+	def reload(self):
+		if self.__data is None:
+			raise Exception("Not loaded!")
+		if self.__filePath is None:
+			raise Exception("Data was originally not loaded from a file!")
+
+		if (self.__rawText is None) or self.__changedFlag.value:
+			self.__reloadCompletely()
+			return
+
+		with codecs.open(self.__filePath, "r", "utf-8") as f:
+			newText = f.read()
+		oldText = self.__rawText
+		if newText == oldText:
+			return
+
+		# determine the regions modified
+
+		oldLines = MediaWikiLocalSettingsFile.__splitLines(oldText)
+		newLines = MediaWikiLocalSettingsFile.__splitLines(newText)
+		oldLineOffsets = MediaWikiLocalSettingsFile.__getLineOffsets(oldLines)
+		newLineOffsets = MediaWikiLocalSettingsFile.__getLineOffsets(newLines)
+		nOld = len(oldLines)
+		nNew = len(newLines)
+		nPrefix = 0
+		nMax = min(nOld, nNew)
+		while (nPrefix < nMax) and (oldLines[nPrefix] == newLines[nPrefix]):
+			nPrefix += 1
+		nSuffix = 0
+		nMax -= nPrefix
+		while (nSuffix < nMax) and (oldLines[nOld - 1 - nSuffix] == newLines[nNew - 1 - nSuffix]):
+			nSuffix += 1
+
+		opcodes = [ ( "equal", 0, nPrefix, 0, nPrefix ) ]
+		sm = difflib.SequenceMatcher(None, oldLines[nPrefix:nOld - nSuffix], newLines[nPrefix:nNew - nSuffix], autojunk=False)
+		for tag, i1, i2, j1, j2 in sm.get_opcodes():
+			opcodes.append( ( tag, i1 + nPrefix, i2 + nPrefix, j1 + nPrefix, j2 + nPrefix ) )
+		opcodes.append( ( "equal", nOld - nSuffix, nOld, nNew - nSuffix, nNew ) )
+		regions = [ (i1, i2) for tag, i1, i2, j1, j2 in opcodes if tag != "equal" ]
+
+		# maps a line index in the old text to the line index in the new text where a region starts (or ends)
+
+		def mapStart(x:int) -> int:
+			for tag, i1, i2, j1, j2 in opcodes:
+				if (i1 <= x < i2) or (i1 == i2 == x):
+					return j1 + (x - i1) if tag == "equal" else j1
+			return nNew
+		#
+
+		def mapEnd(x:int) -> int:
+			ret = None
+			for tag, i1, i2, j1, j2 in opcodes:
+				if (i1 < x <= i2) or (i1 == i2 == x):
+					ret = j2 - (i2 - x) if tag == "equal" else j2
+			return 0 if ret is None else ret
+		#
+
+		# sync points of the old data; the end of the data is an additional sync point
+
+		syncDataIndices = list(self.__syncDataIndices)
+		syncLineIndices = list(self.__syncLineIndices)
+		if syncLineIndices[-1] != nOld:
+			syncDataIndices.append(len(self.__data))
+			syncLineIndices.append(nOld)
+
+		iSyncEnd = len(syncLineIndices) - 1
+
+		def floorSync(lineIndex:int) -> int:
+			# (the end of the data is no sync point to start parsing from if the last statement is incomplete)
+			return min(bisect.bisect_right(syncLineIndices, lineIndex) - 1, len(self.__syncLineIndices) - 1)
+		#
+
+		def ceilSync(lineIndex:int) -> int:
+			return min(bisect.bisect_left(syncLineIndices, lineIndex), iSyncEnd)
+		#
+
+		# parse all regions modified and build the new data
+
+		tokenizer = PHPTokenizer.instance()
+		newData = MediaWikiLocalSettingsEntryList(newText)
+		newSyncDataIndices = []
+		newSyncLineIndices = []
+		iSyncPrev = 0
+		delta = 0
+		k = 0
+		while k < len(regions):
+			iSyncL = max(floorSync(regions[k][0]), iSyncPrev)
+			iSyncM = ceilSync(regions[k][1])
+			k += 1
+
+			while True:
+				# merge with the following regions if they overlap
+				while (k < len(regions)) and (floorSync(regions[k][0]) <= iSyncM):
+					iSyncM = max(iSyncM, ceilSync(regions[k][1]))
+					k += 1
+
+				lineL = mapStart(syncLineIndices[iSyncL])
+				lineM = mapEnd(syncLineIndices[iSyncM])
+				chunkOffset = newLineOffsets[lineL]
+				chunkLength = newLineOffsets[lineM] - chunkOffset
+				tokens = []
+				try:
+					# tokenize in the context of the following text: a token (such as a block comment) might extend beyond the end of this region
+					for start, end, t in tokenizer.tokenize(newText[chunkOffset:], bEmitWhiteSpaces = True, bEmitComments = True, bEmitNewLines = True, bEmitOffsets = True):
+						if start >= chunkLength:
+							break
+						tokens.append( (start + chunkOffset, end + chunkOffset, Token(t.type, t.value, t.lineNo + lineL, t.colNo)) )
+				except RuntimeError as ee:
+					self.__reloadCompletely()
+					return
+				if tokens and (tokens[-1][1] > chunkOffset + chunkLength):
+					# a token crosses the end of this region: the entries after this region would change as well
+					self.__reloadCompletely()
+					return
+				chunkData = MediaWikiLocalSettingsEntryList(newText)
+				chunkSyncDataIndices, chunkSyncLineIndices, bPending = self.__parseTokens(tokens, chunkData)
+
+				if not bPending or (iSyncM == iSyncEnd):
+					break
+				# the last statement might continue after this region: extend the region to the next sync point
+				iSyncM += 1
+
+			# copy the unmodified entries before this region
+
+			dataOffset = len(newData) - syncDataIndices[iSyncPrev]
+			for i in range(iSyncPrev, iSyncL):
+				newSyncDataIndices.append(syncDataIndices[i] + dataOffset)
+				newSyncLineIndices.append(syncLineIndices[i] + delta)
+			newData.extendFrom(self.__data, syncDataIndices[iSyncPrev], syncDataIndices[iSyncL], delta,
+				newLineOffsets[syncLineIndices[iSyncPrev] + delta] - oldLineOffsets[syncLineIndices[iSyncPrev]])
+
+			# add the entries of this region
+
+			if len(chunkData) or (iSyncM == iSyncEnd):
+				newSyncDataIndices.append(len(newData))
+				newSyncLineIndices.append(lineL)
+			for i, lineIndex in zip(chunkSyncDataIndices, chunkSyncLineIndices):
+				if (lineIndex < lineM) or (iSyncM == iSyncEnd):
+					newSyncDataIndices.append(i + len(newData))
+					newSyncLineIndices.append(lineIndex)
+			newData.extendFrom(chunkData, 0, len(chunkData), 0, 0)
+
+			iSyncPrev = iSyncM
+			delta = lineM - syncLineIndices[iSyncM]
+
+		# copy the unmodified entries after the last region (if the last region does not extend to the end of the data)
+
+		dataOffset = len(newData) - syncDataIndices[iSyncPrev]
+		for i in range(iSyncPrev, len(self.__syncLineIndices) if iSyncPrev < iSyncEnd else iSyncPrev):
+			newSyncDataIndices.append(syncDataIndices[i] + dataOffset)
+			newSyncLineIndices.append(syncLineIndices[i] + delta)
+		newData.extendFrom(self.__data, syncDataIndices[iSyncPrev], len(self.__data), delta,
+			newLineOffsets[syncLineIndices[iSyncPrev] + delta] - oldLineOffsets[syncLineIndices[iSyncPrev]])
+
+		self.__data = newData
+		self.__rebuildIndex()
+		self.__rawText = newText
+		self.__syncDataIndices = newSyncDataIndices
+		self.__syncLineIndices = newSyncLineIndices
 	#
 
 	#
 	# (Re)Generate PHP data from the parsed text.
 	#
+	# Only variables modified are rendered again: All other parts of the text are taken from the original text unchanged.
+	#
 	# @return	str			Returns the text.
 	#
 	def toStr(self) -> str:
 		if self.__data is None:
 			raise Exception("Not loaded!")
-		ret = []
-		for stype, item in self.__data:
-			if stype == "other":
-				if item.type == "varref":
-					ret.append("$" + item.value)
-				elif item.type in [ "bool", "str1", "str2", "int", "word" ]:
-					ret.append(tokenValueToPHP(item.type, item.value))
-				else:
-					assert isinstance(item.value, str)
-					ret.append(item.value)
-			else:
-				ret.append(item.toPHP())
-		return "".join(ret)
+		return "".join(self.__data.iterTextParts())
 	#
 
 	#
@@ -418,67 +1157,172 @@ class MediaWikiLocalSettingsFile(object):
 	# @return	list		Returns a list of lines.
 	#
 	def toLines(self) -> list:
-		if self.__data is None:
-			raise Exception("Not loaded!")
+		return self.toStr().split("\n")
+	#
 
-		ret = []
-		buffer = []
-
-		for stype, item in self.__data:
-			if stype == "other":
-				if item.type == "NEWLINE":
-					ret.append("".join(buffer))
-					buffer.clear()
-				elif item.type == "varref":
-					buffer.append("$" + item.value)
-				elif item.type in [ "bool", "str1", "str2", "int", "word" ]:
-					buffer.append(tokenValueToPHP(item.type, item.value))
+	#
+	# Resolve the value of a variable.
+	#
+	# The values of complex assignments are cached. For every value cached all entries it has been built from are recorded (together with their
+	# modification count): A cached value is used only as long as each of these variables still resolves to the same unmodified entry. This way
+	# modifying a variable (or adding an entry that takes precedence) invalidates exactly the values depending on it.
+	#
+	# @param		str varName				The name of the variable to resolve.
+	# @param		str[] varNamesResolving	The names of all complex assignments currently being resolved. (Used for detecting cyclic references.)
+	# @param		list dependencies		Receives 3-tuples of variable name, entry (or <c>None</c>) and modification count for all entries the
+	#										value depends on.
+	# @return		value					The value or <c>None</c> if the variable does not exist.
+	#
+	def __resolveVarValue(self, varName:str, varNamesResolving:list, dependencies:list):
+		item = self.getVar(varName)
+		if item is None:
+			dependencies.append( ( varName, None, 0 ) )
+			return None
+
+		if isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment):
+			# type: MediaWikiLocalSettingsComplexVariableAssignment
+			cached = self.__varValueCache.get(varName)
+			if cached is not None:
+				value, valueDependencies = cached
+				for depVarName, depItem, depModificationCount in valueDependencies:
+					if (self.getVar(depVarName) is not depItem) or ((depItem is not None) and (depItem.modificationCount != depModificationCount)):
+						break
 				else:
-					assert isinstance(item.value, str)
-					buffer.append(item.value)
-			else:
-				buffer.append(item.toPHP())
+					dependencies.extend(valueDependencies)
+					return value
+
+			if varName in varNamesResolving:
+				raise Exception("Cyclic variable reference: " + " -> ".join([
+					"$" + x for x in varNamesResolving[varNamesResolving.index(varName):] + [ varName ]
+				]))
+
+			valueDependencies = [ ( varName, item, item.modificationCount ) ]
+			def getValueCallback(refVarName:str):
+				v = self.__resolveVarValue(refVarName, varNamesResolving, valueDependencies)
+				if v is None:
+					raise Exception("No such variable: " + repr(refVarName))
+				return v
+			#
+			varNamesResolving.append(varName)
+			try:
+				value = item.getValue(getValueCallback)
+			finally:
+				varNamesResolving.pop()
+
+			self.__varValueCache[varName] = ( value, valueDependencies )
+			dependencies.extend(valueDependencies)
+			return value
 
-		if buffer:
-			ret.append("".join(buffer))
 		else:
-			ret.append("")
+			# type: TypeValue, MediaWikiLocalSettingsVariableAssignment, MediaWikiLocalSettingsArrayAppend
+			dependencies.append( ( varName, item, item.modificationCount ) )
+			return self.__getSimpleEntryValue(item)
+	#
 
-		return ret
+	#
+	# Get the value of an entry that does not depend on other variables: a variable assignment or a value appended to an array.
+	#
+	def __getSimpleEntryValue(self, item):
+		v = item.value
+		if isinstance(v, TypedValue):
+			if v.dataType == "magic":
+				# this is a "magic" variable. return the replacement value.
+				return self.__magicVarValues[v.value]
+			else:
+				return v.value
+		elif isinstance(v, list):
+			ret = []
+			for d in v:
+				ret.append(d.value)
+			return ret
+		else:
+			raise Exception("Implementation Error!")
+	#
+
+	#
+	# Get the value of an entry. Variables a complex assignment refers to are resolved by <c>getVarValue()</c>.
+	#
+	def __getEntryValue(self, item):
+		if isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment):
+			return item.getValue(self.getVarValueE)
+		return self.__getSimpleEntryValue(item)
+	#
+
+	#
+	# Convert a value to the dictionary representing a PHP array. Values that are not arrays are dropped as PHP would do for <c>null</c>.
+	#
+	@staticmethod
+	def __toArrayDict(value) -> dict:
+		if isinstance(value, dict):
+			return value
+		if isinstance(value, list):
+			return { i: v for i, v in enumerate(value) }
+		return {}
 	#
 
 	#
 	# Get a variable value.
 	# This method will resolve the value: If it contains magic constants or simple expressions the syntax will be evaluated and the resulting value returned.
+	# Values of variables built from other variables are cached.
 	#
 	# @return		value			This data or <c>None</c> if the variable does not exist.
 	#
 	def getVarValue(self, varName:str):
 		assert isinstance(varName, str)
 
-		item = self.getVar(varName)
-		if item is not None:
-			if isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment):
-				# type: MediaWikiLocalSettingsComplexVariableAssignment
-				return item.getValue(self.getVarValueE)
-			else:
-				# type: TypeValue, MediaWikiLocalSettingsVariableAssignment, MediaWikiLocalSettingsArrayAppend
-				v = item.value
-				if isinstance(v, TypedValue):
-					if v.dataType == "magic":
-						# this is a "magic" variable. return the replacement value.
-						return self.__magicVarValues[v.value]
-					else:
-						return v.value
-				elif isinstance(v, list):
-					ret = []
-					for d in v:
-						ret.append(d.value)
-					return ret
-				else:
-					raise Exception("Implementation Error!")
+		return self.__resolveVarValue(varName, [], [])
+	#
 
-		return None
+	#
+	# Get the value a variable has after all active statements of this file have been executed: The last active assignment of the whole
+	# variable takes effect, followed by all active assignments to array elements and all values appended to the array after this assignment.
+	#
+	# In contrast to <c>getVarValue()</c> - which returns the value of the first entry, even if it is commented out or assigns a single array
+	# element - this is the value MediaWiki will see (as far as it can be determined without executing PHP code).
+	#
+	# @return		value			The value or <c>None</c> if there is no active entry for this variable. If array elements are assigned or
+	#								values are appended a dictionary is returned that maps the array keys (int or str, converted the way PHP
+	#								converts them) to the values. Nested array elements are represented by nested dictionaries.
+	#
+	def getEffectiveVarValue(self, varName:str):
+		assert isinstance(varName, str)
+
+		if self.__data is None:
+			raise Exception("Not loaded!")
+
+		items = [ item for item in self.__varIndex.get(varName, []) if item.isActive ]
+
+		# the last assignment of the whole variable discards everything before
+
+		iStart = 0
+		value = None
+		for i in range(len(items) - 1, -1, -1):
+			item = items[i]
+			if isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment) \
+				or (isinstance(item, MediaWikiLocalSettingsVariableAssignment) and not item.indexValues):
+				value = self.__getEntryValue(item)
+				iStart = i + 1
+				break
+		if iStart == len(items):
+			return value
+
+		# apply the modifications of array elements
+
+		ret = MediaWikiLocalSettingsFile.__toArrayDict(value)
+		for item in items[iStart:]:
+			v = self.__getEntryValue(item)
+			if isinstance(item, MediaWikiLocalSettingsArrayAppend):
+				intKeys = [ k for k in ret if isinstance(k, int) ]
+				ret[max(intKeys) + 1 if intKeys else 0] = v
+			else:
+				keys = [ MediaWikiLocalSettingsFile.__toArrayKey(x.dataType, x.value)[1] for x in item.indexValues ]
+				d = ret
+				for k in keys[:-1]:
+					child = MediaWikiLocalSettingsFile.__toArrayDict(d.get(k))
+					d[k] = child
+					d = child
+				d[keys[-1]] = v
+		return ret
 	#
 
 	#
@@ -497,6 +1341,18 @@ class MediaWikiLocalSettingsFile(object):
 		raise Exception("No such variable: " + repr(varName))
 	#
 
+	#
+	# Iterate over all statements recognized in the order they appear in the file.
+	#
+	# @return		tuple[]			Returns 2-tuples: the entry type - either "arrayAppend", "varAssign", "varAssignComplex", "include" or
+	#								"loadExtension" - and the statement object.
+	#
+	def iterStatements(self):
+		if self.__data is None:
+			raise Exception("Not loaded!")
+		return self.__data.iterStatements()
+	#
+
 	#
 	# Get a variable-like object.
 	#
@@ -509,43 +1365,138 @@ class MediaWikiLocalSettingsFile(object):
 	def getVar(self, varName:str):
 		assert isinstance(varName, str)
 
-		for stype, item in self.__data:
-			if stype in [ "arrayAppend", "varAssign", "varAssignComplex" ]:
-				if item.varName == varName:
-					return item
+		items = self.__varIndex.get(varName)
+		if items:
+			return items[0]
 
 		return None
 	#
 
+	#
+	# Get a variable assignment with a single index such as <c>$someVarName["xyz"] = ...;</c>.
+	#
+	# @return		MediaWikiLocalSettingsVariableAssignment		The assignment or <c>None</c> if there is no such assignment.
+	#
 	def getIndexedVar1(self, varName, indexValue1):
 		assert isinstance(varName, str)
 		assert isinstance(indexValue1, TypedValue)
 
-		for stype, item in self.__data:
-			if stype == "varAssign":
-				if item.varName == varName:
-					v = item.indexValue
-					if (v != None) and (v == indexValue1):
-						return item
+		items = self.__indexedVarIndex.get( (varName, MediaWikiLocalSettingsFile.__toIndexKey([ indexValue1 ])) )
+		if items:
+			return items[0]
 
 		return None
 	#
 
+	#
+	# Get a variable assignment with two indices such as <c>$someVarName["xyz"][123] = ...;</c>.
+	#
+	# @return		MediaWikiLocalSettingsVariableAssignment		The assignment or <c>None</c> if there is no such assignment.
+	#
 	def getIndexedVar2(self, varName, indexValue1, indexValue2):
 		assert isinstance(varName, str)
 		assert isinstance(indexValue1, TypedValue)
 		assert isinstance(indexValue2, TypedValue)
 
-		for stype, item in self.__data:
-			if stype == "varAssign":
-				if item.varName == varName:
-					v = item.indexValue
-					if (v != None) and (v == indexValue1) and (v == indexValue2):
-						return item
+		items = self.__indexedVarIndex.get( (varName, MediaWikiLocalSettingsFile.__toIndexKey([ indexValue1, indexValue2 ])) )
+		if items:
+			return items[0]
 
 		return None
 	#
 
+	#
+	# Find all variables with names starting with the specified prefix, e.g. all variables starting with "wgCache".
+	#
+	# @param		str prefix			The prefix of the variable names (without "$"). If empty all variables are returned.
+	# @return		str[]				Returns the names of all variables assigned (or appended to) in this file in ascending order.
+	#
+	def findVars(self, prefix:str = "") -> list:
+		assert isinstance(prefix, str)
+
+		if self.__data is None:
+			raise Exception("Not loaded!")
+
+		if self.__sortedVarNames is None:
+			self.__sortedVarNames = sorted(self.__varIndex.keys())
+		varNames = self.__sortedVarNames
+
+		i = bisect.bisect_left(varNames, prefix)
+		j = i
+		while (j < len(varNames)) and varNames[j].startswith(prefix):
+			j += 1
+		return varNames[i:j]
+	#
+
+	#
+	# Find all assignments to elements of an array variable such as <c>$wgGroupPermissions['user']['edit'] = true;</c>.
+	#
+	# Array keys are compared the way PHP compares them: <c>'user'</c> and <c>"user"</c> are the same key and so are <c>5</c> and
+	# <c>'5'</c>.
+	#
+	# @param		str varName			The name of the variable (without "$").
+	# @param		list indexPrefix	(optional) The leading array keys: either plain values (str, int, bool) or <c>TypedValue</c> objects.
+	#									E.g. <c>[ "user" ]</c> finds all assignments to <c>$wgGroupPermissions['user'][...]</c>. If not specified all
+	#									assignments to elements of the variable are returned.
+	# @return		MediaWikiLocalSettingsVariableAssignment[]		The assignments (including assignments commented out) sorted by their array
+	#																keys. Assignments with the same keys are returned in the order they appear
+	#																in the file.
+	#
+	def findIndexed(self, varName:str, indexPrefix:list = None) -> list:
+		assert isinstance(varName, str)
+		if indexPrefix is None:
+			indexPrefix = []
+		assert isinstance(indexPrefix, (list, tuple))
+
+		if self.__data is None:
+			raise Exception("Not loaded!")
+
+		prefixKey = []
+		for v in indexPrefix:
+			if isinstance(v, TypedValue):
+				prefixKey.append(MediaWikiLocalSettingsFile.__toArrayKey(v.dataType, v.value))
+			else:
+				assert isinstance(v, (str, int, bool))
+				prefixKey.append(MediaWikiLocalSettingsFile.__toArrayKey("str1" if isinstance(v, str) else "int", v))
+		prefixKey = tuple(prefixKey)
+		n = len(prefixKey)
+
+		keys, items = self.__getSortedIndexedVar(varName)
+		i = bisect.bisect_left(keys, prefixKey)
+		j = i
+		while (j < len(keys)) and (keys[j][:n] == prefixKey):
+			j += 1
+		return items[i:j]
+	#
+
+	#
+	# Is the specified extension loaded by an active <c>wfLoadExtension()</c> or <c>wfLoadExtensions()</c> statement?
+	#
+	def isExtensionEnabled(self, extensionName:str) -> bool:
+		assert isinstance(extensionName, str)
+
+		if self.__data is None:
+			raise Exception("Not loaded!")
+
+		return extensionName in self.__enabledExtensionNames
+	#
+
+	#
+	# Get all statements that load the specified extension (or skin) - including statements that are commented out.
+	#
+	# @return		MediaWikiLocalSettingsLoadExtension[]		The statements in the order they appear in the file.
+	#
+	def getExtensionLoads(self, extensionName:str, bSkin:bool = False) -> list:
+		assert isinstance(extensionName, str)
+		assert isinstance(bSkin, bool)
+
+		if self.__data is None:
+			raise Exception("Not loaded!")
+
+		index = self.__skinIndex if bSkin else self.__extensionIndex
+		return list(index.get(extensionName, []))
+	#
+
 	def activateWiki(self):
 		v = self.getVar("wgReadOnly")
 		if v is None:
@@ -557,13 +1508,13 @@ class MediaWikiLocalSettingsFile(object):
 	def deactivateWiki(self, text):
 		v = self.getVar("wgReadOnly")
 		if v is None:
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
-			self.__data.append( ( "varAssign", MediaWikiLocalSettingsVariableAssignment(self.__changedFlag, -1, -1, True, "wgReadOnly", None, TypedValue("str1", text)) ) )
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
-			self.__data.append( ( "other", Token("NEWLINE", "\n", -1, -1) ) )
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
+			self.__appendEntry("varAssign", MediaWikiLocalSettingsVariableAssignment(self.__changedFlag, -1, -1, True, "wgReadOnly", None, TypedValue("str1", text)))
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
+			self.__appendEntry("other", Token("NEWLINE", "\n", -1, -1))
 			self.__changedFlag.setChanged(True)
 		else:
 			v.setValue(TypedValue("str1", text))
@@ -580,6 +1531,89 @@ class MediaWikiLocalSettingsFile(object):
 		return tName
 	#
 
+	#
+	# Quickly read the values of some variables from a "LocalSettings.php" file. This is much faster than loading the file completely: The file
+	# is only parsed until an assignment of each variable has been found. (Typically important variables are defined at the beginning of a
+	# "LocalSettings.php" file.) Variables that do not occur in the file at all are detected by a simple text search without any parsing.
+	#
+	# The values returned are the same as <c>getVarValue()</c> would return after a complete <c>load()</c>. If a variable is defined by a complex
+	# assignment its value depends on other variables: In this case parsing continues until these variables have been found as well.
+	#
+	# @param	str filePath									The file path of the MediaWiki "LocalSettings.php" file.
+	# @param	str[] varNames									The names of the variables to read.
+	# @param	MediaWikiLocalSettingsFileCache parseCache		(optional) A cache for parsing results. If this cache contains a valid parsing
+	#															result this result is used.
+	# @return	dict											Returns a dictionary that maps each variable name to its value (or <c>None</c> if
+	#															there is no such variable).
+	#
+	@staticmethod
+	def peekVars(filePath:str, varNames, parseCache:MediaWikiLocalSettingsFileCache = None) -> dict:
+		assert isinstance(filePath, str)
+		varNames = list(varNames)
+		for varName in varNames:
+			assert isinstance(varName, str)
+
+		if parseCache is not None:
+			assert isinstance(parseCache, MediaWikiLocalSettingsFileCache)
+			filePath = os.path.abspath(filePath)
+			state = parseCache.get(filePath, os.stat(filePath))
+			if state is not None:
+				lsFile = MediaWikiLocalSettingsFile()
+				lsFile.__setState(state)
+				return { varName: lsFile.getVarValue(varName) for varName in varNames }
+
+		with codecs.open(filePath, "r", "utf-8") as f:
+			rawText = f.read()
+
+		dirPath = os.path.dirname(filePath)
+		lsFile = MediaWikiLocalSettingsFile()
+		lsFile.__magicVarValues = {
+			"__FILE__": filePath,
+			"__DIR__": dirPath,
+			"dirname(__DIR__)": os.path.dirname(dirPath),
+		}
+		lsFile.__data = MediaWikiLocalSettingsEntryList(rawText)
+		lsFile.__rebuildIndex()
+
+		# parse until the first entry of every variable required has been found
+
+		tokens = iter(PHPTokenizer.instance().tokenize(rawText, bEmitWhiteSpaces = True, bEmitComments = True, bEmitNewLines = True, bEmitOffsets = True))
+		varNamesSearched = set()
+		varNamesToFind = set(varNames)
+		while True:
+			# pre-scan: a variable can only be assigned if its name occurs in the text
+			varNamesSearched.update(varNamesToFind)
+			varNamesToFind = set([ varName for varName in varNamesToFind if ("$" + varName) in rawText ])
+			if not varNamesToFind:
+				break
+
+			lsFile.__parseTokens(tokens, lsFile.__data, varNamesToFind)
+			lsFile.__rebuildIndex()
+			if varNamesToFind:
+				# all tokens have been parsed
+				break
+
+			# complex assignments depend on other variables: these variables are required as well
+
+			varNamesMissing = set()
+			varNamesVisited = set()
+			def collectMissingVarNames(varName:str) -> str:
+				if varName not in varNamesVisited:
+					varNamesVisited.add(varName)
+					item = lsFile.getVar(varName)
+					if item is None:
+						varNamesMissing.add(varName)
+					elif isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment):
+						item.getValue(collectMissingVarNames)
+				return ""
+			#
+			for varName in varNames:
+				collectMissingVarNames(varName)
+			varNamesToFind = varNamesMissing - varNamesSearched
+
+		return { varName: lsFile.getVarValue(varName) for varName in varNames }
+	#
+
 #
 
 
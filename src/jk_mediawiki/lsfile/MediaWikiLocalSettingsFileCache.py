@@ -0,0 +1,246 @@
+import os
+import threading
+import tempfile
+import hashlib
+import pickle
+import zlib
+
+
+from . import __version__
+
+
+
+
+
+
+#
+# This class implements a persistent on-disk cache for parsed "LocalSettings.php" files.
+#
+# For every file parsed a single cache file is stored in the cache directory. Each cache file consists of a header line and the compressed
+# serialized parsing state. The header line contains the cache format version, the version of this library and the stat signature
+# (inode, size and modification time in nanoseconds) of the "LocalSettings.php" file at the time it was parsed. A cache entry is used only if
+# all of this information matches: Upgrading this library or modifying the source file invalidates existing entries automatically.
+#
+# The total size of the cache directory is limited. If this limit is exceeded the least recently used entries are removed. (To track use
+# the modification time of a cache file is updated on every cache hit.) The cache directory is not scanned on every write: the total size is
+# estimated from the files written. The directory is scanned only if this estimate exceeds the limit or after a number of writes (as other
+# processes may write to the same directory). Entries are then removed until the total size is below a lower limit, so that the next writes
+# don't require a scan again.
+#
+# Caching is best effort: If a cache file can't be written the state is not stored, but no error is raised.
+#
+class MediaWikiLocalSettingsFileCache(object):
+
+	################################################################################################################################
+	## Constants
+	################################################################################################################################
+
+	# Increment this if the structure of the serialized state changes
+	FORMAT_VERSION = 6
+
+	__MAGIC = "jkmwls"
+
+	# The number of writes after which the cache directory is scanned even if the size estimated is below the limit
+	__SCAN_INTERVAL = 64
+
+	# If the limit is exceeded entries are removed until the total size is below this fraction of the limit
+	__EVICT_TARGET_RATIO = 0.75
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	str cacheDirPath			The directory to store cache files in. This directory is created if it does not yet exist.
+	# @param	int maxSizeBytes			The maximum total size of all cache files.
+	#
+	def __init__(self, cacheDirPath:str, maxSizeBytes:int = 64*1024*1024):
+		assert isinstance(cacheDirPath, str)
+		assert isinstance(maxSizeBytes, int)
+		assert maxSizeBytes > 0
+
+		self.__cacheDirPath = os.path.abspath(cacheDirPath)
+		self.__maxSizeBytes = maxSizeBytes
+		self.__headerPrefix = MediaWikiLocalSettingsFileCache.__MAGIC + " " + str(MediaWikiLocalSettingsFileCache.FORMAT_VERSION) + " " + __version__ + " "
+
+		self.__lock = threading.Lock()			# protects the size estimate
+		self.__estimatedSizeBytes = None		# the estimated total size of all cache files; <c>None</c> if the directory has not been scanned yet
+		self.__nWritesSinceScan = 0
+	#
+
+	################################################################################################################################
+	## Properties
+	################################################################################################################################
+
+	@property
+	def cacheDirPath(self) -> str:
+		return self.__cacheDirPath
+	#
+
+	@property
+	def maxSizeBytes(self) -> int:
+		return self.__maxSizeBytes
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __getCacheFilePath(self, filePath:str) -> str:
+		return os.path.join(self.__cacheDirPath, hashlib.sha1(filePath.encode("utf-8")).hexdigest() + ".cache")
+	#
+
+	def __buildHeader(self, filePath:str, st:os.stat_result) -> bytes:
+		return (self.__headerPrefix + str(st.st_ino) + " " + str(st.st_size) + " " + str(st.st_mtime_ns) + " " + filePath + "\n").encode("utf-8")
+	#
+
+	#
+	# Scan the cache directory. If the total size of the cache files exceeds the limit the least recently used cache files are removed until
+	# the total size is below the eviction target. The lock must be held by the caller.
+	#
+	# @return	int							Returns the total size of the remaining cache files.
+	#
+	def __evict(self) -> int:
+		entries = []
+		totalSize = 0
+		for fe in os.scandir(self.__cacheDirPath):
+			if fe.is_file() and fe.name.endswith(".cache"):
+				try:
+					st = fe.stat()
+				except FileNotFoundError:
+					continue
+				entries.append((st.st_mtime_ns, st.st_size, fe.path))
+				totalSize += st.st_size
+
+		if totalSize <= self.__maxSizeBytes:
+			return totalSize
+
+		targetSize = int(self.__maxSizeBytes * MediaWikiLocalSettingsFileCache.__EVICT_TARGET_RATIO)
+		entries.sort()
+		for _, size, path in entries:
+			try:
+				os.unlink(path)
+			except FileNotFoundError:
+				pass
+			totalSize -= size
+			if totalSize <= targetSize:
+				break
+		return totalSize
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get the parsing state stored for the specified file.
+	#
+	# @param	str filePath				The (absolute) path of the "LocalSettings.php" file.
+	# @param	os.stat_result st			The current stat information of this file.
+	# @return	object						Returns the state stored or <c>None</c> if there is no valid cache entry.
+	#
+	def get(self, filePath:str, st:os.stat_result):
+		cacheFilePath = self.__getCacheFilePath(filePath)
+		try:
+			with open(cacheFilePath, "rb") as f:
+				if f.readline() != self.__buildHeader(filePath, st):
+					return None
+				rawData = f.read()
+			state = pickle.loads(zlib.decompress(rawData))
+		except FileNotFoundError:
+			return None
+		except Exception:
+			# the cache file is damaged: ignore it; it will be replaced on the next put()
+			return None
+
+		try:
+			os.utime(cacheFilePath)
+		except OSError:
+			pass
+
+		return state
+	#
+
+	#
+	# Store the parsing state for the specified file.
+	#
+	# @param	str filePath				The (absolute) path of the "LocalSettings.php" file.
+	# @param	os.stat_result st			The stat information of this file at the time it was read.
+	# @param	object state				The (picklable) state to store.
+	# @return	bool						Returns <c>True</c> if the state has been stored and <c>False</c> if the cache file could not be written.
+	#
+	def put(self, filePath:str, st:os.stat_result, state) -> bool:
+		cacheFilePath = self.__getCacheFilePath(filePath)
+		tempFilePath = None
+		try:
+			os.makedirs(self.__cacheDirPath, mode=0o700, exist_ok=True)
+			rawData = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+			# (each call needs a temporary file of its own: multiple threads may store the state of the same file at the same time)
+			fd, tempFilePath = tempfile.mkstemp(suffix=".tmp", dir=self.__cacheDirPath)
+			with os.fdopen(fd, "wb") as f:
+				f.write(self.__buildHeader(filePath, st))
+				f.write(rawData)
+				newSize = f.tell()
+			try:
+				oldSize = os.stat(cacheFilePath).st_size
+			except FileNotFoundError:
+				oldSize = 0
+			os.replace(tempFilePath, cacheFilePath)
+			tempFilePath = None
+		except (OSError, pickle.PicklingError, TypeError, AttributeError):
+			# the state can't be stored: parsing will be required next time
+			return False
+		finally:
+			if tempFilePath is not None:
+				try:
+					os.unlink(tempFilePath)
+				except OSError:
+					pass
+
+		with self.__lock:
+			self.__nWritesSinceScan += 1
+			if self.__estimatedSizeBytes is not None:
+				self.__estimatedSizeBytes += newSize - oldSize
+			if (self.__estimatedSizeBytes is None) \
+				or (self.__estimatedSizeBytes > self.__maxSizeBytes) \
+				or (self.__nWritesSinceScan >= MediaWikiLocalSettingsFileCache.__SCAN_INTERVAL):
+				try:
+					self.__estimatedSizeBytes = self.__evict()
+				except OSError:
+					# the cache directory can't be scanned right now: try again on the next write
+					self.__estimatedSizeBytes = None
+				self.__nWritesSinceScan = 0
+
+		return True
+	#
+
+	#
+	# Remove all cache files.
+	#
+	def clear(self):
+		if not os.path.isdir(self.__cacheDirPath):
+			return
+		with self.__lock:
+			for fe in os.scandir(self.__cacheDirPath):
+				if fe.is_file() and fe.name.endswith(".cache"):
+					try:
+						os.unlink(fe.path)
+					except FileNotFoundError:
+						pass
+			self.__estimatedSizeBytes = 0
+			self.__nWritesSinceScan = 0
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,121 @@
+import os
+import threading
+
+
+from .MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from .MediaWikiLocalSettingsFileCache import MediaWikiLocalSettingsFileCache
+from .MediaWikiLocalSettingsIncludeGraph import MediaWikiLocalSettingsIncludeGraph
+
+
+
+
+
+
+#
+# This class manages a set of parsed PHP settings files: "LocalSettings.php" files as well as all files they include.
+#
+# Every distinct file is parsed only once during the lifetime of an instance of this class, no matter how many include graphs refer to it.
+# This way a fleet of wikis that share the same include files (such as a "CommonSettings.php") requires to parse these files only once.
+# Instances of this class are thread safe: Include graphs can be built concurrently.
+#
+# NOTE: All files are considered to be read only: Do not modify the files returned by <c>getFile()</c>.
+#
+class MediaWikiLocalSettingsFileSet(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	MediaWikiLocalSettingsFileCache parseCache		(optional) A persistent cache for parsing results.
+	#
+	def __init__(self, parseCache:MediaWikiLocalSettingsFileCache = None):
+		if parseCache is not None:
+			assert isinstance(parseCache, MediaWikiLocalSettingsFileCache)
+
+		self.__parseCache = parseCache
+		self.__files = {}					# maps a file path to the file loaded (or <c>None</c> if there is no such file)
+		self.__fileLocks = {}				# maps a file path to the lock that is held while loading the file
+		self.__lock = threading.Lock()
+	#
+
+	################################################################################################################################
+	## Properties
+	################################################################################################################################
+
+	#
+	# The paths of all files loaded so far.
+	#
+	@property
+	def filePaths(self) -> list:
+		with self.__lock:
+			return sorted([ filePath for filePath, lsFile in self.__files.items() if lsFile is not None ])
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get a parsed file. The file is loaded and parsed on first access only.
+	#
+	# @param	str filePath						The path of the file.
+	# @return	MediaWikiLocalSettingsFile			Returns the file or <c>None</c> if there is no such file.
+	#
+	def getFile(self, filePath:str) -> MediaWikiLocalSettingsFile:
+		assert isinstance(filePath, str)
+
+		filePath = os.path.realpath(filePath)
+
+		with self.__lock:
+			if filePath in self.__files:
+				return self.__files[filePath]
+			fileLock = self.__fileLocks.get(filePath)
+			if fileLock is None:
+				fileLock = threading.Lock()
+				self.__fileLocks[filePath] = fileLock
+
+		# only one thread loads a file; all other threads requesting the same file wait for it
+
+		with fileLock:
+			with self.__lock:
+				if filePath in self.__files:
+					return self.__files[filePath]
+
+			if os.path.isfile(filePath):
+				lsFile = MediaWikiLocalSettingsFile()
+				lsFile.load(filePath = filePath, parseCache = self.__parseCache)
+			else:
+				lsFile = None
+
+			with self.__lock:
+				self.__files[filePath] = lsFile
+				del self.__fileLocks[filePath]
+
+		return lsFile
+	#
+
+	#
+	# Build the include graph of a "LocalSettings.php" file.
+	#
+	# @param	str filePath							The path of the "LocalSettings.php" file.
+	# @return	MediaWikiLocalSettingsIncludeGraph		Returns the include graph.
+	#
+	def loadIncludeGraph(self, filePath:str) -> MediaWikiLocalSettingsIncludeGraph:
+		assert isinstance(filePath, str)
+
+		return MediaWikiLocalSettingsIncludeGraph(self, filePath)
+	#
+
+#
+
+
+
+
+
+
+
+
+
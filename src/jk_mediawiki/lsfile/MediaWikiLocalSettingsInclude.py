@@ -0,0 +1,250 @@
+import os
+import re
+
+
+from jk_utils import *
+from jk_utils.tokenizer import *
+
+from ..impl.lang_support_php import *
+
+
+
+
+
+
+
+#
+# Represents an <c>include</c>, <c>include_once</c>, <c>require</c> or <c>require_once</c> statement in a "LocalSettings.php" file.
+#
+class MediaWikiLocalSettingsInclude(object):
+
+	# ================================================================================================================================
+	# ==== Constants
+
+	# Variables embedded in double quoted strings: "$IP/..." or "{$IP}/..."
+	__RE_EMBEDDED_VAR = re.compile(r"\{\$([a-zA-Z_][a-zA-Z0-9_]*)\}|\$([a-zA-Z_][a-zA-Z0-9_]*)")
+
+	# ================================================================================================================================
+	# ==== Constructor Methods
+
+	def __init__(self, changedFlag:ChangedFlag, lineNo:int, colNo:int, bIsActive:bool, keyword:str, x:list):
+		assert isinstance(changedFlag, ChangedFlag)
+		assert isinstance(lineNo, int)
+		assert isinstance(colNo, int)
+		assert isinstance(bIsActive, bool)
+		assert keyword in [ "include", "include_once", "require", "require_once" ]
+		assert isinstance(x, list)
+		for xItem in x:
+			assert isinstance(xItem, TypedValue)
+
+		self.__changedFlag = changedFlag
+		self.__lineNo = lineNo
+		self.__colNo = colNo
+		self.__bIsActive = bIsActive
+		self.__keyword = keyword
+		self.__x = x
+		self.__nModifications = 0
+	#
+
+	# ================================================================================================================================
+	# ==== Properties
+
+	@property
+	def lineNo(self) -> int:
+		return self.__lineNo
+	#
+
+	@property
+	def colNo(self) -> int:
+		return self.__colNo
+	#
+
+	@property
+	def keyword(self) -> str:
+		return self.__keyword
+	#
+
+	@property
+	def isOnce(self) -> bool:
+		return self.__keyword.endswith("_once")
+	#
+
+	@property
+	def isActive(self) -> bool:
+		return self.__bIsActive
+	#
+
+	@property
+	def isCommentedOut(self) -> bool:
+		return not self.__bIsActive
+	#
+
+	#
+	# Has this entry been modified since it has been parsed? (Only modified entries need to be rendered again on saving.)
+	#
+	@property
+	def isModified(self) -> bool:
+		return self.__nModifications > 0
+	#
+
+	#
+	# The number of modifications of this entry. (This is used to detect if values derived from this entry are still valid.)
+	#
+	@property
+	def modificationCount(self) -> int:
+		return self.__nModifications
+	#
+
+	# ================================================================================================================================
+	# ==== Methods
+
+	def toPHP(self):
+		ret = "" if self.__bIsActive else "#=# "
+		ret += self.__keyword
+
+		bDirName = False
+		for xItem in self.__x:
+			if xItem.dataType == "varref":
+				ret += " $" + xItem.value
+			elif xItem.dataType == "word":
+				if xItem.value == "dirname":
+					ret += " dirname("
+					bDirName = True
+					continue
+				ret += xItem.value if bDirName else (" " + xItem.value)
+				if bDirName:
+					ret += ")"
+					bDirName = False
+			else:
+				ret += " " + xItem.toPHP()
+
+		ret += ";"
+		return ret
+	#
+
+	def __str__(self):
+		return self.toPHP()
+	#
+
+	def __repr__(self):
+		return self.toPHP()
+	#
+
+	def activate(self):
+		if not self.__bIsActive:
+			self.__bIsActive = True
+			self.__nModifications += 1
+			self.__changedFlag.setChanged(True)
+	#
+
+	def deactivate(self):
+		if self.__bIsActive:
+			self.__bIsActive = False
+			self.__nModifications += 1
+			self.__changedFlag.setChanged(True)
+	#
+
+	#
+	# Move this entry by the specified number of lines. This is used by <c>MediaWikiLocalSettingsFile.reload()</c> if lines have been
+	# inserted or removed before this entry. (This does not change the file's content.)
+	#
+	def _shiftLineNo(self, delta:int):
+		self.__lineNo += delta
+	#
+
+	#
+	# Get the names of all variables the path of the file included depends on.
+	#
+	def getVarNames(self) -> list:
+		ret = []
+		for xItem in self.__x:
+			if xItem.dataType == "varref":
+				ret.append(xItem.value)
+			elif xItem.dataType == "str2":
+				for m in MediaWikiLocalSettingsInclude.__RE_EMBEDDED_VAR.finditer(xItem.value):
+					ret.append(m.group(1) or m.group(2))
+		return ret
+	#
+
+	#
+	# Use this method to obtain the path of the file included. This path is not normalized: It might be relative.
+	#
+	# @param		callable getValueCallback		A callback method that is used to resolve variables.
+	# @param		dict magicVarValues				The values of the magic constants "__FILE__" and "__DIR__" of the file containing this statement.
+	#
+	def getPath(self, getValueCallback, magicVarValues:dict) -> str:
+		assert callable(getValueCallback)
+		assert isinstance(magicVarValues, dict)
+
+		ret = []
+
+		bDirName = False
+		for xItem in self.__x:
+			dataType = xItem.dataType
+			dataValue = xItem.value
+
+			if dataType == "op":
+				continue
+			if dataType == "word":
+				if dataValue == "dirname":
+					bDirName = True
+					continue
+				v = magicVarValues[dataValue]
+				if bDirName:
+					v = os.path.dirname(v)
+					bDirName = False
+			elif dataType == "varref":
+				v = getValueCallback(dataValue)
+			elif dataType == "str2":
+				v = MediaWikiLocalSettingsInclude.__RE_EMBEDDED_VAR.sub(lambda m: getValueCallback(m.group(1) or m.group(2)), dataValue)
+			else:
+				v = dataValue
+			assert isinstance(v, str)
+			ret.append(v)
+
+		return "".join(ret)
+	#
+
+	# ================================================================================================================================
+	# ==== Static Methods
+
+	#
+	# Dictionary <c>dataMap</c> contains something like this:
+	#
+	# {
+	# 	"lineNo": 21,
+	#	"colNo": 1,
+	#	"active": True,
+	#	"keyword": "require_once",
+	#	"x": [
+	#		V(word: "__DIR__"),
+	#		V(op: "."),
+	#		V(str1: "/CommonSettings.php"),
+	#	]
+	# }
+	#
+	@staticmethod
+	def parseFromDict(changedFlag:ChangedFlag, dataMap:dict):
+		assert isinstance(changedFlag, ChangedFlag)
+		assert isinstance(dataMap, dict)
+
+		lineNo = dataMap["lineNo"]
+		colNo = dataMap["colNo"]
+		bIsActive = dataMap["active"]
+		keyword = dataMap["keyword"]
+		x = dataMap["x"]
+
+		ret = MediaWikiLocalSettingsInclude(changedFlag, lineNo, colNo, bIsActive, keyword, x)
+		return ret
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,294 @@
+import os
+import bisect
+
+
+from jk_utils import *
+
+from .MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from .MediaWikiLocalSettingsComplexVariableAssignment import MediaWikiLocalSettingsComplexVariableAssignment
+
+
+
+
+
+
+#
+# This class represents a "LocalSettings.php" file together with all files it includes (by <c>include</c>, <c>include_once</c>, <c>require</c>
+# or <c>require_once</c>).
+#
+# On construction the statements of all files are processed in the order PHP would execute them: If an include statement is encountered the
+# file included is processed at this position. (Conditions are not evaluated: All include statements are considered to be executed.) Paths of
+# files included may depend on variables and magic constants such as <c>__DIR__</c>; they are resolved as they are encountered.
+#
+# Variables are resolved following PHP's semantics: The last assignment wins. Complex assignments refer to the values of other variables at
+# the time the assignment is executed. Only assignments of a variable as a whole are considered: Assignments to array elements and values
+# appended to arrays are ignored.
+#
+# Don't create instances of this class directly: Use <c>MediaWikiLocalSettingsFileSet.loadIncludeGraph()</c> instead. The graph is a snapshot:
+# Modifications of the files are not reflected.
+#
+class MediaWikiLocalSettingsIncludeGraph(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param	MediaWikiLocalSettingsFileSet fileSet		The set of files to take the parsed files from.
+	# @param	str rootFilePath							The path of the "LocalSettings.php" file.
+	#
+	def __init__(self, fileSet, rootFilePath:str):
+		assert isinstance(rootFilePath, str)
+
+		self.__fileSet = fileSet
+		self.__rootFilePath = os.path.realpath(rootFilePath)
+
+		self.__filePaths = []				# all files included, in the order of their first inclusion
+		self.__includes = {}				# maps a file path to the paths of all files included by it
+		self.__unresolvedIncludes = []		# 3-tuples of the path of the including file, the include statement and an error message
+		self.__assignments = []				# all variable assignments in execution order: 2-tuples of file path and assignment
+		self.__positionsByVarName = {}		# maps a variable name to the positions of its assignments in <c>__assignments</c>
+		self.__valueCache = {}				# maps the position of a complex assignment to its value
+
+		rootFile = fileSet.getFile(self.__rootFilePath)
+		if rootFile is None:
+			raise Exception("No such file: " + repr(rootFilePath))
+		self.__processFile(self.__rootFilePath, rootFile, [])
+	#
+
+	################################################################################################################################
+	## Properties
+	################################################################################################################################
+
+	@property
+	def rootFilePath(self) -> str:
+		return self.__rootFilePath
+	#
+
+	#
+	# The paths of all files that are part of this graph (including the "LocalSettings.php" file itself) in the order of their first inclusion.
+	#
+	@property
+	def filePaths(self) -> list:
+		return list(self.__filePaths)
+	#
+
+	#
+	# The include statements that could not be followed. This is a list of 3-tuples: the path of the file containing the statement, the include
+	# statement and a message describing the reason.
+	#
+	@property
+	def unresolvedIncludes(self) -> list:
+		return list(self.__unresolvedIncludes)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __getMagicVarValues(filePath:str) -> dict:
+		dirPath = os.path.dirname(filePath)
+		return {
+			"__FILE__": filePath,
+			"__DIR__": dirPath,
+			"dirname(__DIR__)": os.path.dirname(dirPath),
+		}
+	#
+
+	#
+	# Determine the path of a file included. Relative paths are resolved like PHP does with the default include path: relative to the
+	# current working directory (which is the MediaWiki installation directory containing "LocalSettings.php") and then relative to the
+	# directory of the including file.
+	#
+	def __resolveIncludePath(self, filePath:str, path:str) -> str:
+		if os.path.isabs(path):
+			return os.path.realpath(path)
+		for dirPath in [ os.path.dirname(self.__rootFilePath), os.path.dirname(filePath) ]:
+			candidate = os.path.realpath(os.path.join(dirPath, path))
+			if os.path.isfile(candidate):
+				return candidate
+		return os.path.realpath(os.path.join(os.path.dirname(filePath), path))
+	#
+
+	#
+	# Process the statements of a file in execution order.
+	#
+	# @param	str filePath						The path of the file.
+	# @param	MediaWikiLocalSettingsFile lsFile	The parsed file.
+	# @param	str[] stack							The paths of all files currently processed. (Used for detecting cyclic includes.)
+	#
+	def __processFile(self, filePath:str, lsFile:MediaWikiLocalSettingsFile, stack:list):
+		if filePath not in self.__includes:
+			self.__filePaths.append(filePath)
+			self.__includes[filePath] = []
+		stack.append(filePath)
+		magicVarValues = MediaWikiLocalSettingsIncludeGraph.__getMagicVarValues(filePath)
+
+		for stype, item in lsFile.iterStatements():
+			if not item.isActive:
+				continue
+
+			if stype == "include":
+				position = len(self.__assignments)
+				try:
+					path = item.getPath(lambda varName: self.__getVarValueAtE(varName, position), magicVarValues)
+				except Exception as ee:
+					self.__unresolvedIncludes.append( ( filePath, item, str(ee) ) )
+					continue
+				includedFilePath = self.__resolveIncludePath(filePath, path)
+
+				if includedFilePath in stack:
+					self.__unresolvedIncludes.append( ( filePath, item, "Cyclic include: " + repr(includedFilePath) ) )
+					continue
+				if item.isOnce and (includedFilePath in self.__includes):
+					# already included
+					if includedFilePath not in self.__includes[filePath]:
+						self.__includes[filePath].append(includedFilePath)
+					continue
+				try:
+					includedFile = self.__fileSet.getFile(includedFilePath)
+				except Exception as ee:
+					# the file can't be read or parsed (e.g. as it contains PHP code the tokenizer does not support)
+					self.__unresolvedIncludes.append( ( filePath, item, str(ee) ) )
+					continue
+				if includedFile is None:
+					self.__unresolvedIncludes.append( ( filePath, item, "No such file: " + repr(includedFilePath) ) )
+					continue
+
+				if includedFilePath not in self.__includes[filePath]:
+					self.__includes[filePath].append(includedFilePath)
+				self.__processFile(includedFilePath, includedFile, stack)
+
+			elif (stype == "varAssignComplex") or ((stype == "varAssign") and not item.indexValues):
+				self.__positionsByVarName.setdefault(item.varName, []).append(len(self.__assignments))
+				self.__assignments.append( ( filePath, item ) )
+
+		stack.pop()
+	#
+
+	#
+	# Get the position of the assignment of a variable that is in effect at the specified position.
+	#
+	# @return	int				Returns the position of the assignment or <c>-1</c> if the variable has not been assigned before.
+	#
+	def __getAssignmentPositionAt(self, varName:str, position:int) -> int:
+		positions = self.__positionsByVarName.get(varName)
+		if not positions:
+			return -1
+		i = bisect.bisect_left(positions, position)
+		return positions[i - 1] if i > 0 else -1
+	#
+
+	#
+	# Get the value of a variable as it is at the specified position.
+	#
+	def __getVarValueAt(self, varName:str, position:int):
+		p = self.__getAssignmentPositionAt(varName, position)
+		if p < 0:
+			return None
+
+		if p in self.__valueCache:
+			return self.__valueCache[p]
+
+		filePath, item = self.__assignments[p]
+		if isinstance(item, MediaWikiLocalSettingsComplexVariableAssignment):
+			# other variables are resolved as they are when this assignment is executed: there can't be any cycles
+			value = item.getValue(lambda refVarName: self.__getVarValueAtE(refVarName, p))
+			self.__valueCache[p] = value
+			return value
+
+		v = item.value
+		if isinstance(v, TypedValue):
+			if (v.dataType == "magic") or ((v.dataType == "word") and (v.value in [ "__FILE__", "__DIR__" ])):
+				return MediaWikiLocalSettingsIncludeGraph.__getMagicVarValues(filePath)[v.value]
+			else:
+				return v.value
+		elif isinstance(v, list):
+			return [ d.value for d in v ]
+		else:
+			raise Exception("Implementation Error!")
+	#
+
+	def __getVarValueAtE(self, varName:str, position:int):
+		v = self.__getVarValueAt(varName, position)
+		if v is None:
+			raise Exception("No such variable: " + repr(varName))
+		return v
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get the paths of the files included directly by the specified file.
+	#
+	# @param	str filePath				The path of a file in this graph.
+	# @return	str[]						Returns the paths of the files included in the order of their inclusion.
+	#
+	def getIncludedFilePaths(self, filePath:str) -> list:
+		assert isinstance(filePath, str)
+
+		return list(self.__includes.get(os.path.realpath(filePath), []))
+	#
+
+	#
+	# Get the assignment of a variable that is in effect after all files have been processed.
+	#
+	# @return	object				Returns either a <c>MediaWikiLocalSettingsVariableAssignment</c> or a
+	#								<c>MediaWikiLocalSettingsComplexVariableAssignment</c> or <c>None</c> if the variable is not assigned.
+	#
+	def getVar(self, varName:str):
+		assert isinstance(varName, str)
+
+		p = self.__getAssignmentPositionAt(varName, len(self.__assignments))
+		return self.__assignments[p][1] if p >= 0 else None
+	#
+
+	#
+	# Get the path of the file containing the assignment of a variable that is in effect after all files have been processed.
+	#
+	# @return	str					Returns the file path or <c>None</c> if the variable is not assigned.
+	#
+	def getVarFilePath(self, varName:str) -> str:
+		assert isinstance(varName, str)
+
+		p = self.__getAssignmentPositionAt(varName, len(self.__assignments))
+		return self.__assignments[p][0] if p >= 0 else None
+	#
+
+	#
+	# Get the value of a variable after all files have been processed.
+	#
+	# @return		value			This data or <c>None</c> if the variable does not exist.
+	#
+	def getVarValue(self, varName:str):
+		assert isinstance(varName, str)
+
+		return self.__getVarValueAt(varName, len(self.__assignments))
+	#
+
+	#
+	# Get the value of a variable after all files have been processed.
+	#
+	# @return		value			This data.
+	#
+	def getVarValueE(self, varName:str):
+		assert isinstance(varName, str)
+
+		return self.__getVarValueAtE(varName, len(self.__assignments))
+	#
+
+#
+
+
+
+
+
+
+
+
+
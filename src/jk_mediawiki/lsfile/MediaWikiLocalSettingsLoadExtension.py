@@ -0,0 +1,230 @@
+import os
+
+
+from jk_utils import *
+from jk_utils.tokenizer import *
+
+from ..impl.lang_support_php import *
+
+
+
+
+
+
+
+#
+# Represents a <c>wfLoadExtension()</c>, <c>wfLoadExtensions()</c>, <c>wfLoadSkin()</c> or <c>wfLoadSkins()</c> statement in a
+# "LocalSettings.php" file.
+#
+class MediaWikiLocalSettingsLoadExtension(object):
+
+	# ================================================================================================================================
+	# ==== Constants
+
+	__FUNCTION_NAMES = [ "wfLoadExtension", "wfLoadExtensions", "wfLoadSkin", "wfLoadSkins" ]
+
+	# ================================================================================================================================
+	# ==== Constructor Methods
+
+	def __init__(self, changedFlag:ChangedFlag, lineNo:int, colNo:int, bIsActive:bool, functionName:str, names:list, path:list = None):
+		assert isinstance(changedFlag, ChangedFlag)
+		assert isinstance(lineNo, int)
+		assert isinstance(colNo, int)
+		assert isinstance(bIsActive, bool)
+		assert functionName in MediaWikiLocalSettingsLoadExtension.__FUNCTION_NAMES
+		assert isinstance(names, list)
+		for name in names:
+			assert isinstance(name, TypedValue)
+		if path is None:
+			path = []
+		assert isinstance(path, list)
+		for pathItem in path:
+			assert isinstance(pathItem, TypedValue)
+
+		self.__changedFlag = changedFlag
+		self.__lineNo = lineNo
+		self.__colNo = colNo
+		self.__bIsActive = bIsActive
+		self.__functionName = functionName
+		self.__names = names
+		self.__path = path
+		self.__nModifications = 0
+		self.__activeStateListener = None
+	#
+
+	# ================================================================================================================================
+	# ==== Properties
+
+	@property
+	def lineNo(self) -> int:
+		return self.__lineNo
+	#
+
+	@property
+	def colNo(self) -> int:
+		return self.__colNo
+	#
+
+	@property
+	def functionName(self) -> str:
+		return self.__functionName
+	#
+
+	#
+	# Does this statement load skins (instead of extensions)?
+	#
+	@property
+	def isSkin(self) -> bool:
+		return self.__functionName.startswith("wfLoadSkin")
+	#
+
+	#
+	# The names of the extensions (or skins) loaded.
+	#
+	@property
+	def names(self) -> list:
+		return [ name.value for name in self.__names ]
+	#
+
+	@property
+	def isActive(self) -> bool:
+		return self.__bIsActive
+	#
+
+	@property
+	def isCommentedOut(self) -> bool:
+		return not self.__bIsActive
+	#
+
+	#
+	# Has this entry been modified since it has been parsed? (Only modified entries need to be rendered again on saving.)
+	#
+	@property
+	def isModified(self) -> bool:
+		return self.__nModifications > 0
+	#
+
+	#
+	# The number of modifications of this entry. (This is used to detect if values derived from this entry are still valid.)
+	#
+	@property
+	def modificationCount(self) -> int:
+		return self.__nModifications
+	#
+
+	# ================================================================================================================================
+	# ==== Methods
+
+	def toPHP(self):
+		ret = "" if self.__bIsActive else "#=# "
+		ret += self.__functionName
+		if self.__functionName.endswith("s"):
+			ret += "( [ " + ", ".join([ name.toPHP() for name in self.__names ]) + " ] );"
+		else:
+			ret += "( " + self.__names[0].toPHP()
+			if self.__path:
+				ret += ", " + " ".join([ ("$" + pathItem.value) if pathItem.dataType == "varref" else pathItem.toPHP() for pathItem in self.__path ])
+			ret += " );"
+		return ret
+	#
+
+	def __str__(self):
+		return self.toPHP()
+	#
+
+	def __repr__(self):
+		return self.toPHP()
+	#
+
+	def activate(self):
+		if not self.__bIsActive:
+			self.__bIsActive = True
+			self.__nModifications += 1
+			self.__changedFlag.setChanged(True)
+			if self.__activeStateListener is not None:
+				self.__activeStateListener(self)
+	#
+
+	def deactivate(self):
+		if self.__bIsActive:
+			self.__bIsActive = False
+			self.__nModifications += 1
+			self.__changedFlag.setChanged(True)
+			if self.__activeStateListener is not None:
+				self.__activeStateListener(self)
+	#
+
+	#
+	# Register a function that is invoked with this entry as argument whenever this entry is activated or deactivated. This is used by
+	# <c>MediaWikiLocalSettingsFile</c> to keep track of the extensions enabled.
+	#
+	def _setActiveStateListener(self, listener):
+		assert (listener is None) or callable(listener)
+		self.__activeStateListener = listener
+	#
+
+	#
+	# The listener refers to the file this entry belongs to: It is not serialized. (The file registers it again after deserialization.)
+	#
+	def __getstate__(self):
+		state = dict(self.__dict__)
+		state["_MediaWikiLocalSettingsLoadExtension__activeStateListener"] = None
+		return state
+	#
+
+	#
+	# Move this entry by the specified number of lines. This is used by <c>MediaWikiLocalSettingsFile.reload()</c> if lines have been
+	# inserted or removed before this entry. (This does not change the file's content.)
+	#
+	def _shiftLineNo(self, delta:int):
+		self.__lineNo += delta
+	#
+
+	# ================================================================================================================================
+	# ==== Static Methods
+
+	#
+	# Dictionary <c>dataMap</c> contains something like this:
+	#
+	# {
+	# 	"lineNo": 21,
+	#	"colNo": 1,
+	#	"active": True,
+	#	"keyword": "wfLoadExtensions",
+	#	"name": [
+	#		V(str1: "ParserFunctions"),
+	#		V(str1: "Cite"),
+	#	],
+	#	"path": [						(optional: the second argument of <c>wfLoadExtension()</c> or <c>wfLoadSkin()</c>)
+	#		V(varref: "IP"),
+	#		V(op: "."),
+	#		V(str1: "/extensions/ParserFunctions/extension.json"),
+	#	]
+	# }
+	#
+	@staticmethod
+	def parseFromDict(changedFlag:ChangedFlag, dataMap:dict):
+		assert isinstance(changedFlag, ChangedFlag)
+		assert isinstance(dataMap, dict)
+
+		lineNo = dataMap["lineNo"]
+		colNo = dataMap["colNo"]
+		bIsActive = dataMap["active"]
+		functionName = dataMap["keyword"]
+		names = dataMap.get("name", [])
+		path = dataMap.get("path", [])
+
+		ret = MediaWikiLocalSettingsLoadExtension(changedFlag, lineNo, colNo, bIsActive, functionName, names, path)
+		return ret
+	#
+
+#
+
+
+
+
+
+
+
+
+
@@ -8,4 +8,9 @@ __version__ = "0.2022.1.12.1"
 from .MediaWikiLocalSettingsArrayAppend import MediaWikiLocalSettingsArrayAppend
 from .MediaWikiLocalSettingsComplexVariableAssignment import MediaWikiLocalSettingsComplexVariableAssignment
 from .MediaWikiLocalSettingsVariableAssignment import MediaWikiLocalSettingsVariableAssignment
-from .MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
\ No newline at end of file
+from .MediaWikiLocalSettingsInclude import MediaWikiLocalSettingsInclude
+from .MediaWikiLocalSettingsLoadExtension import MediaWikiLocalSettingsLoadExtension
+from .MediaWikiLocalSettingsFileCache import MediaWikiLocalSettingsFileCache
+from .MediaWikiLocalSettingsFile import MediaWikiLocalSettingsFile
+from .MediaWikiLocalSettingsIncludeGraph import MediaWikiLocalSettingsIncludeGraph
+from .MediaWikiLocalSettingsFileSet import MediaWikiLocalSettingsFileSet
\ No newline at end of file
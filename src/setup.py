@@ -48,6 +48,7 @@ setup(
 		"jk_mediawiki",
 		"jk_mediawiki.impl",
 		"jk_mediawiki.lsfile",
+		"jk_mediawiki.benchmark",
 	],
 	scripts = [
 		"bin/wikilocalctrl.py",